@@ -0,0 +1,54 @@
+"""
+静态图表图片基准：首次渲染全部区域缩略图和城市概览图（单进程与进程池），数据未变化时的缓存命中，
+以及少量区域数据变化后只重新渲染这些区域和所在城市的概览图
+
+用法: python benchmarks/bench_charts.py [--districts 200] [--months 60] [--workers 4] [--changed 0.05]
+"""
+import argparse
+import os
+import shutil
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, timed, to_all_data, workspace
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='静态图表图片渲染')
+    parser.add_argument('--districts', type=int, default=200)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--changed', type=float, default=0.05, help='第二次构建时数据变化的区域比例')
+    parser.add_argument('--format', default='png', choices=['png', 'svg'])
+    args = parser.parse_args()
+
+    quiet_logging()
+    cities = synthetic_cities(args.districts)
+    all_data = to_all_data(synthetic_crawl_data(cities, args.months))
+    print(f'{args.districts}个区域 × {args.months}个月, {len(cities)}个城市, 格式{args.format}, CPU核数{os.cpu_count()}')
+
+    with workspace():
+        for workers in sorted({1, args.workers}):
+            shutil.rmtree(hpr.CHART_DIR, ignore_errors=True)
+            seconds, manifest = timed(lambda: hpr.render_chart_images(all_data, workers=workers, fmt=args.format))
+            print(f'首次渲染({workers}个进程): {seconds:.2f}s, {manifest["rendered"]}张图片, '
+                  f'共{directory_bytes(hpr.CHART_DIR) / 1024:.0f}KB')
+
+        seconds, manifest = timed(lambda: hpr.render_chart_images(all_data, workers=args.workers, fmt=args.format))
+        print(f'数据未变化: {seconds * 1000:.1f}ms, 渲染{manifest["rendered"]}张, 沿用{manifest["reused"]}张')
+
+        pairs = [(city, district) for city, districts in all_data.items() for district in districts]
+        changed = pairs[::max(1, round(1 / args.changed))] if args.changed > 0 else []
+        for city, district in changed:
+            monthly = all_data[city][district][0]['monthly_data']
+            monthly[0] = dict(monthly[0], second_hand_price=monthly[0]['second_hand_price'] + 100)
+        seconds, manifest = timed(lambda: hpr.render_chart_images(all_data, workers=args.workers, fmt=args.format))
+        print(f'{len(changed)}个区域变化({len({city for city, _ in changed})}个城市): {seconds:.2f}s, '
+              f'渲染{manifest["rendered"]}张, 沿用{manifest["reused"]}张, '
+              f'旧图片已清理: {sum(len(files) for _, _, files in os.walk(hpr.CHART_DIR)) - 1 == manifest["rendered"] + manifest["reused"]}')
+
+
+if __name__ == '__main__':
+    main()
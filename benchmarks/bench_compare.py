@@ -0,0 +1,109 @@
+"""
+多区域对比基准：叠加N条曲线时，预对齐矩阵与逐区域在页面中重建数组的负载大小和渲染前准备耗时
+
+页面脚本从模板中原样抽取，在node中计时（未安装node时只报告负载大小）。
+用法: python benchmarks/bench_compare.py [--series 10] [--districts 100] [--months 60]
+"""
+import argparse
+import json
+import re
+import shutil
+import subprocess
+
+from common import hpr, synthetic_cities, synthetic_crawl_data, to_all_data, workspace
+
+# 对照组：没有预对齐矩阵时，页面需要逐区域排序、合并月份轴并按月份对齐每条曲线
+REBUILD_JS = '''
+function rebuildCompareTraces(housePriceData, pairs, field) {
+    const perSeries = pairs.map(([city, district]) => {
+        const monthly = housePriceData[city][district][0].monthly_data.slice();
+        monthly.sort((a, b) => a.month.localeCompare(b.month));
+        const byMonth = new Map();
+        monthly.forEach(item => byMonth.set(item.month, item[field + '_price']));
+        return byMonth;
+    });
+    const months = Array.from(new Set(perSeries.flatMap(m => Array.from(m.keys())))).sort();
+    const dates = months.map(month => month + '-01');
+    return pairs.map(([city, district], i) => ({
+        type: 'scatter', mode: 'lines', x: dates,
+        y: months.map(month => perSeries[i].has(month) ? perSeries[i].get(month) : null),
+        name: city + '-' + district, connectgaps: false
+    }));
+}
+'''
+
+NODE_RUNNER = '''
+const fs = require('fs');
+const input = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const {compareData, housePriceData, pairs, indices, iterations} = input;
+function time(fn) {
+    for (let i = 0; i < 50; i++) fn();  // 预热JIT
+    const start = process.hrtime.bigint();
+    for (let i = 0; i < iterations; i++) fn();
+    return Number(process.hrtime.bigint() - start) / 1e6 / iterations;
+}
+const compareDates = compareData.months.map(month => month + '-01');
+const matrixMs = time(() => buildCompareTraces(compareData, compareDates, indices, 'second_hand'));
+const rebuildMs = time(() => rebuildCompareTraces(housePriceData, pairs, 'second_hand'));
+console.log(JSON.stringify({matrixMs, rebuildMs}));
+'''
+
+
+def extract_template_function(name):
+    """从HTML模板中抽取页面脚本里的函数源码，保证计时的是实际发布的代码"""
+    match = re.search(r'( *)function ' + name + r'\(.*?\n\1\}\n', hpr.HTML_TEMPLATE, re.S)
+    if not match:
+        raise RuntimeError(f'模板中未找到函数 {name}')
+    return match.group(0)
+
+
+def payload_size(obj):
+    return len(json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多区域对比负载与渲染准备耗时')
+    parser.add_argument('--series', type=int, default=10, help='叠加的曲线数量')
+    parser.add_argument('--districts', type=int, default=100, help='数据集中的区域总数')
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    cities = synthetic_cities(args.districts)
+    all_data = to_all_data(synthetic_crawl_data(cities, args.months))
+    matrix = hpr.build_aligned_price_matrix(all_data)
+    indices = list(range(0, len(matrix['series']), max(1, len(matrix['series']) // args.series)))[:args.series]
+    pairs = [matrix['series'][i] for i in indices]
+
+    # 负载：所选N个区域在矩阵中的行 vs 原始逐月记录
+    payload = hpr.compare_payload(matrix)
+    matrix_rows = {
+        'months': payload['months'],
+        'series': [payload['series'][i] for i in indices],
+        'second_hand': [payload['second_hand'][i] for i in indices],
+        'new_house': [payload['new_house'][i] for i in indices],
+    }
+    raw_rows = {city: {district: all_data[city][district]} for city, district in pairs}
+    print(f'{len(indices)}条曲线 × {args.months}个月 (数据集共{len(matrix["series"])}个区域)')
+    print(f'负载: 预对齐矩阵 {payload_size(matrix_rows) / 1024:.1f}KB, 逐月记录 {payload_size(raw_rows) / 1024:.1f}KB, '
+          f'完整对比矩阵 {payload_size(payload) / 1024:.1f}KB')
+
+    node = shutil.which('node')
+    if not node:
+        print('未找到node，跳过页面渲染准备耗时')
+        return
+    script = extract_template_function('buildCompareTraces') + REBUILD_JS + NODE_RUNNER
+    with workspace():
+        with open('bench.js', 'w', encoding='utf-8') as f:
+            f.write(script)
+        with open('input.json', 'w', encoding='utf-8') as f:
+            json.dump({'compareData': payload, 'housePriceData': all_data, 'pairs': pairs,
+                       'indices': indices, 'iterations': args.iterations}, f, ensure_ascii=False)
+        output = subprocess.run([node, 'bench.js', 'input.json'], capture_output=True, text=True, check=True).stdout
+    timing = json.loads(output)
+    print(f'渲染准备: 预对齐矩阵 {timing["matrixMs"] * 1000:.1f}µs, 逐区域重建 {timing["rebuildMs"] * 1000:.1f}µs '
+          f'(x{timing["rebuildMs"] / timing["matrixMs"]:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+常驻模式基准：以子进程运行daemon（桩服务器作为数据源），与冷启动的crawl模式对比
+启动耗时、每个区域的请求数和总耗时，并检查/health、/metrics以及收到SIGTERM后的平滑退出
+
+用法: python benchmarks/bench_daemon.py [--districts 50] [--interval 10]
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from common import REPO_ROOT, synthetic_cities, synthetic_crawl_data, synthetic_registry_entries, workspace
+from stub_server import start_stub_server
+
+SCRIPT = os.path.join(REPO_ROOT, 'house_price_report.py')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(port, path):
+    """返回(状态码, 对象)；连接失败时返回(None, None)"""
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+    except OSError:
+        return None, None
+
+
+def crawled_districts(since):
+    """crawl_data.json中爬取时间晚于since的区域数"""
+    with open('crawl_data.json', 'r', encoding='utf-8') as f:
+        crawl_data = json.load(f)
+    return sum(1 for districts in crawl_data.values() for entry in districts.values()
+               if entry.get('crawl_time', '') > since)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='daemon与冷启动爬取对比')
+    parser.add_argument('--districts', type=int, default=50)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--interval', type=float, default=10.0, help='daemon每个区域的爬取间隔（秒）')
+    parser.add_argument('--timeout', type=float, default=120.0, help='等待daemon爬完两轮的最长时间（秒）')
+    args = parser.parse_args()
+
+    cities = synthetic_cities(args.districts)
+    crawl_data = synthetic_crawl_data(cities, args.months)
+    baseline_time = max(entry['crawl_time'] for districts in crawl_data.values() for entry in districts.values())
+    stub, base_url = start_stub_server()
+    stats = stub.RequestHandlerClass.stats
+    try:
+        with workspace(crawl_data):
+            with open('registry.json', 'w', encoding='utf-8') as f:
+                json.dump({'cities': synthetic_registry_entries(cities)}, f, ensure_ascii=False)
+            env = dict(os.environ, GOTOHUI_BASE_URL=base_url, CRAWL_DELAY_SCALE='0', CITY_REGISTRY_FILE=os.path.abspath('registry.json'),
+                       DAEMON_FLUSH_INTERVAL='1', DAEMON_CRAWL_INTERVAL=str(args.interval),
+                       HOUSE_PRICE_LOG_LEVEL='WARNING')
+            print(f'{args.districts}个区域, 已有{args.months}个月历史')
+
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', 'import house_price_report'], env=dict(env, PYTHONPATH=REPO_ROOT),
+                           check=True)
+            import_seconds = time.perf_counter() - started
+            requests_before = stats['requests']
+            started = time.perf_counter()
+            subprocess.run([sys.executable, SCRIPT, 'crawl', '--output', 'cold.json'], env=env, check=True)
+            cold_seconds = time.perf_counter() - started
+            cold_requests = stats['requests'] - requests_before
+            print(f'冷启动crawl: 导入模块{import_seconds:.2f}s, 全部区域{cold_seconds:.2f}s, '
+                  f'每区域{cold_requests / args.districts:.1f}个请求')
+
+            port = free_port()
+            requests_before = stats['requests']
+            started = time.perf_counter()
+            process = subprocess.Popen([sys.executable, SCRIPT, 'daemon', '--port', str(port)], env=env)
+            try:
+                while get_json(port, '/health')[0] != 200:
+                    if process.poll() is not None or time.perf_counter() - started > args.timeout:
+                        raise RuntimeError('daemon未能启动')
+                    time.sleep(0.05)
+                healthy_seconds = time.perf_counter() - started
+                metrics = {}
+                while time.perf_counter() - started < args.timeout:
+                    _, metrics = get_json(port, '/metrics')
+                    if metrics['counters'].get('districts_written', 0) >= args.districts:
+                        break
+                    time.sleep(0.2)
+                cycle_seconds = time.perf_counter() - started
+                daemon_requests = stats['requests'] - requests_before
+                crawls = metrics['counters'].get('crawls', 0)
+                print(f'daemon: {healthy_seconds:.2f}s后健康检查通过, {cycle_seconds:.2f}s内爬取{crawls}个区域 '
+                      f'(增量{metrics["counters"].get("incremental_crawls", 0)}个), '
+                      f'每区域{daemon_requests / max(1, crawls):.1f}个请求')
+                print(f'写入{metrics["counters"].get("flushes", 0)}次, '
+                      f'有变化的区域{metrics["counters"].get("districts_changed", 0)}个, 最近一次重建: {metrics["last_rebuild"]}')
+
+                # 第二轮：数据源未变化，只更新数据API中的爬取时间，不重建报告
+                first = metrics['counters']
+                while time.perf_counter() - started < args.timeout:
+                    _, metrics = get_json(port, '/metrics')
+                    if metrics['counters'].get('districts_written', 0) >= 2 * args.districts:
+                        break
+                    time.sleep(0.2)
+                second = metrics['counters']
+                print(f'第二轮: 写入{second.get("districts_written", 0) - first.get("districts_written", 0)}个区域, '
+                      f'有变化{second.get("districts_changed", 0) - first.get("districts_changed", 0)}个, '
+                      f'重建报告{second.get("rebuilds", 0) - first.get("rebuilds", 0)}次')
+                _, series = get_json(port, '/cities')
+                print(f'/cities: {sum(len(districts) for districts in series.values())}个区域')
+
+                started = time.perf_counter()
+                process.send_signal(signal.SIGTERM)
+                code = process.wait(timeout=60)
+                print(f'SIGTERM后{time.perf_counter() - started:.2f}s退出, 返回码{code}, '
+                      f'crawl_data.json中已更新{crawled_districts(baseline_time)}个区域')
+            finally:
+                if process.poll() is None:
+                    process.kill()
+    finally:
+        stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+列式导出基准：对比json.load加展开为DataFrame与读取export模式输出的耗时，并报告文件大小
+有pyarrow时同时测量Arrow IPC（内存映射）、Parquet和.npz，否则只测量.npz
+
+用法: python benchmarks/bench_export.py [--districts 1000] [--months 240]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, timed, workspace
+
+
+def json_to_frame(path):
+    """对照做法：载入整个JSON后逐行展开为DataFrame"""
+    with open(path, 'r', encoding='utf-8') as f:
+        crawl_data = json.load(f)
+    rows = [dict(row, city=city, district=district)
+            for city, districts in crawl_data.items()
+            for district, entry in districts.items()
+            for row in entry['monthly_data']]
+    frame = pd.DataFrame(rows, columns=['city', 'district', 'month', 'second_hand_price', 'new_house_price', 'source'])
+    frame['month'] = pd.to_datetime(frame['month'], format='%Y-%m')
+    return frame
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列式导出读取耗时')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=240)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    quiet_logging()
+    try:
+        import pyarrow as pa
+        formats = ['arrow', 'parquet', 'npz']
+    except ImportError:
+        pa = None
+        formats = ['npz']
+
+    with workspace(synthetic_crawl_data(synthetic_cities(args.districts), args.months)):
+        json_time, expected = timed(lambda: json_to_frame('crawl_data.json'), args.repeat)
+        print(f'{args.districts}个区域 × {args.months}个月 = {len(expected)}行')
+        print(f'{"json.load+展开":<16} {json_time * 1000:9.1f}ms  {os.path.getsize("crawl_data.json") / 1e6:7.1f}MB')
+        for fmt in formats:
+            output_dir = f'exports-{fmt}'
+            export_time, _ = timed(lambda: hpr.export_history(output_dir, fmt))
+            read_time, frame = timed(lambda: hpr.read_history_export(output_dir), args.repeat)
+            # 导出按月份正序存放，与JSON的倒序不同，比较时先排序
+            same = (len(frame) == len(expected)
+                    and (np.sort(frame['second_hand_price'].to_numpy())
+                         == np.sort(expected['second_hand_price'].to_numpy())).all()
+                    and (np.sort(frame['month'].to_numpy()) == np.sort(expected['month'].to_numpy())).all())
+            print(f'{fmt + "→DataFrame":<16} {read_time * 1000:9.1f}ms  {directory_size(output_dir) / 1e6:7.1f}MB  '
+                  f'x{json_time / read_time:.1f}  导出{export_time * 1000:.0f}ms  行数与价格一致: {same}')
+        if pa is not None:
+            # 直接映射Arrow文件得到表，不转换为pandas
+            paths = [os.path.join('exports-arrow', name) for name in
+                     json.load(open(os.path.join('exports-arrow', 'manifest.json'), encoding='utf-8'))['partitions'].values()]
+            mmap_time, table = timed(lambda: pa.concat_tables(pa.ipc.open_file(pa.memory_map(path)).read_all()
+                                                              for path in paths), args.repeat)
+            print(f'{"arrow内存映射":<16} {mmap_time * 1000:9.1f}ms  {table.num_rows}行  x{json_time / mmap_time:.0f}')
+
+
+if __name__ == '__main__':
+    main()
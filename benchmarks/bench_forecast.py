@@ -0,0 +1,62 @@
+"""
+趋势预测基准：批量拟合全部区域与逐区域循环拟合的耗时，校验两者结果一致，并测量缓存命中
+
+用法: python benchmarks/bench_forecast.py [--districts 1000] [--months 60]
+"""
+import argparse
+
+import numpy as np
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, timed, to_all_data
+
+
+def forecast_loop(matrix, horizon, min_points):
+    """对照实现：逐个区域构造设计矩阵并求解"""
+    months = matrix['months']
+    ordinals = np.array([int(m[:4]) * 12 + int(m[5:7]) - 1 for m in months], dtype=float)
+    origin = ordinals[-1]
+    future = hpr._forecast_design(origin + np.arange(1, horizon + 1, dtype=float), origin)
+    ridge = np.diag([0.0, 0.0, 1e-3, 1e-3, 1e-3, 1e-3])
+    values = {}
+    for pair, row in zip(matrix['series'], matrix['second_hand']):
+        valid = np.isfinite(row) & (row > 0)
+        if valid.sum() < min_points:
+            continue
+        design = hpr._forecast_design(ordinals[valid], origin)
+        coefficients = np.linalg.solve(design.T @ design + ridge, design.T @ np.log(row[valid]))
+        values[pair] = np.round(np.exp(future @ coefficients), 2).tolist()
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量趋势预测耗时')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--horizon', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    quiet_logging()
+    all_data = to_all_data(synthetic_crawl_data(synthetic_cities(args.districts), args.months))
+    matrix_time, matrix = timed(lambda: hpr.build_aligned_price_matrix(all_data, recent_months=hpr.FORECAST_FIT_MONTHS),
+                                args.repeat)
+
+    def batched():
+        hpr.FORECAST_CACHE.clear()
+        return hpr.forecast_price_matrix(matrix, args.horizon)
+
+    batched_time, result = timed(batched, args.repeat)
+    loop_time, expected = timed(lambda: forecast_loop(matrix, args.horizon, hpr.FORECAST_MIN_POINTS), args.repeat)
+    cached_time, _ = timed(lambda: hpr.forecast_price_matrix(matrix, args.horizon), args.repeat)
+
+    difference = max((np.max(np.abs(np.array(result['values'][pair]) - np.array(values)) / np.array(values))
+                      for pair, values in expected.items()), default=0.0)
+    print(f'{args.districts}个区域, 拟合窗口{matrix["second_hand"].shape[1]}个月, 外推{args.horizon}个月')
+    print(f'对齐矩阵: {matrix_time * 1000:.1f}ms')
+    print(f'批量拟合: {batched_time * 1000:.1f}ms, 预测{len(result["values"])}个区域')
+    print(f'逐区域循环: {loop_time * 1000:.1f}ms, 与批量结果最大相对差 {difference:.2e}')
+    print(f'缓存命中: {cached_time * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
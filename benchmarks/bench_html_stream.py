@@ -0,0 +1,93 @@
+"""
+HTML写出基准：对比旧的"整串拼接+六次replace"与流式模板渲染的耗时和峰值内存
+
+两种方式写出的文件必须逐字节一致。
+用法: python benchmarks/bench_html_stream.py [--districts 10000] [--months 60]
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from common import hpr, synthetic_cities, synthetic_crawl_data, workspace
+
+
+def render_with_replace(values, filename):
+    """旧实现：先序列化完整JSON，再对整份文档依次replace"""
+    html = hpr.HTML_TEMPLATE
+    for placeholder in hpr.HTML_TEMPLATE_PLACEHOLDERS:
+        value = values[placeholder]
+        html = html.replace(placeholder, value if isinstance(value, str) else value())
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def render_streaming(values, filename):
+    """新实现：按片段流式写出，JSON按城市/区域分块写入文件"""
+    hpr.render_template_to_file(hpr.HTML_TEMPLATE_PARTS, {
+        placeholder: value if isinstance(value, str) else (lambda f, obj=value.obj: hpr.dump_json_chunked(obj, f))
+        for placeholder, value in values.items()
+    }, filename)
+
+
+class JsonValue:
+    """延迟序列化的JSON占位值：replace实现调用它得到字符串，流式实现直接取obj"""
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __call__(self):
+        return json.dumps(self.obj, separators=(',', ':'))
+
+
+def measure(func, values, filename):
+    """先单独计时，再在tracemalloc下重跑一次取峰值内存（tracemalloc本身会拖慢执行）"""
+    start = time.perf_counter()
+    func(values, filename)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(values, filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML写出方式对比')
+    parser.add_argument('--districts', type=int, default=10000)
+    parser.add_argument('--months', type=int, default=60)
+    args = parser.parse_args()
+
+    cities = synthetic_cities(args.districts)
+    crawl_data = synthetic_crawl_data(cities, args.months)
+    simplified = {city: {d: [{'monthly_data': e['monthly_data']}] for d, e in ds.items()}
+                  for city, ds in crawl_data.items()}
+    # 模板中的每个占位符都有值（未单独指定的为空串），模板新增占位符时基准无需同步修改
+    values = dict.fromkeys(hpr.HTML_TEMPLATE_PLACEHOLDERS, '')
+    values.update({
+        '[CURRENT_TIME]': '2025年10月01日 09:00:00',
+        '[CITY_OPTIONS]': ''.join(f'<option value="{c}">{c}</option>' for c in cities),
+        '[DISTRICT_OPTIONS]': ''.join(f'<option value="{d}">{d}</option>' for d in next(iter(cities.values()))),
+        'CITIES_JSON': JsonValue(cities),
+        'DATA_JSON': JsonValue(simplified),
+        'DEFAULT_CHART_JSON': '{"data":[],"layout":{}}',
+        'COMPARE_JSON': '{"months":[],"series":[],"second_hand":[],"new_house":[]}',
+        'DETAIL_JSON': '{"files":{},"threshold":100}',
+        'FORECAST_JSON': '{"months":[],"values":{}}',
+    })
+
+    with workspace():
+        old_time, old_peak = measure(render_with_replace, values, 'replace.html')
+        new_time, new_peak = measure(render_streaming, values, 'stream.html')
+        size = os.path.getsize('stream.html')
+        with open('replace.html', 'rb') as a, open('stream.html', 'rb') as b:
+            identical = a.read() == b.read()
+
+    print(f'{args.districts}个区域 × {args.months}个月, 输出{size / 1024 / 1024:.1f}MB, 逐字节一致: {identical}')
+    print(f'replace拼接: {old_time:.3f}s, 峰值内存{old_peak / 1024 / 1024:.1f}MB')
+    print(f'流式渲染:    {new_time:.3f}s, 峰值内存{new_peak / 1024 / 1024:.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+解析吞吐量基准：对比INFO与DEBUG日志级别下extract_monthly_data_from_page的性能
+
+用法: python benchmarks/bench_logging.py [--rounds 10]
+"""
+import argparse
+import io
+import logging
+import time
+
+from common import hpr, load_fixture_soups
+
+
+def run(level, soups, rounds):
+    """在指定日志级别下多轮解析录制页面，日志写入内存流以排除终端I/O差异"""
+    stream = io.StringIO()
+    hpr.logger.handlers = [logging.StreamHandler(stream)]
+    hpr.logger.propagate = False
+    hpr.logger.setLevel(level)
+
+    rows = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for year, soup in soups:
+            rows += len(hpr.extract_monthly_data_from_page(soup, year))
+    elapsed = time.perf_counter() - start
+    pages = len(soups) * rounds
+    return {
+        'level': logging.getLevelName(level),
+        'pages': pages,
+        'rows': rows,
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(pages / elapsed, 1),
+        'log_bytes': len(stream.getvalue().encode('utf-8')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='INFO与DEBUG日志级别下的解析吞吐量对比')
+    parser.add_argument('--rounds', type=int, default=10, help='录制页面的解析轮数')
+    args = parser.parse_args()
+
+    soups = load_fixture_soups()
+    for level in (logging.INFO, logging.DEBUG):
+        result = run(level, soups, args.rounds)
+        print(f"{result['level']:>5}: {result['pages_per_sec']:>8} 页/秒, "
+              f"{result['rows']}行, 日志{result['log_bytes']}字节, 用时{result['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
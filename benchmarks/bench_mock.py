@@ -0,0 +1,35 @@
+"""
+模拟数据回退基准：逐个生成、并行生成与缓存命中的耗时，并校验并行结果与逐个生成一致
+
+用法: python benchmarks/bench_mock.py [--districts 1000] [--weeks 260]
+"""
+import argparse
+
+from common import hpr, quiet_logging, registry, synthetic_cities, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟数据回退耗时')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--weeks', type=int, default=260)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    quiet_logging()
+    cities = synthetic_cities(args.districts)
+    with registry(cities):
+        units = list(hpr.REGISTRY.units())
+        hpr.MOCK_SERIES_CACHE.clear()
+        serial_time, serial = timed(lambda: {unit: hpr.generate_juhui_based_data(*unit, args.weeks) for unit in units})
+        hpr.MOCK_SERIES_CACHE.clear()
+        parallel_time, parallel = timed(lambda: hpr.generate_mock_fallbacks(units, args.weeks, args.workers))
+        cached_time, cached = timed(lambda: hpr.generate_mock_fallbacks(units, args.weeks, args.workers))
+
+    print(f'{len(units)}个区域 × {args.weeks}周')
+    print(f'逐个生成: {serial_time:.3f}s')
+    print(f'并行生成({args.workers}线程): {parallel_time:.3f}s, 与逐个生成一致: {parallel == serial}')
+    print(f'缓存命中: {cached_time:.3f}s, 与首次生成一致: {cached == parallel}')
+
+
+if __name__ == '__main__':
+    main()
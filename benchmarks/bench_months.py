@@ -0,0 +1,55 @@
+"""
+月度数据有序存储基准：读取最新值、区间切片和写入合并，对比每次排序的旧做法与依赖倒序约定的新做法
+
+用法: python benchmarks/bench_months.py [--districts 1000] [--months 240]
+"""
+import argparse
+
+from common import hpr, synthetic_cities, synthetic_crawl_data, timed
+
+
+def sorted_latest(monthly):
+    return sorted(monthly, key=lambda row: row['month'], reverse=True)[0]
+
+
+def sorted_range(monthly, start, end):
+    return [row for row in sorted(monthly, key=lambda row: row['month']) if start <= row['month'] <= end][::-1]
+
+
+def dict_merge(existing, incoming):
+    """旧做法：按月份建字典合并后整体排序"""
+    merged = {row['month']: row for row in existing}
+    merged.update((row['month'], row) for row in incoming)
+    return sorted(merged.values(), key=lambda row: row['month'], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='月度数据读取与合并')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=240)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    crawl_data = synthetic_crawl_data(synthetic_cities(args.districts), args.months)
+    series = [entry['monthly_data'] for districts in crawl_data.values() for entry in districts.values()]
+    start, end = series[0][35]['month'], series[0][24]['month']
+    # 一次爬取带来的新数据：最近60个月，其中最新一个月是新增的
+    incoming = [[dict(monthly[0], month=hpr.shift_month(monthly[0]['month'], 1))] + monthly[:59] for monthly in series]
+
+    cases = [
+        ('最新值', lambda: [sorted_latest(m) for m in series], lambda: [hpr.latest_month_row(m) for m in series]),
+        ('一年区间切片', lambda: [sorted_range(m, start, end) for m in series],
+         lambda: [hpr.month_range(m, start, end) for m in series]),
+        ('写入合并', lambda: [dict_merge(m, new) for m, new in zip(series, incoming)],
+         lambda: [hpr.merge_monthly_rows(m, new) for m, new in zip(series, incoming)]),
+    ]
+    print(f'{len(series)}个区域 × {args.months}个月')
+    for name, old, new in cases:
+        old_time, expected = timed(old, args.repeat)
+        new_time, result = timed(new, args.repeat)
+        print(f'{name:<8} 排序: {old_time * 1000:8.2f}ms  有序存储: {new_time * 1000:8.2f}ms  '
+              f'x{old_time / new_time:.1f}  结果一致: {result == expected}')
+
+
+if __name__ == '__main__':
+    main()
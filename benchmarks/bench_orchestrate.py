@@ -0,0 +1,95 @@
+"""
+异步编排基准：对桩服务器爬取合成区域并生成报告（含静态图表图片，--site时含静态站点），对比串行流程与异步编排的总耗时，
+以及编排后总耗时相对单独爬取耗时的比例；每个延迟分别计时，最后一个延迟的时间线写入--trace。
+另在已有更早历史数据的存储上运行一次编排，检查爬取期间提前完成的图片和页面在组装时全部沿用
+
+用法: python benchmarks/bench_orchestrate.py [--districts 40] [--latency 0.02,0.05] [--workers 2] [--site]
+                                            [--trace trace.json] [--history-months 120]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+
+from common import hpr, patched, quiet_logging, registry, synthetic_cities, synthetic_crawl_data, timed, workspace
+from stub_server import start_stub_server
+
+
+def chart_manifest():
+    with open(os.path.join(hpr.CHART_DIR, hpr.CHART_MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def site_report(site):
+    if not site:
+        return {}
+    with open(os.path.join(hpr.SITE_DIR, 'build_report.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def serial(workers, site):
+    seconds, _ = timed(lambda: hpr.generate_house_price_report(force=True, site=site, workers=workers))
+    return seconds
+
+
+def orchestrate(workers, site):
+    trace_path = os.path.abspath('orchestrator_trace.json')
+    seconds, _ = timed(lambda: asyncio.run(
+        hpr.orchestrate_report(force=True, site=site, workers=workers, trace_path=trace_path)))
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        return seconds, json.load(f)['otherData'], trace_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='异步编排爬取与构建')
+    parser.add_argument('--districts', type=int, default=40)
+    parser.add_argument('--latency', default='0.02,0.05', help='桩服务器每请求延迟（秒，逗号分隔），模拟网络往返')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--site', action='store_true', help='同时生成静态站点')
+    parser.add_argument('--trace', default=None, help='时间线输出路径，默认不保留')
+    parser.add_argument('--history-months', type=int, default=120, help='已有历史数据的存储中的月数')
+    args = parser.parse_args()
+
+    quiet_logging()
+    cities = synthetic_cities(args.districts)
+    latencies = [float(value) for value in args.latency.split(',')]
+    print(f'{args.districts}个区域, {args.workers}个工作进程, 静态站点: {args.site}, CPU核数{os.cpu_count()}')
+    with registry(cities):
+        for latency in latencies:
+            server, base_url = start_stub_server(latency=latency)
+            try:
+                with patched(hpr, GOTOHUI_BASE_URL=base_url, CRAWL_DELAY_SCALE=0):
+                    with workspace():
+                        serial_time = serial(args.workers, args.site)
+                        manifest = chart_manifest()
+                        serial_charts = manifest['districts'], manifest['cities']
+                    with workspace():
+                        orchestrated_time, summary, trace_path = orchestrate(args.workers, args.site)
+                        manifest = chart_manifest()
+                        same = (manifest['districts'], manifest['cities']) == serial_charts
+                        pages = site_report(args.site)
+                        if args.trace:
+                            shutil.copy(trace_path, args.trace)
+                    # 存储中已有更早的历史：各区域须按校验并与历史合并后的数据处理，组装时才能沿用
+                    with workspace(synthetic_crawl_data(cities, args.history_months)):
+                        _, seeded, _ = orchestrate(args.workers, args.site)
+                        seeded_manifest = chart_manifest()
+                        seeded_pages = site_report(args.site)
+            finally:
+                server.shutdown()
+
+            crawl = summary['crawl_seconds']
+            print(f'延迟{latency * 1000:.0f}ms: 串行流程{serial_time:.2f}s, 异步编排{orchestrated_time:.2f}s '
+                  f'(x{serial_time / orchestrated_time:.2f}), 其中爬取{crawl:.2f}s, '
+                  f'爬取结束后{summary["after_crawl_seconds"]:.2f}s, 总耗时/爬取耗时 = {orchestrated_time / crawl:.2f}')
+            print(f'  区域预处理与图表{summary["builds"]}项, 其中{summary["builds_during_crawl"]}项在爬取期间完成, '
+                  f'图片清单与串行流程一致: {same}' +
+                  (f', 站点页面提前渲染{pages["prerendered_pages"]}个, 组装时渲染{pages["pages"]}个' if pages else ''))
+            print(f'  已有{args.history_months}个月历史: 组装时渲染图片{seeded_manifest["rendered"]}张, '
+                  f'沿用{seeded_manifest["reused"]}张, 全部命中缓存: {seeded_manifest["rendered"] == 0}' +
+                  (f', 组装时渲染站点页面{seeded_pages["pages"]}个' if seeded_pages else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+长历史基准：历史月数增长时，页面内嵌数据量、首屏绘制点数与按需加载的完整数据量
+
+用法: python benchmarks/bench_overview.py [--districts 100] [--months 60,120,240]
+"""
+import argparse
+import os
+
+from common import (hpr, patched, quiet_logging, registry, synthetic_cities, synthetic_crawl_data, timed, to_all_data,
+                    workspace)
+
+
+def detail_bytes(html_filename):
+    detail_dir = hpr.detail_dir_path(html_filename)
+    return sum(os.path.getsize(os.path.join(detail_dir, name)) for name in os.listdir(detail_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='降采样概览与按需加载的完整数据')
+    parser.add_argument('--districts', type=int, default=100)
+    parser.add_argument('--months', default='60,120,240')
+    args = parser.parse_args()
+
+    quiet_logging()
+    cities = synthetic_cities(args.districts)
+    print(f'{args.districts}个区域, 概览上限{hpr.OVERVIEW_POINTS}个点')
+    for months in (int(n) for n in args.months.split(',')):
+        crawl_data = synthetic_crawl_data(cities, months)
+        all_data = to_all_data(crawl_data)
+        overview = hpr.build_overview_data(all_data)
+        first_city = next(iter(overview))
+        first_points = len(next(iter(overview[first_city].values()))[0]['monthly_data'])
+        with workspace(crawl_data), registry(cities), patched(hpr, CHART_IMAGE_FORMAT=''):
+            seconds, path = timed(lambda: hpr.generate_simplified_house_price_html(all_data, force=True))
+            html_size = os.path.getsize(path)
+            lazy_size = detail_bytes(path)
+        print(f'{months:>4}个月: 页面{html_size / 1024:8.1f}KB, 首屏每区域{first_points:>3}个点, '
+              f'按需加载{lazy_size / 1024:8.1f}KB, 生成{seconds:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
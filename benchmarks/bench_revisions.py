@@ -0,0 +1,111 @@
+"""
+修订日志基准：模拟多次爬取（每次追加新月份并修订少量历史月份），
+比较修订日志与逐次保存完整文件的体积，并测量按任意运行重建数据的耗时和正确性
+
+用法: python benchmarks/bench_revisions.py [--districts 100] [--runs 100] [--revisions 3]
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from common import hpr, patched, quiet_logging, synthetic_cities, synthetic_crawl_data, timed, workspace
+
+
+def next_month(month):
+    year, number = int(month[:4]), int(month[5:])
+    year, number = (year + 1, 1) if number == 12 else (year, number + 1)
+    return f'{year}-{number:02d}'
+
+
+def simulate_run(crawl_data, rng, revisions, crawl_time):
+    """在上一次数据基础上生成一次新的爬取结果：追加一个月，并随机修订几个历史月份"""
+    results = []
+    for districts in crawl_data.values():
+        for entry in districts.values():
+            monthly = [dict(row) for row in entry['monthly_data']]
+            latest = monthly[0]
+            monthly.insert(0, dict(latest, month=next_month(latest['month']),
+                                   second_hand_price=round(latest['second_hand_price'] * (1 + rng.uniform(-0.01, 0.01)), 2)))
+            for row in rng.sample(monthly[1:], min(revisions, len(monthly) - 1)):
+                row['second_hand_price'] = round(row['second_hand_price'] * (1 + rng.uniform(-0.02, 0.02)), 2)
+            results.append(dict(entry, monthly_data=monthly, current_price=monthly[0]['second_hand_price'],
+                                crawl_time=crawl_time))
+    return results
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='修订日志体积与重建耗时')
+    parser.add_argument('--districts', type=int, default=100)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--revisions', type=int, default=3, help='每次爬取每个区域被修订的历史月份数')
+    args = parser.parse_args()
+
+    quiet_logging()
+    rng = random.Random(0)
+    crawl_data = synthetic_crawl_data(synthetic_cities(args.districts), args.months)
+    start = datetime(2026, 1, 1, 9, 0, 0)  # 晚于合成数据的爬取时间（基线）
+    expected = {}
+    full_copy_bytes = 0
+    with workspace(crawl_data), patched(hpr, REVISIONS_DIR='crawl_revisions'):
+        for run in range(args.runs):
+            # 每次运行追加一个月份，运行时间也按月推进，避免追加的月份晚于运行时间而被校验判为未来月份
+            run_time = start + timedelta(days=31 * run)
+            results = simulate_run(crawl_data, rng, args.revisions, run_time.strftime('%Y-%m-%d %H:%M:%S'))
+            # 以固定的运行时间写入，便于按运行重建
+            with patched(hpr, datetime=_FixedClock(run_time)):
+                hpr.persist_crawl_results(results)
+            crawl_data = hpr.load_existing_crawl_data()
+            full_copy_bytes += os.path.getsize('crawl_data.json')
+            expected[run_time.strftime('%Y-%m-%dT%H:%M:%S')] = crawl_data
+
+        log = hpr.RevisionLog()
+        log_bytes = directory_size('crawl_revisions')
+        runs = log.runs()
+        print(f'{args.districts}个区域, {args.runs}次运行, 每次每区域修订{args.revisions}个历史月份')
+        print(f'修订日志{log_bytes / 1024 / 1024:.2f}MB (含快照), 逐次保存完整文件{full_copy_bytes / 1024 / 1024:.2f}MB')
+
+        checks = [runs[1], runs[len(runs) // 2], runs[-1]]
+        for run in checks:
+            seconds, rebuilt = timed(lambda: log.rebuild_crawl_data(run), 3)
+            same = normalize(rebuilt) == normalize(expected[run])
+            print(f'重建截至{run}: {seconds * 1000:.1f}ms, 与当时数据一致: {same}')
+        full_replay, _ = timed(lambda: replay_all(log), 3)
+        print(f'对照: 不使用快照从头回放全部运行 {full_replay * 1000:.1f}ms')
+
+
+class _FixedClock:
+    """替换模块中的datetime，使修订日志记录指定的运行时间"""
+
+    def __init__(self, moment):
+        self.moment = moment
+
+    def now(self, tz=None):
+        return self.moment
+
+    def __getattr__(self, name):
+        return getattr(datetime, name)
+
+
+def replay_all(log):
+    state = {}
+    for segment in log._load_index()['segments']:
+        for record in log._read_records(os.path.join(log.segments_dir, segment['name'] + '.jsonl')):
+            hpr.apply_revision_deltas(state, record['deltas'])
+    for record in log._read_records(log.active_path):
+        hpr.apply_revision_deltas(state, record['deltas'])
+    return hpr.revision_state_to_crawl_data(state)
+
+
+def normalize(crawl_data):
+    return json.dumps(crawl_data, sort_keys=True, ensure_ascii=False, default=hpr.json_record)
+
+
+if __name__ == '__main__':
+    main()
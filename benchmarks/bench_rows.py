@@ -0,0 +1,86 @@
+"""
+月度数据行内存基准：用tracemalloc测量每行占用的内存，对比四个键的字典与MonthlyRow记录；
+另外测量从crawl_data.json加载、校验和写回的耗时
+
+用法: python benchmarks/bench_rows.py [--districts 1000] [--months 240]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, timed, workspace
+
+
+def traced(build):
+    """返回build()的结果及其保留的内存字节数"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def parsed_dicts(districts, months):
+    """与解析器原先的输出相同：每行一个字典，来源字符串逐行格式化"""
+    return [[{'month': f'{2025 - i // 12}-{12 - i % 12:02d}', 'second_hand_price': 30000.0 + i,
+              'new_house_price': 36000.0 + i, 'source': f'聚汇数据-{2025 - i // 12}年度页面'}
+             for i in range(months)] for _ in range(districts)]
+
+
+def parsed_records(districts, months):
+    return [[hpr.MonthlyRow(f'{2025 - i // 12}-{12 - i % 12:02d}', 30000.0 + i, 36000.0 + i,
+                            f'聚汇数据-{2025 - i // 12}年度页面')
+             for i in range(months)] for _ in range(districts)]
+
+
+def load_json_dicts():
+    with open('crawl_data.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='月度数据行的内存占用')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=240)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    quiet_logging()
+    rows = args.districts * args.months
+    print(f'{args.districts}个区域 × {args.months}个月 = {rows}行')
+    cases = [
+        ('解析结果', lambda: parsed_dicts(args.districts, args.months),
+         lambda: parsed_records(args.districts, args.months)),
+        ('加载crawl_data.json', load_json_dicts, hpr.load_existing_crawl_data),
+    ]
+    crawl_data = synthetic_crawl_data(synthetic_cities(args.districts), args.months)
+    with workspace(crawl_data):
+        del crawl_data
+        for name, old, new in cases:
+            _, old_size = traced(old)
+            _, new_size = traced(new)
+            print(f'{name:<18} 字典: {old_size / rows:6.1f}B/行  MonthlyRow: {new_size / rows:6.1f}B/行  '
+                  f'x{old_size / new_size:.1f}')
+
+        dict_load, dict_data = timed(load_json_dicts, args.repeat)
+        record_load, record_data = timed(hpr.load_existing_crawl_data, args.repeat)
+        print(f'加载耗时: 字典 {dict_load * 1000:.0f}ms, 转换为MonthlyRow {record_load * 1000:.0f}ms')
+
+        dict_results = [entry for districts in dict_data.values() for entry in districts.values()]
+        record_results = [entry for districts in record_data.values() for entry in districts.values()]
+        dict_validate, (dict_cleaned, _, _) = timed(lambda: hpr.validate_crawl_results(dict_results), args.repeat)
+        record_validate, (record_cleaned, _, _) = timed(lambda: hpr.validate_crawl_results(record_results),
+                                                         args.repeat)
+        print(f'校验耗时: 字典 {dict_validate * 1000:.0f}ms, MonthlyRow {record_validate * 1000:.0f}ms, '
+              f'结果一致: {dict_cleaned == record_cleaned}')
+        save_time, _ = timed(lambda: hpr.save_crawl_data(record_data, 'roundtrip.json'), args.repeat)
+        with open('roundtrip.json', 'r', encoding='utf-8') as f:
+            same = json.load(f) == load_json_dicts()
+        print(f'写回JSON: {save_time * 1000:.0f}ms, 与原文件内容一致: {same}')
+
+
+if __name__ == '__main__':
+    main()
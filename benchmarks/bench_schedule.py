@@ -0,0 +1,107 @@
+"""
+截止时间感知调度基准：用模拟时钟连续模拟多次预算不足的运行，对比固定登记顺序与按陈旧程度调度的
+覆盖率、最陈旧区域的天数、始终未更新的区域数和超出预算的次数，并检查耗时估计的误差
+
+用法: python benchmarks/bench_schedule.py [--districts 300] [--runs 12] [--budget-ratio 0.5]
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from common import hpr, quiet_logging, synthetic_cities, workspace
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate_units(units, rng):
+    """每个区域的真实平均耗时和失败概率：少数区域耗时很长，少数区域经常失败"""
+    profiles = {}
+    for unit in units:
+        seconds = rng.lognormvariate(2.0, 0.4) * (4 if rng.random() < 0.1 else 1)
+        failure = 0.5 if rng.random() < 0.1 else 0.02
+        profiles[unit] = (seconds, failure)
+    return profiles
+
+
+def run_fixed(units, profiles, budget, freshness, day, rng):
+    """旧做法：按登记顺序爬取，超出时限时任务被终止，剩余区域全部未爬取"""
+    elapsed, ok_count = 0.0, 0
+    for unit in units:
+        seconds, failure = profiles[unit]
+        elapsed += seconds * rng.lognormvariate(0, 0.2)
+        if elapsed > budget:
+            return ok_count, True
+        if rng.random() >= failure:
+            ok_count += 1
+            freshness[unit] = (day.strftime('%Y-%m-%d %H:%M:%S'), hpr.shift_month(day.strftime('%Y-%m'), -1))
+    return ok_count, False
+
+
+def run_scheduled(units, profiles, budget, freshness, day, rng, stats_path):
+    clock = FakeClock()
+    scheduler = hpr.CrawlScheduler(units, budget=budget, freshness=freshness, stats_path=stats_path,
+                                   now=day, clock=clock)
+    ok_count = 0
+    for unit in scheduler:
+        seconds, failure = profiles[unit]
+        clock.now += seconds * rng.lognormvariate(0, 0.2)
+        ok = rng.random() >= failure
+        scheduler.record(*unit, ok)
+        if ok:
+            ok_count += 1
+            freshness[unit] = (day.strftime('%Y-%m-%d %H:%M:%S'), hpr.shift_month(day.strftime('%Y-%m'), -1))
+    scheduler.save()
+    return ok_count, clock.now > budget, scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='截止时间感知的爬取调度')
+    parser.add_argument('--districts', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=12)
+    parser.add_argument('--budget-ratio', type=float, default=0.5, help='时间预算占全部区域平均耗时之和的比例')
+    args = parser.parse_args()
+
+    quiet_logging()
+    rng = random.Random(0)
+    units = [(city, district) for city, districts in synthetic_cities(args.districts).items() for district in districts]
+    profiles = simulate_units(units, rng)
+    budget = args.budget_ratio * sum(seconds for seconds, _ in profiles.values())
+    start = datetime(2025, 10, 1, 9, 0, 0)
+    initial = (start - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    print(f'{len(units)}个区域, 预算{budget:.0f}s (平均耗时之和的{args.budget_ratio:.0%}), 连续{args.runs}次运行')
+
+    with workspace():
+        stats_path = os.path.abspath('crawl_stats.json')
+        for name in ('固定顺序', '陈旧优先'):
+            freshness = {unit: (initial, '2025-09') for unit in units}
+            updated, covered, overruns, scheduler = set(), 0, 0, None
+            for run in range(args.runs):
+                day = start + timedelta(days=run)
+                before = dict(freshness)
+                if name == '固定顺序':
+                    ok_count, overrun = run_fixed(units, profiles, budget, freshness, day, rng)
+                else:
+                    ok_count, overrun, scheduler = run_scheduled(units, profiles, budget, freshness, day, rng,
+                                                                 stats_path)
+                covered += ok_count
+                overruns += overrun
+                updated.update(unit for unit in units if freshness[unit] != before[unit])
+            end = start + timedelta(days=args.runs)
+            oldest = max(hpr.staleness_days(*freshness[unit], now=end) for unit in units)
+            print(f'{name}: 平均覆盖{covered / args.runs / len(units):.1%}, 最陈旧区域{oldest:.1f}天, '
+                  f'从未更新{len(units) - len(updated)}个区域, 超出预算{overruns}次')
+
+        errors = [abs(scheduler.estimate(*unit) - profiles[unit][0]) / profiles[unit][0]
+                  for unit in units if scheduler._unit_stats(*unit)]
+        print(f'耗时估计: {len(errors)}个区域有历史, 相对误差中位数{sorted(errors)[len(errors) // 2]:.1%}')
+
+
+if __name__ == '__main__':
+    main()
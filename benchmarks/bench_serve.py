@@ -0,0 +1,120 @@
+"""
+数据API压测：在临时目录中以合成数据启动serve模式的服务，多个保持连接的客户端线程
+按接口混合发起请求，报告每秒请求数和延迟分位数；另外校验条件请求和存储变化后的自动重新加载
+
+用法: python benchmarks/bench_serve.py [--districts 1000] [--clients 8] [--duration 5]
+"""
+import argparse
+import http.client
+import random
+import threading
+import time
+from urllib.parse import quote
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, workspace
+
+
+def load_test(port, paths, clients, duration, headers):
+    """clients个线程在duration秒内循环请求，返回(总请求数, 延迟列表, 非200/304响应数)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            started = time.perf_counter()
+            conn.request('GET', path, headers=headers(path))
+            response = conn.getresponse()
+            response.read()
+            local.append(time.perf_counter() - started)
+            if response.status not in (200, 304):
+                failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), time.perf_counter() - started, latencies, errors[0]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def fetch(port, path, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('GET', path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据API吞吐与延迟')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0, help='每种请求方式的压测时长（秒）')
+    args = parser.parse_args()
+
+    quiet_logging()
+    cities = synthetic_cities(args.districts)
+    crawl_data = synthetic_crawl_data(cities, args.months)
+    # 大部分请求取单个区域，少量请求取城市列表和摘要
+    paths = [quote(f'/series/{city}/{district}') for city, districts in cities.items() for district in districts]
+    paths += ['/cities'] * max(1, len(paths) // 20) + ['/summary'] * max(1, len(paths) // 20)
+
+    with workspace(crawl_data):
+        server = hpr.DataApiServer(('127.0.0.1', 0), reload_interval=0.2)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            etags = {}
+            for path in set(paths):
+                etags[path] = fetch(port, path, {'Accept-Encoding': 'gzip'})[0].getheader('ETag')
+            _, plain = fetch(port, '/summary')
+            _, packed = fetch(port, '/summary', {'Accept-Encoding': 'gzip'})
+            print(f'{args.districts}个区域 × {args.months}个月, {args.clients}个客户端, 每项{args.duration:.0f}s')
+            print(f'/summary响应 {len(plain) / 1024:.1f}KB, gzip后 {len(packed) / 1024:.1f}KB')
+
+            modes = [
+                ('未压缩', lambda path: {}),
+                ('gzip', lambda path: {'Accept-Encoding': 'gzip'}),
+                ('条件请求(304)', lambda path: {'Accept-Encoding': 'gzip', 'If-None-Match': etags[path]}),
+            ]
+            for name, headers in modes:
+                count, seconds, latencies, errors = load_test(port, paths, args.clients, args.duration, headers)
+                print(f'{name:<12} {count / seconds:>8.0f} req/s  p50 {percentile(latencies, 0.5) * 1000:.2f}ms  '
+                      f'p99 {percentile(latencies, 0.99) * 1000:.2f}ms  错误 {errors}')
+
+            # 修改存储文件后，后台线程应在检查间隔内加载新数据，ETag随之变化
+            first_city = next(iter(cities))
+            target = f'/series/{first_city}/{cities[first_city][0]}'
+            before = fetch(port, quote(target))[0].getheader('ETag')
+            crawl_data[first_city][cities[first_city][0]]['monthly_data'][0]['second_hand_price'] += 1
+            hpr.save_crawl_data(crawl_data)
+            changed_at = time.perf_counter()
+            while fetch(port, quote(target))[0].getheader('ETag') == before and time.perf_counter() - changed_at < 10:
+                time.sleep(0.05)
+            reloaded = fetch(port, quote(target))[0].getheader('ETag') != before
+            print(f'存储变化后重新加载: {reloaded}, 用时{time.perf_counter() - changed_at:.2f}s')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
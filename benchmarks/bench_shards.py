@@ -0,0 +1,89 @@
+"""
+分片爬取基准：用N个本地进程并行执行 crawl --shard i/N，合并后与单进程结果比较；
+另检查同一区域出现在两个分片时，只有其中一个分片包含的月份在合并后仍然保留
+
+用法: python benchmarks/bench_shards.py [--shards 1,2,4] [--latency 0.05]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import REPO_ROOT, hpr, patched, quiet_logging, workspace
+from stub_server import start_stub_server
+
+SCRIPT = os.path.join(REPO_ROOT, 'house_price_report.py')
+
+
+def run_sharded(shard_count, base_url):
+    """启动shard_count个爬取进程，等待全部完成后合并，返回(耗时, 合并后的数据)"""
+    env = dict(os.environ, GOTOHUI_BASE_URL=base_url, CRAWL_DELAY_SCALE='0', HOUSE_PRICE_LOG_LEVEL='WARNING')
+    with workspace():
+        start = time.perf_counter()
+        procs = [subprocess.Popen([sys.executable, SCRIPT, 'crawl', '--shard', f'{i}/{shard_count}'], env=env)
+                 for i in range(shard_count)]
+        codes = [p.wait() for p in procs]
+        if any(codes):
+            raise RuntimeError(f'分片进程失败: {codes}')
+        partials = [hpr.shard_store_path(i, shard_count) for i in range(shard_count)]
+        merge = subprocess.run([sys.executable, SCRIPT, 'merge', *partials], env=env)
+        if merge.returncode:
+            raise RuntimeError('合并失败')
+        elapsed = time.perf_counter() - start
+        with open('crawl_data.json', 'r', encoding='utf-8') as f:
+            merged = json.load(f)
+    return elapsed, merged
+
+
+def fingerprint(crawl_data):
+    """去掉爬取时间后的内容指纹，用于比较不同分片数下的结果是否一致"""
+    return sorted(
+        (city, district, json.dumps(entry['monthly_data'], sort_keys=True, ensure_ascii=False))
+        for city, districts in crawl_data.items() for district, entry in districts.items()
+    )
+
+
+def check_partial_months():
+    """两个分片包含同一区域的不同月份（重叠月份一致），合并后应包含两者的全部月份"""
+    rows = [{'month': f'2025-{month:02d}', 'second_hand_price': 50000 + month, 'new_house_price': None,
+             'source': '2025年'} for month in range(9, 0, -1)]
+    partials = {'older.json': ('2025-10-01 08:00:00', rows[3:]), 'newer.json': ('2025-10-02 08:00:00', rows[:6])}
+    with workspace():
+        for path, (crawl_time, monthly) in partials.items():
+            entry = {'city': '北京', 'district': '朝阳', 'current_price': monthly[0]['second_hand_price'],
+                     'monthly_data': monthly, 'source': '聚汇数据-月度', 'crawl_time': crawl_time}
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'北京': {'朝阳': entry}}, f, ensure_ascii=False)
+        with patched(hpr, REVISIONS_DIR=''):
+            hpr.merge_partial_stores(list(partials))
+        with open('crawl_data.json', 'r', encoding='utf-8') as f:
+            entry = json.load(f)['北京']['朝阳']
+    return [row['month'] for row in entry['monthly_data']] == [row['month'] for row in rows] and \
+        entry['crawl_time'] == '2025-10-02 08:00:00'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分片爬取基准')
+    parser.add_argument('--shards', default='1,2,4')
+    parser.add_argument('--latency', type=float, default=0.05, help='桩服务器每请求延迟（秒），模拟网络往返')
+    args = parser.parse_args()
+
+    quiet_logging()
+    print(f'仅单个分片包含的月份在合并后保留: {check_partial_months()}')
+    server, base_url = start_stub_server(latency=args.latency)
+    try:
+        reference = None
+        for shard_count in (int(n) for n in args.shards.split(',')):
+            elapsed, merged = run_sharded(shard_count, base_url)
+            districts = sum(len(d) for d in merged.values())
+            same = reference is None or fingerprint(merged) == reference
+            reference = reference or fingerprint(merged)
+            print(f'{shard_count}个分片: {elapsed:.2f}s, 合并{districts}个区域, 与单分片结果一致: {same}')
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+静态站点基准：按进程数对比区域页面的并行渲染耗时，并输出页面大小
+
+用法: python benchmarks/bench_site.py [--districts 2000] [--workers 1,2,4]
+"""
+import argparse
+import os
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, timed, to_all_data, workspace
+
+
+def main():
+    parser = argparse.ArgumentParser(description='静态站点并行渲染')
+    parser.add_argument('--districts', type=int, default=2000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}')
+    args = parser.parse_args()
+
+    quiet_logging()
+    all_data = to_all_data(synthetic_crawl_data(synthetic_cities(args.districts), args.months))
+    print(f'{args.districts}个区域 × {args.months}个月, CPU核数{os.cpu_count()}')
+    for workers in sorted({int(n) for n in args.workers.split(',')}):
+        with workspace():
+            seconds, report = timed(lambda: hpr.generate_static_site(all_data, 'site', workers))
+        print(f'{workers}个进程: {seconds:.3f}s, {report["pages"]}个页面, 平均{report["page_bytes"]["mean"] / 1024:.1f}KB, '
+              f'索引页{report["index_bytes"] / 1024:.1f}KB, 共享资源{sum(report["assets"].values()) / 1024:.1f}KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+数据存储基准：JSON文件与SQLite后端在整批写入、单区域写入、单区域读取、摘要查询和全量导出上的耗时
+
+用法: python benchmarks/bench_store.py [--districts 500] [--months 240]
+"""
+import argparse
+
+from common import hpr, patched, quiet_logging, registry, synthetic_cities, synthetic_crawl_data, timed, workspace
+
+
+def run_backend(backend, crawl_data, cities, repeat):
+    entries = [entry for districts in crawl_data.values() for entry in districts.values()]
+    target = entries[len(entries) // 2]
+    results = {}
+    with workspace(), registry(cities), patched(hpr, STORE_BACKEND=backend):
+        results['整批写入'], _ = timed(lambda: hpr.persist_crawl_results(entries))
+        results['单区域写入'], _ = timed(lambda: hpr.persist_crawl_results([target]), repeat)
+        results['单区域读取'], _ = timed(lambda: hpr.load_district_entry(target['city'], target['district']), repeat)
+        results['城市均价摘要'], _ = timed(hpr.compute_city_averages, repeat)
+        results['全量导出'], _ = timed(hpr.load_crawl_data, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON与SQLite存储对比')
+    parser.add_argument('--districts', type=int, default=500)
+    parser.add_argument('--months', type=int, default=240)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    quiet_logging()
+    cities = synthetic_cities(args.districts)
+    crawl_data = synthetic_crawl_data(cities, args.months)
+    timings = {backend: run_backend(backend, crawl_data, cities, args.repeat) for backend in ('json', 'sqlite')}
+
+    print(f'{args.districts}个区域 × {args.months}个月')
+    print(f'{"操作":<10}{"JSON":>12}{"SQLite":>12}')
+    for name in timings['json']:
+        print(f'{name:<10}{timings["json"][name] * 1000:>10.2f}ms{timings["sqlite"][name] * 1000:>10.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+数据校验基准：整批向量化校验的耗时，以及注入的异常行（单位错误、尖峰、重复月份、无效月份）是否全部被识别
+
+用法: python benchmarks/bench_validate.py [--districts 1000] [--months 240] [--faults 500]
+"""
+import argparse
+import copy
+import random
+
+from common import hpr, quiet_logging, synthetic_cities, synthetic_crawl_data, timed
+
+
+def inject_faults(results, count, rng):
+    """随机向结果中注入异常行，返回期望被拒绝的(区域索引, 月份)集合"""
+    expected = set()
+    kinds = ['unit', 'spike', 'duplicate', 'month']
+    while len(expected) < count:
+        unit = rng.randrange(len(results))
+        monthly = results[unit]['monthly_data']
+        index = rng.randrange(1, len(monthly) - 1)
+        row = monthly[index]
+        key = (unit, row['month'])
+        # 相邻行已被修改时跳过，避免两个异常互相掩盖
+        if any((unit, monthly[i]['month']) in expected for i in (index - 1, index, index + 1)):
+            continue
+        kind = rng.choice(kinds)
+        if kind == 'unit':
+            row['second_hand_price'] = round(row['second_hand_price'] * 100, 2)
+        elif kind == 'spike':
+            row['second_hand_price'] = round(row['second_hand_price'] * rng.choice([0.6, 1.5]), 2)
+        elif kind == 'duplicate':
+            monthly.append(dict(row, second_hand_price=row['second_hand_price'] + 1, source='聚汇数据-1999年度页面'))
+        else:
+            monthly.append(dict(row, month=row['month'][:5] + '13'))
+            key = (unit, row['month'][:5] + '13')
+        expected.add(key)
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='向量化数据校验')
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=240)
+    parser.add_argument('--faults', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    quiet_logging()
+    rng = random.Random(0)
+    crawl_data = synthetic_crawl_data(synthetic_cities(args.districts), args.months)
+    results = [entry for districts in crawl_data.values() for entry in districts.values()]
+
+    seconds, (_, clean_report, _) = timed(lambda: hpr.validate_crawl_results(results), args.repeat)
+    rows = clean_report['rows']
+    print(f'{args.districts}个区域 × {args.months}个月 = {rows}行')
+    print(f'正常数据: {seconds * 1000:.1f}ms ({rows / seconds / 1e6:.2f}M行/秒), 误判{rows - clean_report["kept"]}行')
+
+    faulty = copy.deepcopy(results)
+    expected = inject_faults(faulty, args.faults, rng)
+    seconds, (_, report, rejected) = timed(lambda: hpr.validate_crawl_results(faulty), args.repeat)
+    positions = {id(result): unit for unit, result in enumerate(faulty)}
+    found = {(positions[id(result)], row['month']) for result, row, _ in rejected}
+    print(f'注入{len(expected)}个异常: {seconds * 1000:.1f}ms, 识别{len(expected & found)}个, '
+          f'漏判{len(expected - found)}个, 误判{len(found - expected)}个')
+    print(f'拒绝原因: {report["rejected"]}')
+
+
+if __name__ == '__main__':
+    main()
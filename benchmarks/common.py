@@ -0,0 +1,156 @@
+"""
+基准测试公共工具：导入被测脚本、加载录制页面、构造合成区域数据
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import house_price_report as hpr  # noqa: E402
+from stub_server import YEARS_DIR  # noqa: E402
+
+
+def quiet_logging(level=logging.WARNING):
+    """基准测试期间压低脚本日志级别，避免终端I/O干扰计时"""
+    hpr.setup_logging(level)
+
+
+def load_fixture_soups():
+    """加载全部录制的年度页面，返回[(year, soup), ...]"""
+    soups = []
+    for code in sorted(os.listdir(YEARS_DIR)):
+        for name in sorted(os.listdir(os.path.join(YEARS_DIR, code))):
+            with open(os.path.join(YEARS_DIR, code, name), 'r', encoding='utf-8') as f:
+                soups.append((int(name[:4]), BeautifulSoup(f.read(), 'html.parser')))
+    return soups
+
+
+def synthetic_monthly_data(seed, months=60, end_year=2025, end_month=9):
+    """生成一个区域的合成月度数据，格式与crawl_data.json中monthly_data一致"""
+    base = 20000 + (seed * 7919) % 60000
+    rows = []
+    year, month = end_year, end_month
+    for i in range(months):
+        price = base * (1 + 0.002 * ((i * 13 + seed) % 17 - 8))
+        rows.append({
+            'month': f'{year}-{month:02d}',
+            'second_hand_price': round(price, 2),
+            'new_house_price': round(price * 1.25, 2),
+            'source': f'聚汇数据-{year}年度页面',
+        })
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return rows
+
+
+def synthetic_cities(n_districts, n_cities=None):
+    """把n个合成区域分配到若干城市，第一个城市固定为北京以兼容默认图表"""
+    n_cities = n_cities or max(1, min(50, n_districts // 10))
+    names = ['北京'] + [f'城市{i:02d}' for i in range(1, n_cities)]
+    cities = {name: [] for name in names}
+    for i in range(n_districts):
+        cities[names[i % n_cities]].append(f'区域{i:04d}')
+    return {city: districts for city, districts in cities.items() if districts}
+
+
+def synthetic_registry(cities):
+    """为合成城市/区域构造带编码的登记表，编码可被桩服务器解析"""
+    return hpr.CityRegistry(synthetic_registry_entries(cities))
+
+
+def synthetic_registry_entries(cities):
+    """合成登记表的城市条目，与city_registry.json中cities的格式一致"""
+    entries = []
+    code = 100000
+    for index, (city, districts) in enumerate(cities.items()):
+        city_entry = {'name': city, 'code': str(900 + index), 'districts': []}
+        for district in districts:
+            code += 1
+            city_entry['districts'].append({'name': district, 'code': str(code)})
+        entries.append(city_entry)
+    return entries
+
+
+@contextlib.contextmanager
+def registry(cities):
+    """临时以合成城市/区域替换脚本的登记表"""
+    with patched(hpr, REGISTRY=synthetic_registry(cities), CITIES=cities):
+        yield
+
+
+def synthetic_crawl_data(cities, months=60):
+    """按crawl_data.json的结构为所有合成区域生成数据"""
+    crawl_data = {}
+    seed = 0
+    for city, districts in cities.items():
+        crawl_data[city] = {}
+        for district in districts:
+            seed += 1
+            monthly = synthetic_monthly_data(seed, months)
+            crawl_data[city][district] = {
+                'city': city,
+                'district': district,
+                'current_price': monthly[0]['second_hand_price'],
+                'monthly_data': monthly,
+                'source': '聚汇数据-月度',
+                'crawl_time': '2025-10-11 18:00:00',
+            }
+    return crawl_data
+
+
+def to_all_data(crawl_data):
+    """把crawl_data结构转换为generate_simplified_house_price_html接受的all_data结构"""
+    return {
+        city: {district: [{'monthly_data': entry['monthly_data']}] for district, entry in districts.items()}
+        for city, districts in crawl_data.items()
+    }
+
+
+@contextlib.contextmanager
+def workspace(crawl_data=None):
+    """在临时目录中运行，避免读写仓库中的crawl_data.json和报告文件"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='hpr-bench-') as tmp:
+        os.chdir(tmp)
+        try:
+            if crawl_data is not None:
+                with open('crawl_data.json', 'w', encoding='utf-8') as f:
+                    json.dump(crawl_data, f, ensure_ascii=False)
+            yield tmp
+        finally:
+            os.chdir(previous)
+
+
+@contextlib.contextmanager
+def patched(obj, **attrs):
+    """临时替换模块属性（如REGISTRY、GOTOHUI_BASE_URL），结束后恢复"""
+    saved = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield obj
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+
+
+def timed(func, repeat=1):
+    """执行func若干次，返回最短耗时（秒）和最后一次的返回值"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
@@ -0,0 +1,180 @@
+"""
+离线基准测试：爬取 → 解析 → 图表 → HTML 全流程及各阶段耗时
+
+所有网络请求指向本地桩服务器，结果写入JSON，并与基线比较：
+任一指标比基线慢超过阈值即以非零状态退出。
+
+用法:
+    python benchmarks/run_benchmarks.py                     # 运行并与baseline.json比较
+    python benchmarks/run_benchmarks.py --update-baseline   # 以本次结果更新基线
+    python benchmarks/run_benchmarks.py --scales 1,10,100 --latency 0.02 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+from common import (BENCH_DIR, hpr, load_fixture_soups, patched, quiet_logging, registry,
+                    synthetic_cities, synthetic_crawl_data, timed, to_all_data, workspace)
+from stub_server import start_stub_server
+
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results', 'latest.json')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+def bench_parse(repeat):
+    """解析阶段：解析全部录制页面"""
+    soups = load_fixture_soups()
+    seconds, rows = timed(lambda: sum(len(hpr.extract_monthly_data_from_page(s, y)) for y, s in soups), repeat)
+    return {'seconds': seconds, 'pages': len(soups), 'rows': rows}
+
+
+def bench_crawl(base_url):
+    """爬取阶段：对桩服务器爬取登记表中全部城市区域（含解析与落盘）"""
+    with workspace(), patched(hpr, GOTOHUI_BASE_URL=base_url, CRAWL_DELAY_SCALE=0):
+        pairs = list(hpr.REGISTRY.units())
+        seconds, results = timed(lambda: [hpr.crawl_juhui_house_price_data(c, d) for c, d in pairs])
+    return {'seconds': seconds, 'districts': len(pairs), 'ok': sum(1 for r in results if r)}
+
+
+def bench_crawl_scaled(base_url, cities):
+    """爬取阶段扩展性：对合成登记表中的全部区域爬取"""
+    with workspace(), registry(cities), patched(hpr, GOTOHUI_BASE_URL=base_url, CRAWL_DELAY_SCALE=0):
+        pairs = list(hpr.REGISTRY.units())
+        seconds, results = timed(lambda: [hpr.crawl_juhui_house_price_data(c, d) for c, d in pairs])
+    return {'seconds': seconds, 'districts': len(pairs), 'ok': sum(1 for r in results if r)}
+
+
+def bench_chart(crawl_data, cities, limit):
+    """图表阶段：为前limit个区域生成Plotly图表数据（数据集仍为全部区域）"""
+    all_data = to_all_data(crawl_data)
+    pairs = [(city, district) for city, districts in cities.items() for district in districts][:limit]
+    with workspace(crawl_data), registry(cities):
+        seconds, _ = timed(lambda: [hpr.generate_plotly_chart_html(all_data, c, d) for c, d in pairs])
+    return {'seconds': seconds, 'districts': len(pairs)}
+
+
+def bench_html(crawl_data, cities, repeat):
+    """HTML阶段：基于已有数据生成报告页面"""
+    all_data = to_all_data(crawl_data)
+    # 静态图表图片由bench_charts.py单独计时
+    with workspace(crawl_data), registry(cities), patched(hpr, CHART_IMAGE_FORMAT=''):
+        # 强制重建，否则重复计时会命中内容哈希而成为空构建
+        seconds, path = timed(lambda: hpr.generate_simplified_house_price_html(all_data, force=True), repeat)
+        size = os.path.getsize(path)
+    return {'seconds': seconds, 'districts': sum(len(d) for d in cities.values()), 'bytes': size}
+
+
+def bench_full(base_url):
+    """完整流程：爬取全部区域并生成报告（不含静态图表图片）"""
+    with workspace(), patched(hpr, GOTOHUI_BASE_URL=base_url, CRAWL_DELAY_SCALE=0, CHART_IMAGE_FORMAT=''):
+        seconds, _ = timed(lambda: hpr.generate_simplified_house_price_html())
+    return {'seconds': seconds}
+
+
+def run_all(args):
+    results = {}
+    # 预热Plotly的延迟导入，避免首个图表计时包含模块加载
+    hpr.go.Figure(hpr.go.Scatter(x=[1], y=[1])).to_dict()
+    server, base_url = start_stub_server(latency=args.latency, jitter=args.jitter,
+                                         error_rate=args.error_rate, seed=args.seed)
+    try:
+        results['parse'] = bench_parse(args.repeat)
+        results['crawl'] = bench_crawl(base_url)
+        if not args.skip_full:
+            results['full'] = bench_full(base_url)
+        for n in args.crawl_scales:
+            results[f'scale.{n}.crawl'] = bench_crawl_scaled(base_url, synthetic_cities(n))
+        stub_stats = dict(server.RequestHandlerClass.stats)
+    finally:
+        server.shutdown()
+
+    for n in args.scales:
+        cities = synthetic_cities(n)
+        crawl_data = synthetic_crawl_data(cities)
+        results[f'scale.{n}.chart'] = bench_chart(crawl_data, cities, args.chart_limit)
+        results[f'scale.{n}.html'] = bench_html(crawl_data, cities, args.repeat)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+            'stub': stub_stats,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold, min_seconds):
+    """逐项比较耗时，返回回归列表[(name, baseline_s, current_s, ratio)]"""
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        now = current['results'].get(name)
+        if not now:
+            continue
+        ratio = now['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        if ratio > 1 + threshold and now['seconds'] - base['seconds'] > min_seconds:
+            regressions.append((name, base['seconds'], now['seconds'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='房价报告离线基准测试')
+    parser.add_argument('--scales', default='1,10,100,1000', help='合成区域数量，逗号分隔')
+    parser.add_argument('--crawl-scales', default='1,10,100', help='爬取扩展性测试的合成区域数量')
+    parser.add_argument('--latency', type=float, default=0.0, help='桩服务器每请求延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='桩服务器随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='桩服务器返回503的概率')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chart-limit', type=int, default=100, help='每个规模下最多计时的图表数量')
+    parser.add_argument('--repeat', type=int, default=3, help='快速阶段重复次数（取最短）')
+    parser.add_argument('--skip-full', action='store_true', help='跳过完整流程计时')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25, help='允许的相对变慢比例')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='忽略小于该绝对差值的波动')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+    args.scales = [int(n) for n in args.scales.split(',') if n]
+    args.crawl_scales = [int(n) for n in args.crawl_scales.split(',') if n]
+
+    quiet_logging()
+    report = run_all(args)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, item in report['results'].items():
+        extra = ', '.join(f'{k}={v}' for k, v in item.items() if k != 'seconds')
+        print(f'{name:<22} {item["seconds"]:>9.4f}s  {extra}')
+    print(f'结果已写入 {args.output}')
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'基线已更新: {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('未找到基线文件，跳过回归比较（可使用 --update-baseline 生成）')
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold, args.min_seconds)
+    for name, before, after, ratio in regressions:
+        print(f'❌ 性能回归 {name}: {before:.4f}s → {after:.4f}s (x{ratio:.2f})')
+    if regressions:
+        return 1
+    print(f'✅ 无超过{args.threshold:.0%}的性能回归')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+聚汇数据本地桩服务器：回放录制的年度页面，支持可配置的延迟与错误率
+
+录制页面位于 fixtures/years/{区域编码}/{年份}.html，未录制的区域/年份
+按区域编码确定性地从录制页面派生（价格按编码缩放、月份替换为目标年份），
+因此任意数量的合成区域都能得到结构一致的页面。
+
+单独运行: python benchmarks/stub_server.py --port 8765 --latency 0.05 --error-rate 0.1
+代码调用: server, base_url = start_stub_server(latency=0.05)
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+YEARS_DIR = os.path.join(FIXTURES_DIR, 'years')
+
+_YEAR_PATH = re.compile(r'^/years/(\d+)/(\d{4})/?$')
+_ROW = re.compile(r'<tr><td>(\d{4})-(\d{2})</td><td>(\d+)</td><td>([^<]*)</td><td>([^<]*)</td></tr>')
+
+
+def _code_factor(code):
+    """根据区域编码生成稳定的价格缩放系数（0.6~1.4）"""
+    digest = hashlib.md5(code.encode('utf-8')).digest()
+    return 0.6 + (digest[0] / 255) * 0.8
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _recorded_codes():
+    return sorted(os.listdir(YEARS_DIR))
+
+
+def render_year_page(code, year):
+    """返回指定区域编码和年份的年度页面HTML"""
+    recorded = os.path.join(YEARS_DIR, code, f'{year}.html')
+    if os.path.exists(recorded):
+        return _read(recorded)
+
+    codes = _recorded_codes()
+    base_code = codes[int(hashlib.md5(code.encode('utf-8')).hexdigest(), 16) % len(codes)]
+    base_dir = os.path.join(YEARS_DIR, base_code)
+    base_years = sorted(os.listdir(base_dir))
+    template = _read(os.path.join(base_dir, base_years[-1]))
+    factor = _code_factor(code)
+
+    def rewrite(match):
+        _, month, second, new, total = match.groups()
+        second = int(int(second) * factor)
+        new = str(int(int(new) * factor)) if new.isdigit() else new
+        return f'<tr><td>{year}-{month}</td><td>{second}</td><td>{new}</td><td>{total}</td></tr>'
+
+    page = _ROW.sub(rewrite, template)
+    return re.sub(r'\d{4}年', f'{year}年', page)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按配置注入延迟和5xx/429错误的请求处理器"""
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    throttle_rate = 0.0
+    rng = random.Random(0)
+    lock = threading.Lock()
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=''):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            roll = cls.rng.random()
+            delay = cls.latency + cls.rng.uniform(0, cls.jitter)
+            cls.stats['requests'] += 1
+        if delay > 0:
+            time.sleep(delay)
+
+        if roll < cls.error_rate:
+            with cls.lock:
+                cls.stats['errors'] += 1
+            return self._send(503, 'Service Unavailable')
+        if roll < cls.error_rate + cls.throttle_rate:
+            with cls.lock:
+                cls.stats['throttled'] += 1
+            return self._send(429, 'Too Many Requests')
+
+        path = self.path.split('?', 1)[0]
+        match = _YEAR_PATH.match(path)
+        if match:
+            return self._send(200, render_year_page(match.group(1), int(match.group(2))))
+        if path.startswith('/fjdata-'):
+            return self._send(200, _read(os.path.join(FIXTURES_DIR, 'city.html')))
+        return self._send(404, 'Not Found')
+
+
+def start_stub_server(latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                      port=0, seed=0):
+    """在后台线程启动桩服务器，返回(server, base_url)；调用server.shutdown()停止"""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {
+        'latency': latency,
+        'jitter': jitter,
+        'error_rate': error_rate,
+        'throttle_rate': throttle_rate,
+        'rng': random.Random(seed),
+        'lock': threading.Lock(),
+        'stats': {'requests': 0, 'errors': 0, 'throttled': 0},
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, bound_port = server.server_address[:2]
+    return server, f'http://{host}:{bound_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='聚汇数据本地桩服务器')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回503的概率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回429的概率')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.latency, args.jitter, args.error_rate,
+                                         args.throttle_rate, args.port, args.seed)
+    print(f'桩服务器已启动: {base_url} (GOTOHUI_BASE_URL={base_url})')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,22 @@ import requests
 import re
 from bs4 import BeautifulSoup
 import time
+import asyncio
 import random
+import logging
+import contextlib
+import threading
+import hashlib
+import functools
+import sqlite3
+import gzip
+import heapq
+import signal
+import sys
+from collections import Counter, namedtuple
+from collections.abc import Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
 
 
 # 导入plotly用于交互式图表
@@ -21,14 +36,328 @@ appSecret = os.environ.get("APP_SECRET")
 openId = os.environ.get("OPEN_ID")
 template_id = os.environ.get("TEMPLATE_ID")
 
-# 北上广深杭五个城市及其核心区域映射（精简版）
-CITIES = {
-    "北京": ["朝阳", "海淀", "西城", "东城", "丰台", "昌平", "顺义"],
-    "上海": ["浦东", "徐汇", "静安", "黄浦", "长宁"],
-    "广州": ["天河", "越秀", "海珠", "荔湾", "白云", "番禺"],
-    "深圳": ["福田", "罗湖", "南山", "宝安", "龙岗"],
-    "杭州": ["西湖", "上城", "余杭"]
-}
+# 日志记录器：逐行解析明细只在DEBUG级别输出，级别可由环境变量HOUSE_PRICE_LOG_LEVEL指定
+logger = logging.getLogger("house_price_report")
+
+# 单次运行的统计计数，运行结束时输出汇总
+RUN_STATS = Counter()
+
+def setup_logging(level=None):
+    """初始化日志输出，默认INFO级别"""
+    level = level or os.environ.get("HOUSE_PRICE_LOG_LEVEL", "INFO")
+    if isinstance(level, str):
+        level = getattr(logging, level.upper(), logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%H:%M:%S"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+def log_run_summary(started_at):
+    """输出本次运行的汇总统计"""
+    elapsed = time.perf_counter() - started_at
+    logger.info(
+        "运行汇总: 耗时%.1fs, 区域成功%d/失败%d, 页面请求%d次(失败%d), 解析%d行数据, 检查点恢复%d个区域",
+        elapsed,
+        RUN_STATS["district_ok"], RUN_STATS["district_failed"],
+        RUN_STATS["page_requests"], RUN_STATS["page_errors"],
+        RUN_STATS["rows_parsed"], RUN_STATS["checkpoint_hits"],
+    )
+    logger.info(
+        "限速汇总: 累计等待%.1fs, 当前速率%.2f次/秒, 熔断%d次, 熔断回退%d个区域",
+        RUN_STATS["limiter_wait_ms"] / 1000, GOTOHUI_LIMITER.rate,
+        RUN_STATS["breaker_trips"], RUN_STATS["breaker_fallbacks"],
+    )
+    logger.info("模拟数据回退: %d个区域（缓存命中%d次）, 数据校验隔离%d行",
+                RUN_STATS["mock_fallbacks"], RUN_STATS["mock_cache_hits"], RUN_STATS["rows_quarantined"])
+
+# 性能分析配置，由命令行 --profile / --profile-stage 设置
+PROFILE_CONFIG = {"backend": None, "stage": "all", "profiler": None}
+PROFILE_STAGES = ("all", "crawl", "chart", "html", "push")
+
+@contextlib.contextmanager
+def profile_stage(stage):
+    """在启用性能分析且阶段匹配时对代码块进行分析，同一阶段多次进入会累计到同一分析器"""
+    backend = PROFILE_CONFIG["backend"]
+    if not backend or PROFILE_CONFIG["stage"] != stage:
+        yield
+        return
+    profiler = PROFILE_CONFIG["profiler"]
+    if profiler is None:
+        if backend == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+        PROFILE_CONFIG["profiler"] = profiler
+    if backend == "pyinstrument":
+        profiler.start()
+    else:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if backend == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+
+def write_profile(report_path='house_price_report.html'):
+    """把分析结果写到报告文件旁：cProfile输出pstats文件，pyinstrument输出HTML火焰图"""
+    profiler = PROFILE_CONFIG["profiler"]
+    if profiler is None:
+        return None
+    base = os.path.splitext(report_path)[0]
+    suffix = "" if PROFILE_CONFIG["stage"] == "all" else f".{PROFILE_CONFIG['stage']}"
+    if PROFILE_CONFIG["backend"] == "pyinstrument":
+        output = f"{base}{suffix}.profile.html"
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+    else:
+        output = f"{base}{suffix}.prof"
+        profiler.dump_stats(output)
+    PROFILE_CONFIG["profiler"] = None
+    logger.info("性能分析结果已写入: %s", output)
+    return output
+
+# 聚汇数据站点根地址，基准测试时可指向本地桩服务器
+GOTOHUI_BASE_URL = os.environ.get("GOTOHUI_BASE_URL", "https://fangjia.gotohui.com").rstrip("/")
+
+# 限速等待的缩放系数，设为0可在离线基准测试中关闭等待
+CRAWL_DELAY_SCALE = float(os.environ.get("CRAWL_DELAY_SCALE", "1"))
+
+# 每个区域爬取的历史年数（聚汇数据按年度分页）
+CRAWL_HISTORY_YEARS = int(os.environ.get("CRAWL_HISTORY_YEARS", "5"))
+
+class CircuitOpenError(Exception):
+    """熔断器打开时拒绝发出请求"""
+
+class AdaptiveRateLimiter:
+    """
+    自适应令牌桶限速器（加性增、乘性减）
+    - 响应正常且快速时逐步提高速率
+    - 遇到429/5xx/网络错误时速率减半，响应过慢时适度降速
+    - 服务端给出Retry-After时在该时间内暂停发放令牌
+    """
+
+    def __init__(self, rate=1.0, min_rate=0.1, max_rate=4.0, burst=2.0,
+                 increase_step=0.1, slow_threshold=3.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.slow_threshold = slow_threshold
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，必要时等待；CRAWL_DELAY_SCALE为0时不等待"""
+        if CRAWL_DELAY_SCALE <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self.rate, self._paused_until - now)
+        if wait > 0:
+            # 少量抖动，避免请求间隔过于规律
+            wait = wait * CRAWL_DELAY_SCALE * random.uniform(1.0, 1.1)
+            RUN_STATS["limiter_wait_ms"] += int(wait * 1000)
+            time.sleep(wait)
+        return wait
+
+    def record(self, status_code, elapsed, retry_after=None):
+        """根据响应状态和耗时调整速率；status_code为None表示网络错误"""
+        with self._lock:
+            if status_code is None or status_code == 429 or status_code >= 500:
+                self.rate = max(self.min_rate, self.rate * 0.5)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif elapsed > self.slow_threshold:
+                self.rate = max(self.min_rate, self.rate * 0.8)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，冷却期内直接拒绝请求；
+    冷却结束后放行一次试探请求（半开），成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("聚汇数据连续失败%d次，熔断%.0f秒", self.failures, self.reset_timeout)
+                    RUN_STATS["breaker_trips"] += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+# 聚汇数据源共享的限速器和熔断器
+GOTOHUI_LIMITER = AdaptiveRateLimiter()
+GOTOHUI_BREAKER = CircuitBreaker()
+# 共享的HTTP会话：同一站点的连续请求复用连接池中的连接，daemon模式下跨多次爬取保持
+GOTOHUI_SESSION = requests.Session()
+
+def fetch_gotohui_page(url, headers, timeout=10):
+    """经限速器和熔断器发出请求，并把响应状态反馈给二者"""
+    if not GOTOHUI_BREAKER.allow():
+        raise CircuitOpenError(f"熔断中，跳过请求: {url}")
+    GOTOHUI_LIMITER.acquire()
+    RUN_STATS["page_requests"] += 1
+    started = time.monotonic()
+    try:
+        response = GOTOHUI_SESSION.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        GOTOHUI_LIMITER.record(None, time.monotonic() - started)
+        GOTOHUI_BREAKER.record_failure()
+        raise
+    elapsed = time.monotonic() - started
+    status = response.status_code
+    retry_after = response.headers.get('Retry-After')
+    retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+    GOTOHUI_LIMITER.record(status, elapsed, retry_after)
+    if status == 429 or status >= 500:
+        GOTOHUI_BREAKER.record_failure()
+    else:
+        GOTOHUI_BREAKER.record_success()
+    response.raise_for_status()
+    return response
+
+# 城市/区域登记表文件：城市页面编码、区域编码、模拟数据用的基准价和区域系数
+CITY_REGISTRY_FILE = os.environ.get(
+    "CITY_REGISTRY_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "city_registry.json"))
+
+class CityRegistry:
+    """
+    城市/区域登记表，导入时加载一次并建立索引：
+    - 按城市: city -> 城市信息（编码、基准价、有序区域列表）
+    - 按区域名: district -> [(city, district), ...]（不同城市可能重名）
+    - 按编码: 区域编码 -> (city, district)
+    """
+
+    def __init__(self, cities, default_base_price=30000):
+        self.default_base_price = default_base_price
+        self._cities = {}
+        self._districts = {}
+        self._by_district_name = {}
+        self._by_code = {}
+        for city in cities:
+            name = city['name']
+            if name in self._cities:
+                raise ValueError(f"登记表中城市重复: {name}")
+            self._cities[name] = {
+                'code': city.get('code'),
+                'base_price': city.get('base_price', default_base_price),
+                'districts': [d['name'] for d in city.get('districts', [])],
+            }
+            for district in city.get('districts', []):
+                key = (name, district['name'])
+                if key in self._districts:
+                    raise ValueError(f"登记表中区域重复: {name}-{district['name']}")
+                code = district.get('code')
+                if code is not None:
+                    if code in self._by_code:
+                        other = self._by_code[code]
+                        raise ValueError(f"区域编码{code}同时属于{other[0]}-{other[1]}和{name}-{district['name']}")
+                    self._by_code[code] = key
+                self._districts[key] = {'code': code, 'coefficient': district.get('coefficient', 1.0)}
+                self._by_district_name.setdefault(district['name'], []).append(key)
+
+    @classmethod
+    def load(cls, path=CITY_REGISTRY_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        return cls(raw['cities'], raw.get('default_base_price', 30000))
+
+    @classmethod
+    def from_city_districts(cls, city_districts):
+        """由{城市: [区域...]}构造登记表（无编码），用于合成数据和基准测试"""
+        return cls([{'name': city, 'districts': [{'name': d} for d in districts]}
+                    for city, districts in city_districts.items()])
+
+    def cities(self):
+        return list(self._cities)
+
+    def districts(self, city):
+        info = self._cities.get(city)
+        return list(info['districts']) if info else []
+
+    def units(self):
+        """按登记顺序遍历所有(城市, 区域)"""
+        for city, info in self._cities.items():
+            for district in info['districts']:
+                yield city, district
+
+    def default_city(self):
+        """报告页默认选中的城市：登记顺序中第一个有区域的城市，登记表中没有任何区域时为None"""
+        return next((city for city, info in self._cities.items() if info['districts']), None)
+
+    def city_districts(self):
+        """{城市: [区域...]}视图，用于页面下拉框"""
+        return {city: list(info['districts']) for city, info in self._cities.items()}
+
+    def city_code(self, city):
+        info = self._cities.get(city)
+        return info['code'] if info else None
+
+    def district_code(self, city, district):
+        info = self._districts.get((city, district))
+        return info['code'] if info else None
+
+    def base_price(self, city):
+        info = self._cities.get(city)
+        return info['base_price'] if info else self.default_base_price
+
+    def coefficient(self, city, district):
+        info = self._districts.get((city, district))
+        return info['coefficient'] if info else 1.0
+
+    def by_code(self, code):
+        return self._by_code.get(str(code))
+
+    def by_district_name(self, district):
+        return list(self._by_district_name.get(district, []))
+
+    def __contains__(self, city):
+        return city in self._cities
+
+    def __len__(self):
+        return len(self._districts)
+
+REGISTRY = CityRegistry.load()
+
+# 兼容旧代码的{城市: [区域...]}映射，内容来自登记表
+CITIES = REGISTRY.city_districts()
 
 # 获取北京时间
 def today_date():
@@ -70,81 +399,166 @@ def get_weeks_dates(start_date, weeks_count):
         dates.append(week_date)
     return dates
 
+def district_rng(city, district, purpose="mock"):
+    """
+    区域独立的随机数生成器：种子由(城市, 区域, 用途)的稳定哈希得到，
+    不依赖全局np.random状态，也不受PYTHONHASHSEED影响，可在多线程中并行使用
+    """
+    digest = hashlib.sha1(f"{purpose}/{city}/{district}".encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], 'big'))
+
 # 生成模拟房价数据
-def generate_mock_house_price_data(city, district, start_date, weeks_count):
-    base_prices = {
-        "北京": 60000,
-        "上海": 58000,
-        "广州": 32000,
-        "深圳": 55000,
-        "杭州": 40000
-    }
-    
-    district_coefficients = {
-        "朝阳": 1.2, "海淀": 1.3, "西城": 1.5, "东城": 1.4, "丰台": 0.9,
-        "浦东": 1.2, "徐汇": 1.4, "静安": 1.6, "黄浦": 1.5, "长宁": 1.3,
-        "天河": 1.3, "越秀": 1.2, "海珠": 1.1, "荔湾": 1.0, "白云": 0.8,
-        "福田": 1.4, "罗湖": 1.2, "南山": 1.5, "宝安": 0.9, "龙岗": 0.8,
-        "西湖": 1.3, "上城": 1.2, "余杭": 0.9
-    }
-    
+def generate_mock_house_price_data(city, district, start_date, weeks_count, rng=None):
     weeks = get_weeks_dates(start_date, weeks_count)
+    rng = rng if rng is not None else district_rng(city, district)
     
-    base_price = base_prices.get(city, 30000)
-    coefficient = district_coefficients.get(district, 1.0)
+    # 基准价和区域系数来自城市登记表
+    base_price = REGISTRY.base_price(city)
+    coefficient = REGISTRY.coefficient(city, district)
     price = base_price * coefficient
     
-    np.random.seed(42)
-    
-    trend = np.linspace(0, np.random.uniform(-0.1, 0.1), weeks_count)
+    trend = np.linspace(0, rng.uniform(-0.1, 0.1), weeks_count)
     seasonality = 0.03 * np.sin(np.linspace(0, 2 * np.pi * (weeks_count / 52), weeks_count))
-    random_noise = 0.02 * np.random.randn(weeks_count)
+    random_noise = 0.02 * rng.standard_normal(weeks_count)
     
     price_changes = 1 + trend + seasonality + random_noise
-    cumulative_changes = np.cumprod(price_changes)
-    
-    data = []
-    for i, week_date in enumerate(weeks):
-        current_price = price * cumulative_changes[i]
-        base_volume = 100
-        volume_factor = max(0.5, 1 - (current_price - price) / price * 0.5)
-        transaction_count = int(base_volume * volume_factor * (1 + 0.3 * np.random.randn()))
-        transaction_count = max(20, transaction_count)
-        
-        data.append({
-            "date": week_date.strftime("%Y-%m-%d"),
-            "average_price": round(current_price, 2),
-            "transaction_count": transaction_count
-        })
+    prices = price * np.cumprod(price_changes)
     
-    return data
+    base_volume = 100
+    volume_factors = np.maximum(0.5, 1 - (prices - price) / price * 0.5)
+    transaction_counts = np.maximum(20, (base_volume * volume_factors * (1 + 0.3 * rng.standard_normal(weeks_count))).astype(int))
+    
+    return [
+        {"date": week_date.strftime("%Y-%m-%d"), "average_price": round(float(current_price), 2),
+         "transaction_count": int(count)}
+        for week_date, current_price, count in zip(weeks, prices, transaction_counts)
+    ]
+
+# 月度数据行：流水线内部使用紧凑的__slots__记录代替四个键的字典，来源字符串驻留为整数编号、月份字符串驻留共享；
+# 记录实现只读映射接口（row['month']、row.get(...)），读取方不区分记录和字典，只在写出JSON时转换为字典
+SOURCE_NAMES = []  # 来源编号 -> 来源字符串
+SOURCE_IDS = {}  # 来源字符串 -> 编号
+_source_lock = threading.Lock()
+
+def intern_source(source):
+    """返回来源字符串的编号（进程内有效），None为-1"""
+    if source is None:
+        return -1
+    source_id = SOURCE_IDS.get(source)
+    if source_id is None:
+        with _source_lock:
+            source_id = SOURCE_IDS.get(source)
+            if source_id is None:
+                SOURCE_NAMES.append(source)
+                source_id = SOURCE_IDS[source] = len(SOURCE_NAMES) - 1
+    return source_id
+
+class MonthlyRow(Mapping):
+    """单个区域一个月的价格，键与crawl_data.json中的月度数据字典相同"""
+
+    __slots__ = ('month', 'second_hand_price', 'new_house_price', 'source_id')
+    FIELDS = ('month', 'second_hand_price', 'new_house_price', 'source')
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, month, second_hand_price, new_house_price=None, source=None):
+        self.month = sys.intern(month) if type(month) is str else month
+        self.second_hand_price = second_hand_price
+        self.new_house_price = new_house_price
+        self.source_id = intern_source(source)
+
+    @classmethod
+    def from_mapping(cls, row):
+        if type(row) is cls:
+            return row
+        return cls(row.get('month'), row.get('second_hand_price'), row.get('new_house_price'), row.get('source'))
+
+    @property
+    def source(self):
+        return SOURCE_NAMES[self.source_id] if self.source_id >= 0 else None
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._FIELD_SET else default
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __eq__(self, other):
+        if type(other) is MonthlyRow:
+            return (self.month == other.month and self.second_hand_price == other.second_hand_price
+                    and self.new_house_price == other.new_house_price and self.source_id == other.source_id)
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # 来源编号只在本进程内有效，跨进程传递时使用来源字符串
+        return MonthlyRow, (self.month, self.second_hand_price, self.new_house_price, self.source)
+
+    def __repr__(self):
+        return f"MonthlyRow({self.to_dict()!r})"
+
+    def replace(self, **changes):
+        values = self.to_dict()
+        values.update(changes)
+        return MonthlyRow(**values)
+
+    def to_dict(self):
+        return {'month': self.month, 'second_hand_price': self.second_hand_price,
+                'new_house_price': self.new_house_price, 'source': self.source}
+
+def monthly_rows(rows):
+    """把月度数据（字典或记录）转换为MonthlyRow列表"""
+    return [MonthlyRow.from_mapping(row) for row in rows or []]
+
+def compact_crawl_data(crawl_data):
+    """把crawl_data.json结构中各区域的monthly_data原地转换为MonthlyRow列表，返回crawl_data"""
+    for districts in crawl_data.values():
+        for entry in districts.values():
+            if isinstance(entry, dict) and entry.get('monthly_data'):
+                entry['monthly_data'] = monthly_rows(entry['monthly_data'])
+    return crawl_data
+
+def json_record(obj):
+    """json.dump(s)的default参数：写出JSON时把MonthlyRow转换为字典"""
+    if type(obj) is MonthlyRow:
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 def extract_monthly_data_from_page(soup, year):
     """
     从页面中提取月度数据 - 修正版本
     """
     monthly_data = []
+    # 逐行明细日志开销较大，只在DEBUG级别时生成
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     # 查找包含月度数据的表格
     tables = soup.find_all('table')
-    print(f"找到{len(tables)}个表格")
+    logger.debug("找到%d个表格", len(tables))
     
     for table in tables:
         # 查找表格标题或附近包含"二手房"、"新房"、"月份"等关键词
         table_text = table.get_text(strip=True)
         if any(keyword in table_text for keyword in ['二手房', '新房', '月份', '元/㎡']):
-            print("找到房价数据表格")
-            
             # 提取表格数据
             rows = table.find_all('tr')
-            print(f"表格有{len(rows)}行")
+            logger.debug("找到房价数据表格，共%d行", len(rows))
             
             # 跳过表头行（通常第一行是表头）
             data_rows = rows[1:] if len(rows) > 1 else rows
             
             for i, row in enumerate(data_rows):
                 cells = row.find_all(['td', 'th'])
-                print(f"第{i+1}行有{len(cells)}个单元格")
+                if debug:
+                    logger.debug("第%d行有%d个单元格", i + 1, len(cells))
                 
                 if len(cells) >= 3:  # 至少有序号、日期、二手房价格
                     # 提取数据
@@ -156,7 +570,9 @@ def extract_monthly_data_from_page(soup, year):
                         # 获取新房价格（第三列，如果有的话）
                         new_house_price = cells[2].get_text(strip=True) if len(cells) >= 3 else None
                         
-                        print(f"  原始数据: 月份={month_str}, 二手房价格={second_hand_price}, 新房价格={new_house_price}")
+                        if debug:
+                            logger.debug("  原始数据: 月份=%s, 二手房价格=%s, 新房价格=%s",
+                                         month_str, second_hand_price, new_house_price)
                         
                         # 检查月份格式 - 支持多种格式
                         month_match = None
@@ -187,16 +603,18 @@ def extract_monthly_data_from_page(soup, year):
                                     if new_price_match:
                                         new_house_price_value = float(new_price_match.group(1))
                                 
-                                monthly_data.append({
-                                    'month': month_match,
-                                    'second_hand_price': round(second_hand_price_value, 2),
-                                    'new_house_price': round(new_house_price_value, 2) if new_house_price_value else None,
-                                    'source': f'聚汇数据-{year}年度页面'
-                                })
-                                print(f"  成功提取: {month_match} - 二手房:{second_hand_price_value}, 新房:{new_house_price_value or '无'}")
+                                monthly_data.append(MonthlyRow(
+                                    month_match,
+                                    round(second_hand_price_value, 2),
+                                    round(new_house_price_value, 2) if new_house_price_value else None,
+                                    f'聚汇数据-{year}年度页面'
+                                ))
+                                if debug:
+                                    logger.debug("  成功提取: %s - 二手房:%s, 新房:%s",
+                                                 month_match, second_hand_price_value, new_house_price_value or '无')
                                 
                     except (ValueError, IndexError) as e:
-                        print(f"  解析失败: {e}")
+                        logger.debug("  解析失败: %s", e)
                         continue
             
             # 如果找到了数据，就不需要继续查找其他表格
@@ -205,7 +623,7 @@ def extract_monthly_data_from_page(soup, year):
     
     # 如果没有找到表格，尝试从页面文本中提取数据
     if not monthly_data:
-        print("未找到表格，尝试从页面文本提取数据")
+        logger.debug("未找到表格，尝试从页面文本提取数据")
         page_text = soup.get_text()
         
         # 查找格式：序号 日期 二手房价格 新房价格
@@ -219,42 +637,29 @@ def extract_monthly_data_from_page(soup, year):
         for pattern in patterns:
             matches = re.findall(pattern, page_text)
             if matches:
-                print(f"使用模式{pattern}找到{len(matches)}个匹配")
+                logger.debug("使用模式%s找到%d个匹配", pattern, len(matches))
                 for match in matches:
                     if len(match) == 4:  # 有序号+日期+二手房+新房
                         seq_num, date_str, second_hand_price_str, new_house_price_str = match
                         second_hand_price = float(second_hand_price_str)
                         new_house_price = float(new_house_price_str)
                         
-                        monthly_data.append({
-                            'month': date_str,
-                            'second_hand_price': round(second_hand_price, 2),
-                            'new_house_price': round(new_house_price, 2),
-                            'source': f'聚汇数据-{year}文本提取'
-                        })
+                        monthly_data.append(MonthlyRow(date_str, round(second_hand_price, 2),
+                                                       round(new_house_price, 2), f'聚汇数据-{year}文本提取'))
                     elif len(match) == 3:  # 有序号+日期+二手房
                         seq_num, date_str, price_str = match
                         price = float(price_str)
                         
-                        monthly_data.append({
-                            'month': date_str,
-                            'second_hand_price': round(price, 2),
-                            'new_house_price': None,
-                            'source': f'聚汇数据-{year}文本提取'
-                        })
+                        monthly_data.append(MonthlyRow(date_str, round(price, 2), None, f'聚汇数据-{year}文本提取'))
                     elif len(match) == 2:  # 只有日期+价格
                         date_str, price_str = match
                         price = float(price_str)
                         
-                        monthly_data.append({
-                            'month': date_str,
-                            'second_hand_price': round(price, 2),
-                            'new_house_price': None,
-                            'source': f'聚汇数据-{year}文本提取'
-                        })
+                        monthly_data.append(MonthlyRow(date_str, round(price, 2), None, f'聚汇数据-{year}文本提取'))
                 break
     
-    print(f"总共提取到{len(monthly_data)}条数据")
+    RUN_STATS["rows_parsed"] += len(monthly_data)
+    logger.debug("总共提取到%d条数据", len(monthly_data))
     return monthly_data
 
 # 聚汇数据房价获取函数（月度数据版）
@@ -262,65 +667,38 @@ def extract_monthly_data_from_page(soup, year):
 # 1. 使用了未定义的soup变量
 # 2. 会被后面的同名函数覆盖
 
-def crawl_juhui_house_price_data(city, district, max_retries=3):
+def _summarize_crawl_result(result):
+    """把写入crawl_data.json的区域结果转换为爬取函数的返回格式"""
+    if result.get('current_price') and result.get('monthly_data'):
+        return {
+            'average_price': result['current_price'],
+            'transaction_count': len(result['monthly_data']),
+            'monthly_data': result['monthly_data'],
+            'source': '聚汇数据-月度'
+        }
+    return None
+
+def crawl_juhui_house_price_data(city, district, max_retries=3, checkpoint=None, years=None):
     """
     从聚汇数据网站获取月度房价数据
     基于https://fangjia.gotohui.com/网站结构获取月度房价数据
     提取格式：序号 日期 二手房(元/㎡) 新房(元/㎡) 套均价(万元)
+    传入checkpoint时，已完成的区域/年份直接从检查点恢复，结果记入检查点而不是立即写文件
+    years指定只获取哪些年度页面（增量爬取），默认为近CRAWL_HISTORY_YEARS年
     """
-    # 聚汇数据网站基础URL - 城市页面
-    base_urls = {
-        "北京": "https://fangjia.gotohui.com/fjdata-1",
-        "上海": "https://fangjia.gotohui.com/fjdata-3", 
-        "广州": "https://fangjia.gotohui.com/fjdata-48",
-        "深圳": "https://fangjia.gotohui.com/fjdata-49",
-        "杭州": "https://fangjia.gotohui.com/fjdata-37"
-    }
-    
-    # 区域映射 - 聚汇数据的区域URL编码
-    district_mappings = {
-        "北京": {
-            "朝阳": "618",
-            "海淀": "613", 
-            "西城": "606",
-            "东城": "617",
-            "丰台": "614",
-            "昌平": "620",
-            "顺义": "608"
-        },
-        "上海": {
-            "浦东": "2491",
-            "徐汇": "2487",
-            "静安": "2496", 
-            "黄浦": "2497",
-            "长宁": "2500"
-        },
-        "广州": {
-            "天河": "873",
-            "越秀": "872",
-            "海珠": "878",
-            "荔湾": "876", 
-            "白云": "874"
-        },
-        "深圳": {
-            "福田": "953",
-            "罗湖": "951",
-            "南山": "950",
-            "宝安": "954",
-            "龙岗": "952",
-            "番禺": "874"
-        },
-        "杭州": {
-            "西湖": "3321",
-            "上城": "3323",
-            "余杭": "3319"
-        }
-    }
-    
-    if city not in base_urls:
-        print(f"暂不支持{city}的聚汇数据获取")
+    # 城市页面和区域编码均来自城市登记表
+    city_code = REGISTRY.city_code(city)
+    if city_code is None:
+        logger.warning("暂不支持%s的聚汇数据获取", city)
         return None
     
+    if checkpoint is not None:
+        finished = checkpoint.get_district(city, district)
+        if finished is not None:
+            logger.debug("%s-%s已在检查点中完成，跳过", city, district)
+            RUN_STATS["checkpoint_hits"] += 1
+            return _summarize_crawl_result(finished)
+    
     for attempt in range(max_retries):
         try:
             # 模拟浏览器请求头
@@ -334,60 +712,63 @@ def crawl_juhui_house_price_data(city, district, max_retries=3):
             }
             
             # 首先获取城市主页面，查找区域链接
-            city_url = base_urls[city]
-            print(f"正在获取{city}主页面，查找{district}区域链接...")
+            city_url = f"{GOTOHUI_BASE_URL}/fjdata-{city_code}"
+            logger.debug("正在获取%s主页面，查找%s区域链接...", city, district)
             
-            # 添加随机延迟避免被封
-            time.sleep(random.uniform(1, 2))
-            
-            response = requests.get(city_url, headers=headers, timeout=10)
-            response.raise_for_status()
+            response = fetch_gotohui_page(city_url, headers)
             
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # 查找区域链接
             district_url = None
-            if city in district_mappings and district in district_mappings[city]:
-                district_code = district_mappings[city][district]
-                
-                # 获取近五年的数据（包含2021和2022年）
+            district_code = REGISTRY.district_code(city, district)
+            if district_code is not None:
+                # 获取近CRAWL_HISTORY_YEARS年的数据（默认五年）
                 current_year = datetime.now().year
-                years_to_fetch = [current_year, current_year - 1, current_year - 2, current_year - 3, current_year - 4]
+                years_to_fetch = years or [current_year - offset for offset in range(CRAWL_HISTORY_YEARS)]
                 all_monthly_data = []
                 
                 for year in years_to_fetch:
                     # 构建年度数据URL - 格式：com/years/{区域编码}/{年份}/
-                    year_url = f"https://fangjia.gotohui.com/years/{district_code}/{year}/"
-                    print(f"尝试访问{district}区域{year}年度数据页面: {year_url}")
+                    if checkpoint is not None:
+                        cached_rows = checkpoint.get_year(city, district, year)
+                        if cached_rows is not None:
+                            all_monthly_data.extend(cached_rows)
+                            continue
+                    
+                    year_url = f"{GOTOHUI_BASE_URL}/years/{district_code}/{year}/"
+                    logger.debug("尝试访问%s区域%d年度数据页面: %s", district, year, year_url)
                     
                     try:
-                        time.sleep(random.uniform(0.5, 1.5))
-                        year_response = requests.get(year_url, headers=headers, timeout=10)
-                        year_response.raise_for_status()
+                        year_response = fetch_gotohui_page(year_url, headers)
                         
                         year_soup = BeautifulSoup(year_response.text, 'html.parser')
                         
                         # 从年度页面提取月度数据
                         year_monthly_data = extract_monthly_data_from_page(year_soup, year)
+                        if checkpoint is not None:
+                            checkpoint.record_year(city, district, year, year_monthly_data)
                         if year_monthly_data:
                             all_monthly_data.extend(year_monthly_data)
-                            print(f"成功获取{year}年{len(year_monthly_data)}条月度数据")
+                            logger.debug("成功获取%d年%d条月度数据", year, len(year_monthly_data))
                         
+                    except CircuitOpenError:
+                        # 熔断时不保存残缺的年份数据，交给外层回退到已存储数据
+                        raise
                     except Exception as e:
-                        print(f"获取{year}年数据失败: {e}")
+                        RUN_STATS["page_errors"] += 1
+                        logger.warning("获取%s-%s %d年数据失败: %s", city, district, year, e)
                         continue
                 
                 # 如果通过年度URL没有获取到数据，尝试传统的区域页面
                 if not all_monthly_data:
                     # 尝试构建区域URL - 只使用区域编码，不包含城市编码
-                    district_url = f"https://fangjia.gotohui.com/fjdata-{district_code}"
+                    district_url = f"{GOTOHUI_BASE_URL}/fjdata-{district_code}"
                     
-                    print(f"尝试访问{district}区域页面: {district_url}")
+                    logger.debug("尝试访问%s区域页面: %s", district, district_url)
                     
                     # 获取区域页面数据
-                    time.sleep(random.uniform(0.5, 1.5))
-                    district_response = requests.get(district_url, headers=headers, timeout=10)
-                    district_response.raise_for_status()
+                    district_response = fetch_gotohui_page(district_url, headers)
                     
                     district_soup = BeautifulSoup(district_response.text, 'html.parser')
                     all_monthly_data = extract_monthly_data_from_page(district_soup, None)
@@ -400,13 +781,11 @@ def crawl_juhui_house_price_data(city, district, max_retries=3):
                 
                 # 如果有月度数据，获取最新的价格作为当前价格
                 if monthly_data:
-                    # 按月份排序，获取最新的价格
-                    sorted_data = sorted(monthly_data, key=lambda x: x['month'], reverse=True)
-                    if sorted_data:
-                        current_price = sorted_data[0]['second_hand_price']
-                    print(f"成功获取{len(monthly_data)}条月度数据，当前价格：{current_price}")
+                    # 解析结果尚未排序（写入存储时校验并排序），这里只需线性查找最新月份
+                    current_price = max(monthly_data, key=lambda x: x['month'])['second_hand_price']
+                    logger.info("%s-%s: 获取%d条月度数据，当前价格：%s", city, district, len(monthly_data), current_price)
                 else:
-                    print(f"在{city}-{district}未找到有效的月度房价数据")
+                    logger.warning("在%s-%s未找到有效的月度房价数据", city, district)
                 
                 # 构建返回数据
                 result = {
@@ -418,125 +797,837 @@ def crawl_juhui_house_price_data(city, district, max_retries=3):
                     'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 }
                 
-                # 保存爬取的数据到统一的JSON文件
-                json_filename = 'crawl_data.json'
-                all_crawl_data = {}
-                
-                # 如果文件已存在，先读取现有数据
-                if os.path.exists(json_filename):
-                    try:
-                        with open(json_filename, 'r', encoding='utf-8') as f:
-                            all_crawl_data = json.load(f)
-                    except:
-                        all_crawl_data = {}
-                
-                # 添加新数据
-                if city not in all_crawl_data:
-                    all_crawl_data[city] = {}
-                all_crawl_data[city][district] = result
-                
-                # 保存更新后的数据
-                with open(json_filename, 'w', encoding='utf-8') as f:
-                    json.dump(all_crawl_data, f, ensure_ascii=False, indent=2)
-                print(f"爬取数据已保存到统一文件: {json_filename}")
-                
-                if current_price and monthly_data:
-                    return {
-                        'average_price': current_price,
-                        'transaction_count': len(monthly_data),
-                        'monthly_data': monthly_data,
-                        'source': '聚汇数据-月度'
-                    }
+                if checkpoint is not None:
+                    # 先记入检查点，运行结束时统一合并到crawl_data.json
+                    checkpoint.record_district(city, district, result)
                 else:
-                    print(f"在{city}-{district}未找到有效的月度房价数据")
-                    return None
+                    # 保存爬取的数据到数据存储（写入的是校验后的数据）
+                    result = persist_crawl_results([result])[0]
+                    logger.debug("爬取数据已保存: %s-%s", city, district)
+                
+                return _summarize_crawl_result(result)
             else:
-                print(f"未找到{district}区域的映射编码")
+                logger.warning("未找到%s区域的映射编码", district)
                 return None
             
+        except CircuitOpenError:
+            return _stored_crawl_fallback(city, district)
         except Exception as e:
-            print(f"第{attempt + 1}次尝试获取{city}-{district}数据失败: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(random.uniform(2, 5))  # 失败时等待更长时间
-            else:
-                print(f"最终未能获取{city}-{district}的聚汇数据")
-            return None
+            RUN_STATS["page_errors"] += 1
+            logger.warning("第%d次尝试获取%s-%s数据失败: %s", attempt + 1, city, district, e)
+            # 失败后的等待由限速器根据降低后的速率决定
     
+    logger.error("最终未能获取%s-%s的聚汇数据", city, district)
+    if GOTOHUI_BREAKER.state == "open":
+        return _stored_crawl_fallback(city, district)
+    return None
+
+def _stored_crawl_fallback(city, district):
+    """数据源熔断时回退到数据存储中已有的数据"""
+    RUN_STATS["breaker_fallbacks"] += 1
+    stored = load_district_entry(city, district)
+    if stored:
+        logger.warning("数据源熔断，%s-%s使用已存储数据(爬取于%s)", city, district, stored.get('crawl_time'))
+        return _summarize_crawl_result(stored)
+    logger.warning("数据源熔断，且%s-%s没有已存储数据", city, district)
     return None
 
-# 生成基于聚汇数据的房价数据
-def generate_juhui_based_data(city, district, time_range_weeks):
+# 模拟数据回退：与爬取完全分离，失败的区域不会再次发起网络请求
+MOCK_SERIES_CACHE = {}  # (city, district, weeks, date) -> 模拟周数据
+_mock_cache_lock = threading.Lock()
+
+def generate_juhui_based_data(city, district, time_range_weeks, today=None):
     """
-    基于聚汇数据生成历史趋势数据
+    为无法获取真实数据的区域生成聚汇数据风格的模拟周数据（不爬取）
+    同一天内相同(城市, 区域, 周数)的结果会被缓存；每个区域使用独立的随机数生成器
     """
-    # 首先尝试获取真实的聚汇数据
-    current_data = crawl_juhui_house_price_data(city, district)
+    today = today or datetime.now(pytz.timezone("Asia/Shanghai")).date()
+    key = (city, district, time_range_weeks, today)
+    with _mock_cache_lock:
+        cached = MOCK_SERIES_CACHE.get(key)
+    if cached is not None:
+        RUN_STATS["mock_cache_hits"] += 1
+        return [dict(item) for item in cached]
     
-    if current_data is None:
-        # 如果无法获取真实数据，使用模拟数据但标注来源
-        print(f"使用模拟的聚汇数据风格数据为{city}-{district}")
-        current_price = generate_mock_house_price_data(city, district, datetime.now().date(), 1)[0]['average_price']
-        current_data = {
-            'average_price': current_price,
-            'transaction_count': 50,
-            'source': '聚汇数据(模拟)'
-        }
+    rng = district_rng(city, district)
+    current_price = generate_mock_house_price_data(city, district, today, 1, rng)[0]['average_price']
+    base_volume = 50
     
     # 生成历史数据 (基于当前价格反推)
-    today = datetime.now(pytz.timezone("Asia/Shanghai")).date()
-    weeks = get_weeks_dates(today - timedelta(weeks=time_range_weeks-1), time_range_weeks)
-    
-    data = []
-    base_price = current_data['average_price']
-    
-    # 生成价格趋势
-    np.random.seed(42)
+    steps = np.arange(time_range_weeks)
     trend = np.linspace(-0.1, 0.05, time_range_weeks)  # 整体趋势
+    seasonality = 0.03 * np.sin(2 * np.pi * (steps / 52))
+    random_noise = 0.02 * rng.standard_normal(time_range_weeks)
+    price_changes = 1 + trend + seasonality + random_noise
+    prices = current_price * price_changes
     
-    for i, week_date in enumerate(reversed(weeks)):  # 从历史到现在
-        # 添加季节性和随机波动
-        seasonality = 0.03 * np.sin(2 * np.pi * (i / 52))
-        random_noise = 0.02 * np.random.randn()
-        
-        price_change = 1 + trend[i] + seasonality + random_noise
-        current_price = base_price * price_change
-        
-        # 成交量基于价格变化反向调整
-        base_volume = current_data['transaction_count']
-        volume_factor = max(0.3, 1 - abs(price_change - 1) * 2)
-        transaction_count = int(base_volume * volume_factor * (1 + 0.3 * np.random.randn()))
-        transaction_count = max(10, transaction_count)
-        
-        data.append({
-            "date": week_date.strftime("%Y-%m-%d"),
-            "average_price": round(current_price, 2),
-            "transaction_count": transaction_count,
-            "source": current_data['source']
-        })
+    # 成交量基于价格变化反向调整
+    volume_factors = np.maximum(0.3, 1 - np.abs(price_changes - 1) * 2)
+    transaction_counts = np.maximum(10, (base_volume * volume_factors * (1 + 0.3 * rng.standard_normal(time_range_weeks))).astype(int))
     
-    # 添加月度数据到返回结果中
-    result = list(reversed(data))  # 恢复到时间正序
+    # 价格序列按从历史到现在生成，反转后与时间正序的周日期对齐
+    result = [
+        {"date": label, "average_price": price, "transaction_count": count, "source": '聚汇数据(模拟)'}
+        for label, price, count in zip(_week_labels(today, time_range_weeks),
+                                       np.round(prices[::-1], 2).tolist(), transaction_counts[::-1].tolist())
+    ]
     
-    # 如果有月度数据，添加到每个数据点
-    if 'monthly_data' in current_data:
-        for item in result:
-            item['monthly_data'] = current_data['monthly_data']
+    with _mock_cache_lock:
+        MOCK_SERIES_CACHE[key] = result
+    return [dict(item) for item in result]
+
+@functools.lru_cache(maxsize=32)
+def _week_labels(today, time_range_weeks):
+    """最近time_range_weeks周的周一日期字符串（时间正序），所有区域共用"""
+    weeks = get_weeks_dates(today - timedelta(weeks=time_range_weeks-1), time_range_weeks)
+    return tuple(week_date.strftime("%Y-%m-%d") for week_date in weeks)
+
+def generate_mock_fallbacks(units, time_range_weeks, workers=None):
+    """并行为多个区域生成模拟数据，返回{(city, district): 周数据}"""
+    from concurrent.futures import ThreadPoolExecutor
     
-    return result
+    units = list(units)
+    if not units:
+        return {}
+    today = datetime.now(pytz.timezone("Asia/Shanghai")).date()
+    workers = workers or min(8, len(units))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        series = executor.map(lambda unit: generate_juhui_based_data(*unit, time_range_weeks, today), units)
+        return dict(zip(units, series))
  
  # 数据缓存和增量更新相关函数
-def load_existing_crawl_data():
-    """加载现有的爬取数据"""
-    json_filename = 'crawl_data.json'
+def load_existing_crawl_data(json_filename='crawl_data.json', compact=True):
+    """加载现有的爬取数据；compact=False时月度数据保持为json解析出的字典，不转换为MonthlyRow"""
     if os.path.exists(json_filename):
         try:
             with open(json_filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                crawl_data = json.load(f)
+            return compact_crawl_data(crawl_data) if compact else crawl_data
         except Exception as e:
-            print(f"读取现有数据失败: {e}")
+            logger.warning("读取现有数据失败: %s", e)
             return {}
     return {}
 
+def _indented_json(obj, level):
+    """json.dumps(obj, indent=2)嵌套在第level层时的文本"""
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=json_record).replace('\n', '\n' + '  ' * level)
+
+def save_crawl_data(all_crawl_data, json_filename='crawl_data.json'):
+    """
+    原子地写入爬取数据，避免中断时留下半个文件；输出与json.dump(all_crawl_data, f, indent=2)逐字节一致
+    逐个区域序列化：MonthlyRow只在写出该区域时转换为字典（带缩进的json编码是纯Python实现，
+    先转换再编码比逐行经由default回调快得多）
+    """
+    tmp_filename = json_filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        if not all_crawl_data:
+            f.write('{}')
+        else:
+            f.write('{')
+            for city_index, (city, districts) in enumerate(all_crawl_data.items()):
+                f.write((',\n  ' if city_index else '\n  ') + json.dumps(city, ensure_ascii=False) + ': ')
+                if not isinstance(districts, dict) or not districts:
+                    f.write(_indented_json(districts, 1))
+                    continue
+                f.write('{')
+                for index, (district, entry) in enumerate(districts.items()):
+                    if isinstance(entry, dict) and entry.get('monthly_data'):
+                        entry = dict(entry, monthly_data=[row.to_dict() if type(row) is MonthlyRow else row
+                                                          for row in entry['monthly_data']])
+                    f.write((',\n    ' if index else '\n    ') + json.dumps(district, ensure_ascii=False) + ': ')
+                    f.write(_indented_json(entry, 2))
+                f.write('\n  }')
+            f.write('\n}')
+    os.replace(tmp_filename, json_filename)
+
+# 月度数据的存储约定：每个区域的monthly_data按月份倒序且月份不重复（写入时由校验和合并保证），
+# 读取方直接依赖该顺序：最新值为第一行，区间查询用二分查找，不再各自排序
+def latest_month_row(monthly_data):
+    """最新一个月的数据，O(1)；无数据时返回None"""
+    return monthly_data[0] if monthly_data else None
+
+def _month_position(monthly_data, month, inclusive):
+    """在倒序的月度数据中二分查找：返回第一个月份早于month（inclusive时为不晚于month）的位置"""
+    low, high = 0, len(monthly_data)
+    while low < high:
+        middle = (low + high) // 2
+        value = monthly_data[middle]['month']
+        if value > month or (not inclusive and value == month):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def month_range(monthly_data, start=None, end=None):
+    """[start, end]（含端点，YYYY-MM，可省略）内的月度数据切片，仍为倒序；二分查找，O(log n)"""
+    begin = _month_position(monthly_data, end, inclusive=True) if end else 0
+    stop = _month_position(monthly_data, start, inclusive=False) if start else len(monthly_data)
+    return monthly_data[begin:stop]
+
+def merge_monthly_rows(existing, incoming):
+    """
+    合并两个按月份倒序且不重复的月度数据列表，同一月份以incoming为准，结果保持倒序且不重复
+    existing中早于incoming最早月份的历史不可能与新数据交错，二分定位后整段复制；
+    只有与新数据重叠的区间逐行归并，整体为线性时间，通常只需处理最近几年的数据
+    """
+    if not incoming:
+        return list(existing)
+    split = _month_position(existing, incoming[-1]['month'], inclusive=False)
+    # 常见情况：重新爬取覆盖了重叠区间内的全部已存储月份，直接拼接
+    if {row['month'] for row in incoming}.issuperset(row['month'] for row in existing[:split]):
+        return incoming + existing[split:]
+    merged = []
+    i = j = 0
+    while i < split or j < len(incoming):
+        if j < len(incoming) and (i >= split or incoming[j]['month'] >= existing[i]['month']):
+            row = incoming[j]
+            j += 1
+        else:
+            row = existing[i]
+            i += 1
+        if not merged or merged[-1]['month'] != row['month']:
+            merged.append(row)
+    merged.extend(existing[split:])
+    return merged
+
+# 可选的SQLite历史数据存储：HOUSE_PRICE_STORE=sqlite（或--store sqlite）启用，默认仍为crawl_data.json
+STORE_BACKEND = os.environ.get("HOUSE_PRICE_STORE", "json")
+SQLITE_STORE_FILE = os.environ.get("HOUSE_PRICE_SQLITE_FILE", "crawl_data.sqlite")
+
+class SqliteHistoryStore:
+    """
+    SQLite历史数据存储
+    monthly_prices以(city, district, month)为主键并按主键聚簇（WITHOUT ROWID），
+    单区域的区间查询和最新值查询都是索引范围扫描，不必读取整个数据集；
+    写入使用WAL模式，每批区域结果在一个事务内upsert
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS districts (
+            city TEXT NOT NULL,
+            district TEXT NOT NULL,
+            current_price REAL,
+            source TEXT,
+            crawl_time TEXT,
+            PRIMARY KEY (city, district)
+        );
+        CREATE TABLE IF NOT EXISTS monthly_prices (
+            city TEXT NOT NULL,
+            district TEXT NOT NULL,
+            month TEXT NOT NULL,
+            second_hand_price REAL,
+            new_house_price REAL,
+            source TEXT,
+            PRIMARY KEY (city, district, month)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_monthly_prices_month ON monthly_prices (month);
+    '''
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_STORE_FILE
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_districts(self, results):
+        """
+        在一个事务内写入一批区域结果（crawl_data.json中单个区域的结构）
+        只有价格或来源确实变化的月份才会被更新；返回新增或变化的行数
+        """
+        before = self.conn.total_changes
+        with self.conn:
+            for result in results:
+                city, district = result['city'], result['district']
+                self.conn.execute(
+                    "INSERT INTO districts (city, district, current_price, source, crawl_time) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (city, district) DO UPDATE SET current_price = excluded.current_price, "
+                    "source = excluded.source, crawl_time = excluded.crawl_time",
+                    (city, district, result.get('current_price'), result.get('source'), result.get('crawl_time')))
+                self.conn.executemany(
+                    "INSERT INTO monthly_prices (city, district, month, second_hand_price, new_house_price, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (city, district, month) DO UPDATE SET second_hand_price = excluded.second_hand_price, "
+                    "new_house_price = excluded.new_house_price, source = excluded.source "
+                    "WHERE second_hand_price IS NOT excluded.second_hand_price "
+                    "OR new_house_price IS NOT excluded.new_house_price OR source IS NOT excluded.source",
+                    [(city, district, row['month'], row.get('second_hand_price'), row.get('new_house_price'),
+                      row.get('source')) for row in result.get('monthly_data', [])])
+            changed = self.conn.total_changes - before
+        return changed
+
+    def series(self, city, district, start=None, end=None):
+        """按月份升序返回区域在[start, end]（含端点，格式YYYY-MM）内的月度数据"""
+        rows = self.conn.execute(
+            "SELECT month, second_hand_price, new_house_price, source FROM monthly_prices "
+            "WHERE city = ? AND district = ? AND month BETWEEN ? AND ? ORDER BY month",
+            (city, district, start or '0000-00', end or '9999-99'))
+        return [MonthlyRow(*row) for row in rows]
+
+    def latest(self, city, district):
+        """区域最新一个月的数据，无数据时返回None"""
+        row = self.conn.execute(
+            "SELECT month, second_hand_price, new_house_price, source FROM monthly_prices "
+            "WHERE city = ? AND district = ? ORDER BY month DESC LIMIT 1", (city, district)).fetchone()
+        return MonthlyRow(*row) if row else None
+
+    def latest_prices(self):
+        """每个区域最新月份的价格，用于城市均价等摘要：{(city, district): row}；每个区域一次主键索引查找"""
+        # CROSS JOIN固定以districts为外层循环；否则查询规划器会选择按月份索引扫描全部月度数据
+        rows = self.conn.execute(
+            "SELECT m.city, m.district, m.month, m.second_hand_price, m.new_house_price "
+            "FROM districts d CROSS JOIN monthly_prices m WHERE m.city = d.city AND m.district = d.district "
+            "AND m.month = (SELECT MAX(month) FROM monthly_prices WHERE city = d.city AND district = d.district)")
+        return {(row['city'], row['district']): dict(row) for row in rows}
+
+    def district_entry(self, city, district):
+        """返回与crawl_data.json中相同结构的单个区域数据，月份倒序；不存在时返回None"""
+        row = self.conn.execute("SELECT * FROM districts WHERE city = ? AND district = ?", (city, district)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['monthly_data'] = self.series(city, district)[::-1]
+        return {key: entry[key] for key in ('city', 'district', 'current_price', 'monthly_data', 'source', 'crawl_time')}
+
+    def freshness(self):
+        """各区域的爬取时间和最新月份：{(city, district): (crawl_time, month)}；每个区域一次主键索引查找"""
+        rows = self.conn.execute(
+            "SELECT d.city, d.district, d.crawl_time, "
+            "(SELECT MAX(month) FROM monthly_prices m WHERE m.city = d.city AND m.district = d.district) "
+            "FROM districts d")
+        return {(city, district): (crawl_time, month) for city, district, crawl_time, month in rows}
+
+    def prune(self, before_month):
+        """删除早于before_month（YYYY-MM）的月度数据，返回删除的行数"""
+        with self.conn:
+            return self.conn.execute("DELETE FROM monthly_prices WHERE month < ?", (before_month,)).rowcount
+
+    def export_crawl_data(self):
+        """导出为crawl_data.json的结构（区域按写入顺序，月份倒序）"""
+        crawl_data = {}
+        for row in self.conn.execute("SELECT * FROM districts ORDER BY rowid"):
+            crawl_data.setdefault(row['city'], {})[row['district']] = {
+                'city': row['city'], 'district': row['district'], 'current_price': row['current_price'],
+                'monthly_data': [], 'source': row['source'], 'crawl_time': row['crawl_time'],
+            }
+        # 全量导出行数多，使用元组行避免逐行构造sqlite3.Row
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("SELECT city, district, month, second_hand_price, new_house_price, source FROM monthly_prices "
+                       "ORDER BY city, district, month DESC")
+        for city, district, month, second_hand_price, new_house_price, source in cursor:
+            entry = crawl_data.get(city, {}).get(district)
+            if entry is not None:
+                entry['monthly_data'].append(MonthlyRow(month, second_hand_price, new_house_price, source))
+        return crawl_data
+
+    def export_report_data(self, registry):
+        """导出为报告生成使用的结构（与load_all_data_from_store一致），只读取登记表中的区域"""
+        all_data = {}
+        for city in registry.cities():
+            all_data[city] = {}
+            for district in registry.districts(city):
+                monthly = self.series(city, district)[::-1]
+                all_data[city][district] = [{'monthly_data': monthly}] if monthly else [{}]
+        return all_data
+
+def open_history_store(path=None):
+    return contextlib.closing(SqliteHistoryStore(path))
+
+def load_crawl_data(json_filename='crawl_data.json'):
+    """按当前存储后端读取全部数据（crawl_data.json结构）"""
+    if STORE_BACKEND == "sqlite":
+        with open_history_store() as store:
+            return store.export_crawl_data()
+    return load_existing_crawl_data(json_filename)
+
+CRAWL_DATA_CACHE = {}  # json_filename -> ((st_mtime_ns, st_size, st_ino), 未转换的crawl_data)
+
+def _cached_crawl_data(json_filename):
+    """
+    按文件版本缓存解析后的crawl_data（月度数据保持为字典），逐个区域读取时不必每次重新解析整个文件；
+    save_crawl_data通过os.replace写入新文件，文件的修改时间、大小或inode变化后重新读取
+    """
+    try:
+        st = os.stat(json_filename)
+    except OSError:
+        CRAWL_DATA_CACHE.pop(json_filename, None)
+        return {}
+    version = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = CRAWL_DATA_CACHE.get(json_filename)
+    if cached is None or cached[0] != version:
+        cached = CRAWL_DATA_CACHE[json_filename] = (version, load_existing_crawl_data(json_filename, compact=False))
+    return cached[1]
+
+def load_district_entry(city, district, json_filename='crawl_data.json'):
+    """按当前存储后端读取单个区域的数据；SQLite后端只读取该区域的行"""
+    if STORE_BACKEND == "sqlite":
+        with open_history_store() as store:
+            return store.district_entry(city, district)
+    # 只转换返回的区域（返回副本，缓存中的数据不被修改），不把整个文件的所有行都转换为MonthlyRow
+    entry = _cached_crawl_data(json_filename).get(city, {}).get(district)
+    if not isinstance(entry, dict) or 'monthly_data' not in entry:
+        return dict(entry) if isinstance(entry, dict) else entry
+    return dict(entry, monthly_data=monthly_rows(entry['monthly_data']))
+
+def load_district_entries(units, json_filename='crawl_data.json'):
+    """按当前存储后端读取若干区域的数据：{(city, district): entry}；JSON后端只读取一次文件"""
+    units = list(units)
+    if not units:
+        return {}
+    if STORE_BACKEND == "sqlite":
+        with open_history_store() as store:
+            return {(city, district): store.district_entry(city, district) for city, district in units}
+    crawl_data = load_existing_crawl_data(json_filename)
+    return {(city, district): crawl_data.get(city, {}).get(district) for city, district in units}
+
+def district_freshness(json_filename='crawl_data.json'):
+    """各区域已存储数据的爬取时间和最新月份：{(city, district): (crawl_time, month)}"""
+    if STORE_BACKEND == "sqlite":
+        with open_history_store() as store:
+            return store.freshness()
+    freshness = {}
+    for city, districts in load_existing_crawl_data(json_filename).items():
+        for district, entry in districts.items():
+            if isinstance(entry, dict):
+                latest = latest_month_row(entry.get('monthly_data') or [])
+                freshness[(city, district)] = (entry.get('crawl_time'), latest['month'] if latest else None)
+    return freshness
+
+def store_location(json_filename='crawl_data.json', backend=None):
+    """日志中显示的数据存储位置"""
+    return SQLITE_STORE_FILE if (backend or STORE_BACKEND) == "sqlite" else json_filename
+
+# 数据校验：解析结果写入存储前，对整批区域的全部行一次性做向量化检查，异常行写入隔离文件
+PRICE_BOUNDS = (500.0, 500000.0)  # 元/㎡，超出即视为单位错误或误匹配的数字（如序号）
+CITY_PRICE_FACTOR = 4.0  # 偏离本城市价格中位数超过该倍数的行视为异常
+JUMP_Z_THRESHOLD = 8.0  # 环比对数涨跌幅的稳健z分数阈值
+JUMP_MIN_CHANGE = 0.1  # 同时要求涨跌幅超过10%，避免低波动数据中的正常波动被判为异常
+QUARANTINE_FILE = os.environ.get("CRAWL_QUARANTINE_FILE", "crawl_quarantine.jsonl")  # 设为空字符串可关闭
+VALIDATION_REASONS = ('invalid_month', 'missing_price', 'out_of_range', 'city_outlier', 'duplicate_month', 'jump_spike')
+_MONTH_PATTERN = re.compile(r'(\d{4})-(\d{2})')
+_SOURCE_YEAR_PATTERN = re.compile(r'(\d{4})年度页面')
+
+def _robust_z(values):
+    """按中位数和MAD计算稳健z分数（MAD为0时取一个很小的下限）"""
+    if not len(values):
+        return values
+    center = np.median(values)
+    scale = 1.4826 * np.median(np.abs(values - center))
+    return (values - center) / max(scale, 1e-3)
+
+def validate_crawl_results(results, today=None):
+    """
+    校验一批区域结果（crawl_data.json中单个区域的结构），返回(清洗后的结果列表, 报告, 被拒绝的行)
+    所有行先展开为数组，再依次做：月份格式与未来月份、价格缺失、绝对价格区间、
+    本城市价格中位数的倍数区间、同一区域重复月份（优先保留月份与年度页面年份一致的行）、
+    环比涨跌幅的稳健z分数（只剔除先涨后跌或先跌后涨的孤立尖峰，不剔除持续的水平变化）。
+    新房价格越界时只清空该字段。清洗后的月度数据按月份倒序，current_price取最新月份
+    """
+    results = list(results)
+    today = today or datetime.now()
+    current_ordinal = today.year * 12 + today.month - 1
+    city_index = {}
+    unit_cities = [city_index.setdefault(result.get('city'), len(city_index)) for result in results]
+    rows, units = [], []
+    for unit, result in enumerate(results):
+        monthly = result.get('monthly_data') or []
+        rows.extend(monthly)
+        units.extend([unit] * len(monthly))
+    # 月份和来源的取值很少（每月一个、每个年度页面一个），按不同取值各解析一次
+    months = [str(row.get('month', '')) for row in rows]
+    month_ordinals = {}
+    for month in set(months):
+        match = _MONTH_PATTERN.fullmatch(month)
+        valid = match is not None and 1 <= int(match.group(2)) <= 12
+        month_ordinals[month] = int(match.group(1)) * 12 + int(match.group(2)) - 1 if valid else -1
+    sources = [row.get('source') or '' for row in rows]
+    source_years = {}
+    for source in set(sources):
+        match = _SOURCE_YEAR_PATTERN.search(source)
+        source_years[source] = int(match.group(1)) if match else -1
+
+    units = np.array(units, dtype=np.int64)
+    ordinals = np.array([month_ordinals[month] for month in months], dtype=np.int64)
+    prices = np.array([row.get('second_hand_price') for row in rows], dtype=float)
+    new_prices = np.array([row.get('new_house_price') for row in rows], dtype=float)
+    page_years = np.array([source_years[source] for source in sources], dtype=np.int64)
+    row_cities = np.array(unit_cities, dtype=np.int64)[units]
+
+    # reason[i]为0表示保留，否则为VALIDATION_REASONS中的序号+1（记录第一个未通过的检查）
+    reason = np.zeros(len(rows), dtype=np.int8)
+
+    def reject(mask, name):
+        reason[(reason == 0) & mask] = VALIDATION_REASONS.index(name) + 1
+
+    reject((ordinals < 0) | (ordinals > current_ordinal), 'invalid_month')
+    reject(~(prices > 0), 'missing_price')
+    low, high = PRICE_BOUNDS
+    reject((prices < low) | (prices > high), 'out_of_range')
+
+    logs = np.log(np.where(prices > 0, prices, 1.0))
+    alive = reason == 0
+    if alive.any():
+        # 各城市对数价格的中位数：按(城市, 价格)排序后取每组中间位置
+        order = np.lexsort((logs[alive], row_cities[alive]))
+        sorted_cities = row_cities[alive][order]
+        sorted_logs = logs[alive][order]
+        counts = np.bincount(sorted_cities, minlength=len(city_index))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        medians = np.where(counts > 0, sorted_logs[np.minimum(starts + counts // 2, len(sorted_logs) - 1)], 0.0)
+        reject(alive & (np.abs(logs - medians[row_cities]) > np.log(CITY_PRICE_FACTOR)), 'city_outlier')
+
+    # 重复月份：按(区域, 月份, 优先级)排序，同一键只保留第一行
+    alive = np.flatnonzero(reason == 0)
+    priority = (page_years[alive] != ordinals[alive] // 12).astype(np.int8)
+    order = alive[np.lexsort((priority, ordinals[alive], units[alive]))]
+    duplicate = np.zeros(len(order), dtype=bool)
+    duplicate[1:] = (units[order][1:] == units[order][:-1]) & (ordinals[order][1:] == ordinals[order][:-1])
+    reason[order[duplicate]] = VALIDATION_REASONS.index('duplicate_month') + 1
+    order = order[~duplicate]
+
+    # 环比尖峰：order已按区域、月份升序；只比较同一区域内的相邻月份
+    if len(order) > 2:
+        same_unit = units[order][1:] == units[order][:-1]
+        steps = np.diff(logs[order])
+        z = np.zeros(len(steps))
+        z[same_unit] = _robust_z(steps[same_unit])
+        jump = same_unit & (np.abs(z) > JUMP_Z_THRESHOLD) & (np.abs(steps) > np.log1p(JUMP_MIN_CHANGE))
+        # 第i行的入边为steps[i-1]、出边为steps[i]，两边都是大幅跳变且方向相反时判为孤立尖峰
+        spike = np.zeros(len(order), dtype=bool)
+        spike[1:-1] = jump[:-1] & jump[1:] & (np.sign(steps[:-1]) != np.sign(steps[1:]))
+        reason[order[spike]] = VALIDATION_REASONS.index('jump_spike') + 1
+        order = order[~spike]
+
+    clear_new = ~np.isnan(new_prices) & ~((new_prices >= low) & (new_prices <= high)) & (reason == 0)
+
+    # 原始顺序不是严格按月份倒序的区域数（同一区域内出现相同或更晚的月份）
+    same = units[1:] == units[:-1]
+    unordered = len(np.unique(units[1:][same & (ordinals[1:] >= ordinals[:-1])])) if len(units) > 1 else 0
+
+    # 按区域、月份倒序输出保留的行
+    kept = order[np.lexsort((-ordinals[order], units[order]))]
+    boundaries = np.searchsorted(units[kept], np.arange(len(results) + 1))
+    cleaned = []
+    for unit, result in enumerate(results):
+        monthly = []
+        for index in kept[boundaries[unit]:boundaries[unit + 1]].tolist():
+            row = MonthlyRow.from_mapping(rows[index])
+            monthly.append(row.replace(new_house_price=None) if clear_new[index] else row)
+        current_price = monthly[0]['second_hand_price'] if monthly else None
+        cleaned.append(dict(result, monthly_data=monthly, current_price=current_price))
+
+    rejected = [(results[units[index]], rows[index], VALIDATION_REASONS[reason[index] - 1])
+                for index in np.flatnonzero(reason).tolist()]
+    by_district = Counter(f"{result['city']}-{result['district']}" for result, _, _ in rejected)
+    report = {
+        'rows': len(rows),
+        'kept': len(kept),
+        'rejected': dict(Counter(name for _, _, name in rejected)),
+        'cleared_new_house_price': int(clear_new.sum()),
+        'unordered_districts': unordered,
+        'districts': dict(by_district.most_common(10)),
+    }
+    return cleaned, report, rejected
+
+def quarantine_rows(rejected, path=None):
+    """把被拒绝的行追加到隔离文件（JSON Lines），便于人工核查数据源"""
+    path = QUARANTINE_FILE if path is None else path
+    if not rejected or not path:
+        return
+    checked_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(path, 'a', encoding='utf-8') as f:
+        for result, row, name in rejected:
+            f.write(json.dumps({'checked_at': checked_at, 'city': result.get('city'), 'district': result.get('district'),
+                                'reason': name, 'row': row}, ensure_ascii=False, separators=(',', ':'),
+                               default=json_record) + '\n')
+
+def log_validation_report(report):
+    rejected = sum(report['rejected'].values())
+    RUN_STATS["rows_quarantined"] += rejected
+    if not rejected and not report['cleared_new_house_price']:
+        logger.debug("数据校验通过: %d行", report['rows'])
+        return
+    logger.warning("数据校验: %d行中隔离%d行 %s, 清空越界新房价格%d个, 月份乱序区域%d个; 涉及区域: %s",
+                   report['rows'], rejected, report['rejected'], report['cleared_new_house_price'],
+                   report['unordered_districts'], report['districts'])
+
+def persist_crawl_results(results, json_filename='crawl_data.json', backend=None, revisions=True, crawl_data=None):
+    """
+    把一批区域结果写入存储后端（默认为当前后端）
+    SQLite后端在一个事务内upsert；JSON后端读取、合并后整体重写文件
+    （crawl_data为内存中已有的全部数据时不再读取文件，并原地更新crawl_data）。
+    revisions=True时把变化追加到修订日志（分片的部分数据文件不记录）。
+    写入前先整批校验，异常行写入隔离文件；新数据与已存储的月份合并（同月以新数据为准，保留更早的历史），
+    返回实际写入后的各区域数据（含合并后的完整月度数据）
+    """
+    results = list(results)
+    if not results:
+        return results
+    results, report, rejected = validate_crawl_results(results)
+    quarantine_rows(rejected)
+    log_validation_report(report)
+    if (backend or STORE_BACKEND) == "sqlite":
+        with open_history_store() as store:
+            old_entries = {(r['city'], r['district']): store.district_entry(r['city'], r['district'])
+                           for r in results} if revisions else {}
+            # 修订日志为空时需要写入前的完整数据作为基线
+            existing = store.export_crawl_data() if revisions and REVISIONS_DIR and RevisionLog().is_empty() else {}
+            changed = store.upsert_districts(results)
+            written = [store.district_entry(r['city'], r['district']) for r in results]
+        logger.debug("已写入SQLite存储%s: %d个区域, %d行变化", SQLITE_STORE_FILE, len(results), changed)
+        if revisions:
+            # upsert不会删除本次结果中缺少的月份
+            record_revisions(old_entries, results, replace=False, baseline=lambda: existing)
+        return written
+    all_crawl_data = crawl_data if crawl_data is not None else load_existing_crawl_data(json_filename)
+    old_entries = {}
+    written = []
+    for result in results:
+        city_data = all_crawl_data.setdefault(result['city'], {})
+        previous = city_data.get(result['district'])
+        old_entries[(result['city'], result['district'])] = previous
+        if previous and previous.get('monthly_data'):
+            monthly = merge_monthly_rows(previous['monthly_data'], result['monthly_data'])
+            latest = latest_month_row(monthly)
+            result = dict(result, monthly_data=monthly, current_price=latest['second_hand_price'])
+        city_data[result['district']] = result
+        written.append(result)
+    save_crawl_data(all_crawl_data, json_filename)
+    if revisions:
+        def baseline():
+            # 写入前的完整数据：本次写入的区域取旧值，其余区域未变
+            before = {}
+            for city, districts in all_crawl_data.items():
+                for district, entry in districts.items():
+                    previous = old_entries.get((city, district), entry)
+                    if previous is not None:
+                        before.setdefault(city, {})[district] = previous
+            return before
+        record_revisions(old_entries, written, replace=True, baseline=baseline)
+    return written
+
+def stored_monthly_data(result, previous=None):
+    """
+    单个区域结果经persist_crawl_results写入后的月度数据（不写入存储）：校验后与已存储的数据previous合并
+    只校验这一个区域，城市级异常值按该区域自身的价格中位数判断，与整批校验的结果可能相差少数几行
+    """
+    (cleaned,), _, _ = validate_crawl_results([result])
+    if previous and previous.get('monthly_data'):
+        return merge_monthly_rows(previous['monthly_data'], cleaned['monthly_data'])
+    return cleaned['monthly_data']
+
+# 修订日志：每次写入数据存储时只记录发生变化的(区域, 月份, 字段)，用于追溯数据源对历史月份的修订
+REVISIONS_DIR = os.environ.get("CRAWL_REVISIONS_DIR", "crawl_revisions")  # 设为空字符串可关闭
+REVISION_SEGMENT_RUNS = 20  # 活动段累计的运行次数达到该值时封存为段文件并写出状态快照
+REVISION_MONTH_FIELDS = ('second_hand_price', 'new_house_price', 'source')
+REVISION_DISTRICT_FIELDS = ('current_price', 'source', 'crawl_time')
+
+def crawl_entry_deltas(old_entry, new_entry, replace=True):
+    """
+    比较同一区域的新旧数据，返回变化列表[[city, district, month, field, value], ...]
+    month为None表示区域级字段；field为None表示该月份被删除（仅replace=True即整体替换时出现）
+    """
+    city, district = new_entry['city'], new_entry['district']
+    old_entry = old_entry or {}
+    deltas = [[city, district, None, field, new_entry.get(field)]
+              for field in REVISION_DISTRICT_FIELDS if old_entry.get(field) != new_entry.get(field)]
+    old_months = {row['month']: row for row in old_entry.get('monthly_data', [])}
+    new_months = {row['month']: row for row in new_entry.get('monthly_data', [])}
+    for month, row in new_months.items():
+        previous = old_months.get(month)
+        for field in REVISION_MONTH_FIELDS:
+            if previous is None or previous.get(field) != row.get(field):
+                deltas.append([city, district, month, field, row.get(field)])
+    if replace:
+        deltas.extend([city, district, month, None, None] for month in sorted(old_months.keys() - new_months.keys()))
+    return deltas
+
+def apply_revision_deltas(state, deltas):
+    """把变化列表应用到状态{city: {district: {'meta': {...}, 'months': {month: {...}}}}}"""
+    for city, district, month, field, value in deltas:
+        unit = state.setdefault(city, {}).setdefault(district, {'meta': {}, 'months': {}})
+        if month is None:
+            unit['meta'][field] = value
+        elif field is None:
+            unit['months'].pop(month, None)
+        else:
+            unit['months'].setdefault(month, {})[field] = value
+    return state
+
+def revision_state_to_crawl_data(state):
+    """把修订状态转换为crawl_data.json的结构（月份倒序）"""
+    crawl_data = {}
+    for city, districts in state.items():
+        for district, unit in districts.items():
+            meta = unit['meta']
+            crawl_data.setdefault(city, {})[district] = {
+                'city': city,
+                'district': district,
+                'current_price': meta.get('current_price'),
+                'monthly_data': [
+                    {'month': month, **{field: values.get(field) for field in REVISION_MONTH_FIELDS}}
+                    for month, values in sorted(unit['months'].items(), reverse=True)
+                ],
+                'source': meta.get('source'),
+                'crawl_time': meta.get('crawl_time'),
+            }
+    return crawl_data
+
+def normalize_run_id(value):
+    """运行标识统一为YYYY-MM-DDTHH:MM:SS；只给日期时取当天最后一刻"""
+    value = value.strip().replace(' ', 'T')
+    return value + 'T23:59:59' if len(value) == 10 else value
+
+class RevisionLog:
+    """
+    追加写入的修订日志
+    active.jsonl每行一次写入：{"run": 运行标识, "deltas": [...]}；
+    满REVISION_SEGMENT_RUNS次后封存为segments/NNNNNN.jsonl，并写出封存时的完整状态快照。
+    重建某次运行时的数据：加载该时间点之前最近的快照，只回放其后至多一个段和活动段
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or REVISIONS_DIR
+        self.active_path = os.path.join(self.directory, 'active.jsonl')
+        self.index_path = os.path.join(self.directory, 'index.json')
+        self.segments_dir = os.path.join(self.directory, 'segments')
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'segments': []}
+
+    def _save_index(self, index):
+        with open(self.index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    @staticmethod
+    def _read_records(path):
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("修订日志%s末尾存在不完整记录，已忽略", path)
+        return records
+
+    def is_empty(self):
+        return not self._load_index()['segments'] and not self._read_records(self.active_path)
+
+    def append(self, deltas, run=None):
+        """追加一次写入的变化；没有变化时不写入"""
+        if not deltas:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        run = normalize_run_id(run or datetime.now().strftime('%Y-%m-%dT%H:%M:%S'))
+        with open(self.active_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'run': run, 'deltas': deltas}, ensure_ascii=False, separators=(',', ':')) + '\n')
+        if len(self._read_records(self.active_path)) >= REVISION_SEGMENT_RUNS:
+            self.compact()
+
+    def compact(self):
+        """封存活动段：同一次运行内对同一键的多次修改只保留最后一次，写出段文件和状态快照"""
+        records = self._read_records(self.active_path)
+        if not records:
+            return None
+        index = self._load_index()
+        state = self.state_as_of(None)
+        name = f"{len(index['segments']) + 1:06d}"
+        os.makedirs(self.segments_dir, exist_ok=True)
+        segment_path = os.path.join(self.segments_dir, name + '.jsonl')
+        with open(segment_path + '.tmp', 'w', encoding='utf-8') as f:
+            for record in records:
+                latest = {}
+                for city, district, month, field, value in record['deltas']:
+                    latest[(city, district, month, field)] = value
+                deltas = [[*key, value] for key, value in latest.items()]
+                f.write(json.dumps({'run': record['run'], 'deltas': deltas},
+                                   ensure_ascii=False, separators=(',', ':')) + '\n')
+        os.replace(segment_path + '.tmp', segment_path)
+        snapshot_path = os.path.join(self.segments_dir, name + '.snapshot.json')
+        with open(snapshot_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(snapshot_path + '.tmp', snapshot_path)
+        index['segments'].append({'name': name, 'first_run': records[0]['run'],
+                                  'last_run': records[-1]['run'], 'runs': len(records)})
+        self._save_index(index)
+        os.remove(self.active_path)
+        logger.info("修订日志已封存段%s: %d次运行", name, len(records))
+        return name
+
+    def runs(self):
+        """全部运行标识（升序）"""
+        runs = []
+        for segment in self._load_index()['segments']:
+            runs.extend(record['run'] for record in self._read_records(os.path.join(self.segments_dir, segment['name'] + '.jsonl')))
+        runs.extend(record['run'] for record in self._read_records(self.active_path))
+        return runs
+
+    def state_as_of(self, run=None):
+        """重建截至run（含）的状态；run为None时返回最新状态"""
+        run = normalize_run_id(run) if run else None
+        segments = self._load_index()['segments']
+        base = None
+        remaining = segments
+        for position, segment in enumerate(segments):
+            if run is None or segment['last_run'] <= run:
+                base, remaining = segment, segments[position + 1:]
+        state = {}
+        if base is not None:
+            with open(os.path.join(self.segments_dir, base['name'] + '.snapshot.json'), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        paths = [os.path.join(self.segments_dir, segment['name'] + '.jsonl') for segment in remaining
+                 if run is None or segment['first_run'] <= run]
+        if run is None or not remaining or remaining[-1]['last_run'] < run:
+            paths.append(self.active_path)
+        for path in paths:
+            for record in self._read_records(path):
+                if run is not None and record['run'] > run:
+                    return state
+                apply_revision_deltas(state, record['deltas'])
+        return state
+
+    def rebuild_crawl_data(self, run=None):
+        """重建截至run时crawl_data.json的内容"""
+        return revision_state_to_crawl_data(self.state_as_of(run))
+
+def record_revisions(old_entries, results, replace, baseline=None):
+    """
+    写入数据存储后记录本次变化；修订日志为空时先把写入前的数据作为基线记录
+    old_entries: {(city, district): 写入前的区域数据}；baseline: 返回写入前完整数据的函数
+    """
+    if not REVISIONS_DIR:
+        return
+    try:
+        log = RevisionLog()
+        if log.is_empty() and baseline is not None:
+            existing = baseline() or {}
+            deltas = [delta for districts in existing.values() for entry in districts.values()
+                      if isinstance(entry, dict) and 'city' in entry for delta in crawl_entry_deltas(None, entry)]
+            crawl_times = [entry.get('crawl_time') or '' for districts in existing.values() for entry in districts.values()
+                           if isinstance(entry, dict)]
+            log.append(deltas, run=max(crawl_times, default='') or None)
+        deltas = [delta for result in results
+                  for delta in crawl_entry_deltas(old_entries.get((result['city'], result['district'])), result, replace)]
+        log.append(deltas)
+        if deltas:
+            logger.debug("修订日志: 记录%d项变化", len(deltas))
+    except OSError as e:
+        logger.warning("写入修订日志失败: %s", e)
+
 def clean_old_data(data, max_months=60):
     """清理超过指定月数的旧数据"""
     if not data:
@@ -582,8 +1673,8 @@ def is_data_identical(new_data, existing_data, city, district):
     
     # 检查月度数据是否一致（比较最新的几条数据）
     if 'monthly_data' in new_data and 'monthly_data' in existing_district:
-        new_monthly = sorted(new_data['monthly_data'], key=lambda x: x['month'], reverse=True)[:3]
-        existing_monthly = sorted(existing_district['monthly_data'], key=lambda x: x['month'], reverse=True)[:3]
+        new_monthly = new_data['monthly_data'][:3]
+        existing_monthly = existing_district['monthly_data'][:3]
         
         if len(new_monthly) != len(existing_monthly):
             return False
@@ -595,78 +1686,506 @@ def is_data_identical(new_data, existing_data, city, district):
     
     return True
 
-# 简化版智能爬取函数
-def smart_crawl_juhui_house_price_data(city, district, max_retries=3):
-    """智能爬取函数，简化版本"""
-    # 尝试获取新数据
-    new_data = crawl_juhui_house_price_data(city, district, max_retries)
-    
-    if new_data is None:
-        print(f"无法获取{city}-{district}的新数据")
-        return None
-    
-    print(f"成功获取{city}-{district}的新数据")
-    return new_data
+# 断点续爬：记录已完成的(城市, 区域, 年份)单元，任务中断重启后跳过已完成部分
+CHECKPOINT_FILE = os.environ.get("CRAWL_CHECKPOINT_FILE", "crawl_checkpoint.jsonl")
 
-# 获取所有城市和区域的房价数据 (简化版本)
-def get_all_house_price_data(time_range_weeks):
-    all_data = {}
-    
-    for city, districts in CITIES.items():
-        city_data = {}
-        for district in districts:
-            print(f"获取{city}-{district}的房价数据...")
-            
-            # 尝试获取真实数据，失败则使用模拟数据
-            juhui_data = crawl_juhui_house_price_data(city, district)
-            
-            if juhui_data and 'current_price' in juhui_data:
-                print(f"成功获取{city}-{district}的数据: {juhui_data['current_price']}元/㎡")
-                
-                # 将聚汇数据格式转换为周数据格式
-                district_data = []
-                base_price = juhui_data['current_price']
-                base_volume = juhui_data.get('transaction_count', 50)
-                
-                # 生成最近time_range_weeks周的周数据
-                today = datetime.now(pytz.timezone("Asia/Shanghai")).date()
-                weeks = get_weeks_dates(today - timedelta(weeks=time_range_weeks-1), time_range_weeks)
-                
-                np.random.seed(hash(city + district) % 1000)
-                
-                for i, week_date in enumerate(weeks):
-                    # 基于历史数据或随机波动生成周数据
-                    price = base_price * (1 + 0.02 * np.random.randn())
-                    volume = max(10, int(base_volume * (1 + 0.3 * np.random.randn())))
-                    
-                    district_data.append({
-                        "date": week_date.strftime("%Y-%m-%d"),
-                        "average_price": round(price, 2),
-                        "transaction_count": volume,
-                        "source": juhui_data.get('source', '聚汇数据'),
-                        "monthly_data": juhui_data.get('monthly_data', [])  # 保留完整的月度历史数据
-                    })
-                
-                city_data[district] = district_data
-            else:
-                print(f"无法获取{city}-{district}的数据，使用模拟数据")
-                # 使用基于聚汇数据的模拟数据生成
-                city_data[district] = generate_juhui_based_data(city, district, time_range_weeks)
-            
-            # 减少延迟时间，提高爬取速度
-            time.sleep(random.uniform(0.2, 0.5))
+class CrawlCheckpoint:
+    """
+    追加写入的JSON Lines检查点日志
+    - 首行为运行标识（按月），标识不一致的旧日志会被丢弃
+    - year记录：某区域某年页面已成功获取及其解析结果
+    - district记录：某区域已全部完成，保存待写入crawl_data.json的结果
+    日志只含相对信息，可直接通过Actions cache在不同runner间传递
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, run_key=None):
+        self.path = path
+        self.run_key = run_key or datetime.now().strftime("%Y-%m")
+        self.years = {}
+        self.districts = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('run') != self.run_key:
+                    logger.info("检查点%s属于%s，与本次运行%s不符，重新开始", self.path, header.get('run'), self.run_key)
+                    self.discard()
+                    return
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 中断时可能留下写了一半的最后一行
+                        continue
+                    key = (record['city'], record['district'])
+                    if record['type'] == 'year':
+                        self.years[key + (record['year'],)] = monthly_rows(record['rows'])
+                    elif record['type'] == 'district':
+                        result = record['result']
+                        self.districts[key] = dict(result, monthly_data=monthly_rows(result.get('monthly_data')))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("读取检查点失败，重新开始: %s", e)
+            self.years, self.districts = {}, {}
+            self.discard()
+            return
+        logger.info("从检查点恢复: %d个区域已完成, %d个年度页面已获取", len(self.districts), len(self.years))
+
+    def _append(self, record):
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if new_file:
+                f.write(json.dumps({'run': self.run_key}) + '\n')
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=json_record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def get_year(self, city, district, year):
+        return self.years.get((city, district, year))
+
+    def record_year(self, city, district, year, rows):
+        self.years[(city, district, year)] = rows
+        self._append({'type': 'year', 'city': city, 'district': district, 'year': year, 'rows': rows})
+
+    def get_district(self, city, district):
+        return self.districts.get((city, district))
+
+    def record_district(self, city, district, result):
+        self.districts[(city, district)] = result
+        self._append({'type': 'district', 'city': city, 'district': district, 'result': result})
+
+    def compact(self, json_filename='crawl_data.json', backend=None, revisions=True):
+        """把已完成区域一次性合并写入数据存储，并删除检查点日志；返回校验后实际写入的结果"""
+        written = []
+        if self.districts:
+            written = persist_crawl_results(self.districts.values(), json_filename, backend, revisions)
+            logger.info("检查点已合并到%s: %d个区域", store_location(json_filename, backend), len(self.districts))
+        self.discard()
+        return written
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+# 截止时间感知的爬取调度：CI任务有硬性时限时按数据陈旧程度排序区域，在时间预算内优先爬取最需要更新的区域
+CRAWL_TIME_BUDGET = float(os.environ.get("CRAWL_TIME_BUDGET", "0"))  # 爬取阶段的时间预算（秒），0表示不限制
+CRAWL_STATS_FILE = os.environ.get("CRAWL_STATS_FILE", "crawl_stats.json")  # 各区域历次爬取的耗时与失败率
+CRAWL_STATS_ALPHA = 0.3  # 耗时和失败率的指数滑动平均系数
+CRAWL_DEFAULT_UNIT_SECONDS = 30.0  # 没有任何历史耗时时对单个区域耗时的估计（秒）
+CRAWL_ESTIMATE_MARGIN = 1.25  # 判断剩余预算能否容纳一个区域时，在估计耗时上留出的余量
+CRAWL_NEVER_STALENESS = 1e9  # 没有已存储数据的区域的陈旧程度（天），总是最先爬取
+
+def staleness_days(crawl_time, latest_month, now=None):
+    """
+    区域数据的陈旧程度（天）：距上次爬取的天数，加上最新月份落后于上个月的月数×30
+    数据源在月初发布上个月的数据，最新月份为上个月时不算落后
+    """
+    if not crawl_time or not latest_month:
+        return CRAWL_NEVER_STALENESS
+    now = now or datetime.now()
+    try:
+        age = (now - datetime.strptime(crawl_time, '%Y-%m-%d %H:%M:%S')).total_seconds() / 86400
+        ordinal = int(latest_month[:4]) * 12 + int(latest_month[5:7]) - 1
+    except ValueError:
+        return CRAWL_NEVER_STALENESS
+    lag = max(0, now.year * 12 + now.month - 2 - ordinal)
+    return max(0.0, age) + 30 * lag
+
+class CrawlScheduler:
+    """
+    在时间预算内按优先级依次给出待爬取的区域
+    - 优先级 = 陈旧程度 × (1 - 失败率/2)：越久未更新越先爬，经常失败的区域适当靠后，但陈旧程度持续增长，不会一直排不上
+    - 检查点中已完成的区域不耗时，总是最先给出
+    - 区域耗时按该区域历次耗时的滑动平均估计，没有历史时取其他区域估计值的中位数
+    - 剩余预算容纳不下某区域的估计耗时时跳过它，继续尝试后面耗时更短的区域
+    跳过的区域不写入存储，保留上次的数据；历次耗时与失败率保存在stats_path中，供下次运行估计
+    """
+
+    def __init__(self, units, budget=None, freshness=None, stats_path=CRAWL_STATS_FILE, done=(), now=None,
+                 clock=time.monotonic):
+        self.units = list(units)
+        self.budget = CRAWL_TIME_BUDGET if budget is None else budget
+        self.freshness = district_freshness() if freshness is None else freshness
+        self.stats_path = stats_path
+        self.done = set(done)
+        self.now = now or datetime.now()
+        self.clock = clock
+        self.stats = self._load_stats()
+        known = [stats['seconds'] for districts in self.stats.values() for stats in districts.values()
+                 if stats.get('seconds') is not None]
+        self.default_estimate = float(np.median(known)) if known else CRAWL_DEFAULT_UNIT_SECONDS
+        self.attempted = []
+        self.failed = []
+        self.skipped = []
+        self.started_at = None
+        self._unit_started = None
+
+    def _load_stats(self):
+        if not self.stats_path or not os.path.exists(self.stats_path):
+            return {}
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取爬取统计%s失败，按没有历史处理: %s", self.stats_path, e)
+            return {}
+
+    def _unit_stats(self, city, district):
+        return self.stats.get(city, {}).get(district, {})
+
+    def estimate(self, city, district):
+        """区域的估计耗时（秒）"""
+        if (city, district) in self.done:
+            return 0.0
+        seconds = self._unit_stats(city, district).get('seconds')
+        return self.default_estimate if seconds is None else seconds
+
+    def priority(self, city, district):
+        crawl_time, month = self.freshness.get((city, district), (None, None))
+        failure_rate = self._unit_stats(city, district).get('failure_rate', 0.0)
+        return staleness_days(crawl_time, month, self.now) * (1 - failure_rate / 2)
+
+    def plan(self):
+        """全部区域的爬取顺序：检查点中已完成的在前，其余按优先级降序，同优先级保持登记顺序"""
+        return sorted(self.units, key=lambda unit: (unit not in self.done, -self.priority(*unit)))
+
+    def __iter__(self):
+        self.started_at = self.clock()
+        for unit in self.plan():
+            if self.budget > 0:
+                remaining = self.budget - (self.clock() - self.started_at)
+                if self.estimate(*unit) * CRAWL_ESTIMATE_MARGIN > remaining:
+                    self.skipped.append(unit)
+                    continue
+            self._unit_started = self.clock()
+            yield unit
+
+    def record(self, city, district, ok):
+        """记录刚给出的区域的爬取结果，耗时从给出该区域时算起"""
+        seconds = self.clock() - self._unit_started
+        self.attempted.append((city, district))
+        if not ok:
+            self.failed.append((city, district))
+        if (city, district) in self.done:
+            return  # 由检查点恢复，耗时不代表实际爬取
+        stats = self.stats.setdefault(city, {}).setdefault(district, {})
+        alpha = CRAWL_STATS_ALPHA
+        previous = stats.get('seconds')
+        stats['attempts'] = stats.get('attempts', 0) + 1
+        stats['failures'] = stats.get('failures', 0) + (0 if ok else 1)
+        stats['seconds'] = round(seconds if previous is None else (1 - alpha) * previous + alpha * seconds, 3)
+        stats['failure_rate'] = round((1 - alpha) * stats.get('failure_rate', 0.0) + alpha * (0 if ok else 1), 4)
+
+    def save(self):
+        if not self.stats_path:
+            return
+        with open(self.stats_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.stats, f, ensure_ascii=False, indent=2)
+        os.replace(self.stats_path + '.tmp', self.stats_path)
+
+    def coverage(self):
+        """本次运行相对时间预算的覆盖情况"""
+        elapsed = self.clock() - self.started_at if self.started_at is not None else 0.0
+        return {
+            'budget': self.budget,
+            'elapsed': round(elapsed, 1),
+            'units': len(self.units),
+            'attempted': len(self.attempted),
+            'failed': len(self.failed),
+            'skipped': len(self.skipped),
+            'coverage': round(len(self.attempted) / len(self.units), 4) if self.units else 1.0,
+            'skipped_estimate': round(sum(self.estimate(*unit) for unit in self.skipped), 1),
+            'skipped_units': [f"{city}-{district}" for city, district in self.skipped],
+        }
+
+    def finish(self):
+        """保存耗时统计，输出并返回覆盖情况；GitHub Actions中同时写入任务摘要"""
+        self.save()
+        report = self.coverage()
+        RUN_STATS["district_skipped"] += report['skipped']
+        budget = f"{report['budget']:.0f}s" if report['budget'] > 0 else "不限"
+        line = (f"预算调度: 预算{budget}, 用时{report['elapsed']:.1f}s, 爬取{report['attempted']}/{report['units']}个区域"
+                f"(覆盖{report['coverage']:.1%}, 失败{report['failed']}), "
+                f"跳过{report['skipped']}个区域沿用已存储数据(估计还需{report['skipped_estimate']:.0f}s)")
+        logger.info("%s", line)
+        if self.skipped:
+            logger.info("跳过的区域: %s", ", ".join(report['skipped_units']))
+        summary_file = os.environ.get('GITHUB_STEP_SUMMARY')
+        if summary_file:
+            with open(summary_file, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        return report
+
+# 简化版智能爬取函数
+def smart_crawl_juhui_house_price_data(city, district, max_retries=3):
+    """智能爬取函数，简化版本"""
+    # 尝试获取新数据
+    new_data = crawl_juhui_house_price_data(city, district, max_retries)
+    
+    if new_data is None:
+        logger.warning("无法获取%s-%s的新数据", city, district)
+        return None
+    
+    logger.info("成功获取%s-%s的新数据", city, district)
+    return new_data
+
+def _weekly_series(city, district, juhui_data, time_range_weeks):
+    """将聚汇数据格式转换为最近time_range_weeks周的周数据格式"""
+    base_price = juhui_data['average_price']
+    base_volume = juhui_data.get('transaction_count', 50)
+    today = datetime.now(pytz.timezone("Asia/Shanghai")).date()
+    weeks = get_weeks_dates(today - timedelta(weeks=time_range_weeks-1), time_range_weeks)
+
+    rng = district_rng(city, district, "weekly")
+    prices = base_price * (1 + 0.02 * rng.standard_normal(time_range_weeks))
+    volumes = np.maximum(10, (base_volume * (1 + 0.3 * rng.standard_normal(time_range_weeks))).astype(int))
+    return [
+        {
+            "date": week_date.strftime("%Y-%m-%d"),
+            "average_price": round(float(price), 2),
+            "transaction_count": int(volume),
+            "source": juhui_data.get('source', '聚汇数据'),
+            "monthly_data": juhui_data.get('monthly_data', [])  # 保留完整的月度历史数据
+        }
+        for week_date, price, volume in zip(weeks, prices, volumes)
+    ]
+
+# 获取所有城市和区域的房价数据 (简化版本)
+def get_all_house_price_data(time_range_weeks, on_district=None):
+    """
+    在时间预算内爬取全部区域，返回报告数据
+    on_district(city, district, result)在每个区域爬取结束后于爬取线程中调用；result为该区域记入检查点的结果
+（即最后由checkpoint.compact()校验并写入存储的数据），失败时为None
+    """
+    RUN_STATS.clear()
+    started_at = time.perf_counter()
+    checkpoint = CrawlCheckpoint()
+    scheduler = CrawlScheduler(REGISTRY.units(), done=checkpoint.districts)
+    results = {}
+    failed = []
+    
+    # 按调度器给出的顺序在时间预算内爬取
+    for city, district in scheduler:
+        logger.debug("获取%s-%s的房价数据...", city, district)
         
-        all_data[city] = city_data
+        # 尝试获取真实数据；失败的区域在全部爬取结束后统一生成模拟数据，不再重复爬取
+        juhui_data = crawl_juhui_house_price_data(city, district, checkpoint=checkpoint)
+        ok = bool(juhui_data and 'average_price' in juhui_data)
+        scheduler.record(city, district, ok)
+        if ok:
+            RUN_STATS["district_ok"] += 1
+            logger.info("成功获取%s-%s的数据: %s元/㎡", city, district, juhui_data['average_price'])
+            results[(city, district)] = juhui_data
+        else:
+            RUN_STATS["district_failed"] += 1
+            logger.warning("无法获取%s-%s的数据，将使用模拟数据", city, district)
+            failed.append((city, district))
+        if on_district is not None:
+            on_district(city, district, checkpoint.get_district(city, district) if ok else None)
+    scheduler.finish()
+    
+    # 预算内未轮到的区域沿用已存储的数据；没有已存储数据时与失败区域一样使用模拟数据
+    for unit, stored in load_district_entries(scheduler.skipped).items():
+        summary = _summarize_crawl_result(stored) if stored else None
+        if summary:
+            results[unit] = summary
+        else:
+            failed.append(unit)
+    
+    # 报告数据按登记顺序组织，与爬取顺序无关
+    all_data = {
+        city: {
+            district: _weekly_series(city, district, results[(city, district)], time_range_weeks)
+            if (city, district) in results else None
+            for district in REGISTRY.districts(city)
+        }
+        for city in REGISTRY.cities()
+    }
+    
+    # 失败区域统一并行生成模拟数据
+    fallbacks = generate_mock_fallbacks(failed, time_range_weeks)
+    for (city, district), series in fallbacks.items():
+        all_data[city][district] = series
+    RUN_STATS["mock_fallbacks"] += len(fallbacks)
+    if fallbacks:
+        logger.warning("%d个区域使用模拟数据: %s", len(fallbacks),
+                       ", ".join(f"{city}-{district}" for city, district in fallbacks))
     
+    # 整批校验后写入存储，报告数据同步使用校验后的月度数据
+    for result in checkpoint.compact():
+        for entry in all_data.get(result['city'], {}).get(result['district']) or []:
+            entry['monthly_data'] = result['monthly_data']
+    log_run_summary(started_at)
     return all_data
 
+def load_all_data_from_store(json_filename='crawl_data.json'):
+    """不爬取，直接由数据存储构造与get_all_house_price_data相同结构的报告数据"""
+    if STORE_BACKEND == "sqlite":
+        with open_history_store() as store:
+            return store.export_report_data(REGISTRY)
+    return report_data_from_crawl_data(load_existing_crawl_data(json_filename))
+
+def report_data_from_crawl_data(crawl_data):
+    """由crawl_data.json结构构造报告数据，只包含登记表中的区域"""
+    all_data = {}
+    for city in REGISTRY.cities():
+        all_data[city] = {}
+        for district in REGISTRY.districts(city):
+            entry = crawl_data.get(city, {}).get(district)
+            all_data[city][district] = [{'monthly_data': entry.get('monthly_data', [])}] if entry else [{}]
+    return all_data
+
+# 分片爬取：按(城市, 区域)哈希把工作单元确定性地分配到N个分片，各分片写入独立的部分数据文件
+class MergeConflictError(ValueError):
+    """多个部分数据文件中同一区域同一月份的数据不一致"""
+
+def shard_of(city, district, shard_count):
+    """返回区域所属分片编号；使用稳定哈希，不受PYTHONHASHSEED影响"""
+    digest = hashlib.sha1(f"{city}/{district}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+def parse_shard_spec(spec):
+    """解析形如"i/N"的分片参数"""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"分片参数格式应为i/N: {spec}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片编号超出范围: {spec}")
+    return index, count
+
+def shard_store_path(shard_index, shard_count):
+    return f"crawl_data.shard-{shard_index}-of-{shard_count}.json"
+
+def crawl_shard(shard_index, shard_count, output=None):
+    """在时间预算内爬取属于本分片的区域，结果写入部分数据文件（不生成模拟数据）"""
+    output = output or shard_store_path(shard_index, shard_count)
+    units = [unit for unit in REGISTRY.units() if shard_of(*unit, shard_count) == shard_index]
+    logger.info("分片%d/%d: 共%d个区域", shard_index, shard_count, len(units))
+
+    RUN_STATS.clear()
+    started_at = time.perf_counter()
+    checkpoint = CrawlCheckpoint(path=f"crawl_checkpoint.shard-{shard_index}-of-{shard_count}.jsonl")
+    # 预算内未轮到的区域不写入部分数据文件，合并后沿用已存储的数据
+    scheduler = CrawlScheduler(units, stats_path=f"crawl_stats.shard-{shard_index}-of-{shard_count}.json",
+                               done=checkpoint.districts)
+    for city, district in scheduler:
+        ok = bool(crawl_juhui_house_price_data(city, district, checkpoint=checkpoint))
+        scheduler.record(city, district, ok)
+        RUN_STATS["district_ok" if ok else "district_failed"] += 1
+    scheduler.finish()
+    # 分片结果始终写入部分数据文件，由merge合并时再记录修订
+    checkpoint.compact(output, backend="json", revisions=False)
+    if not os.path.exists(output):
+        save_crawl_data({}, output)
+    log_run_summary(started_at)
+    return output
+
+def _month_values(entry):
+    return {row['month']: (row.get('second_hand_price'), row.get('new_house_price'))
+            for row in entry.get('monthly_data', [])}
+
+def merge_partial_stores(paths, output='crawl_data.json'):
+    """
+    把各分片的部分数据文件合并进主数据文件
+    同一区域出现在多个分片且同月数据不一致时拒绝合并并抛出MergeConflictError；
+    没有冲突时合并各分片的月份（只有一个分片包含的月份也保留），区域级字段和crawl_time取爬取时间较晚的分片
+    """
+    merged = {}
+    origins = {}
+    conflicts = []
+    for path in paths:
+        if not os.path.exists(path):
+            logger.warning("部分数据文件不存在，跳过: %s", path)
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            partial = compact_crawl_data(json.load(f))
+        for city, districts in partial.items():
+            for district, entry in districts.items():
+                key = (city, district)
+                if key not in merged:
+                    merged[key] = entry
+                    origins[key] = path
+                    continue
+                existing = _month_values(merged[key])
+                for month, values in _month_values(entry).items():
+                    if month in existing and existing[month] != values:
+                        conflicts.append(f"{city}-{district} {month}: {origins[key]}={existing[month]} {path}={values}")
+                older, newer = merged[key], entry
+                if entry.get('crawl_time', '') > merged[key].get('crawl_time', ''):
+                    origins[key] = path
+                else:
+                    older, newer = newer, older
+                merged[key] = dict(newer, monthly_data=merge_monthly_rows(older.get('monthly_data') or [],
+                                                                          newer.get('monthly_data') or []))
+    if conflicts:
+        raise MergeConflictError("部分数据存在冲突:\n" + "\n".join(conflicts))
+
+    persist_crawl_results(merged.values(), output)
+    logger.info("已合并%d个部分数据文件中的%d个区域到%s", len(paths), len(merged), store_location(output))
+    return output
+
 # 生成Plotly图表的HTML代码
-def generate_plotly_chart_html(data, city, district):
-    # 直接从crawl_data.json加载月度数据
-    crawl_data = load_existing_crawl_data()
+# 概览曲线最多保留的点数；可视范围内的月份数不超过该值时页面切换为完整数据
+OVERVIEW_POINTS = 100
+
+def lttb_indices(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets降采样，返回保留点的下标（升序，含首尾）
+    横轴按等间隔月份处理，values为按月份排序的价格序列
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    y = np.asarray(values, dtype=float)
+    x = np.arange(n, dtype=float)
+    # 中间n-2个点均分到threshold-2个桶，首尾点固定保留
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # 下一个桶的平均点作为三角形的第三个顶点
+        if bucket + 2 < len(edges):
+            next_start, next_end = end, edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices.append(previous)
+    indices.append(n - 1)
+    return indices
+
+def downsample_monthly_data(monthly_data, threshold=OVERVIEW_POINTS):
+    """
+    按二手房价格做LTTB降采样，保留被选中月份的完整记录（新房价格随同保留）
+    monthly_data需已按月份排序；缺少二手房价格的月份按相邻值补齐后参与计算
+    """
+    if len(monthly_data) <= threshold:
+        return monthly_data
+    prices = np.array([row.get('second_hand_price') or np.nan for row in monthly_data], dtype=float)
+    valid = ~np.isnan(prices)
+    if not valid.any():
+        prices = np.array([row.get('new_house_price') or np.nan for row in monthly_data], dtype=float)
+        valid = ~np.isnan(prices)
+    if not valid.any():
+        return monthly_data[::max(1, len(monthly_data) // threshold)]
+    positions = np.arange(len(prices))
+    prices = np.interp(positions, positions[valid], prices[valid])
+    return [monthly_data[i] for i in lttb_indices(prices, threshold)]
+
+def generate_plotly_chart_html(data, city, district, forecast=None):
+    # 直接从数据存储加载月度数据（SQLite后端只读取该区域）
+    stored = load_district_entry(city, district)
     
-    if city in crawl_data and district in crawl_data[city]:
-        monthly_data = crawl_data[city][district].get('monthly_data', [])
+    if stored is not None:
+        monthly_data = stored.get('monthly_data', [])
     else:
         # 如果没有crawl_data，尝试从传入的数据中获取
         district_data = data[city][district]
@@ -675,8 +2194,8 @@ def generate_plotly_chart_html(data, city, district):
     if not monthly_data:
         return {'data': [], 'layout': {}}
     
-    # 准备月度数据 - 按时间排序
-    monthly_data.sort(key=lambda x: x['month'])
+    # 准备月度数据 - 存储中为倒序，反转为时间正序；长历史只绘制降采样后的概览曲线
+    monthly_data = downsample_monthly_data(monthly_data[::-1])
     
     # 提取月度日期和价格数据
     monthly_dates = []
@@ -711,6 +2230,18 @@ def generate_plotly_chart_html(data, city, district):
                           mode='lines+markers', marker=dict(size=6, symbol='diamond'))
             )
     
+    # 趋势预测：从最后一个实际数据点开始的虚线外推（forecast为district_forecast的返回值）
+    if forecast:
+        anchor_x, anchor_y = [], []
+        if monthly_second_hand_prices[-1]:
+            anchor_x, anchor_y = [monthly_dates[-1]], [monthly_second_hand_prices[-1]]
+        fig.add_trace(
+            go.Scatter(x=anchor_x + [f"{month}-01" for month in forecast['months']],
+                      y=anchor_y + list(forecast['values']), name="二手房价格预测",
+                      line=dict(color='#FF6384', width=2, dash='dash'),
+                      mode='lines', meta='forecast')
+        )
+    
     fig.update_xaxes(
         title_text="日期",
         tickformat='%Y年%m月',  # 中文日期格式
@@ -748,53 +2279,8 @@ def generate_plotly_chart_html(data, city, district):
     # 只返回数据部分，不包含Plotly库引用
     return fig.to_dict()
 
-# 生成简化版的HTML报告，主要展示图表和选择器
-def generate_simplified_house_price_html():
-    html_filename = 'house_price_report.html'
-    current_time = datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y年%m月%d日 %H:%M:%S")
-    
-    default_weeks = 260  # 保持5年数据（260周）
-    all_data = get_all_house_price_data(default_weeks)
-    
-    # 简化数据结构，只保留必要的月度数据
-    simplified_data = {}
-    for city, districts in all_data.items():
-        simplified_data[city] = {}
-        for district, data_entries in districts.items():
-            # 只保留最新的月度数据（假设是列表中的第一个元素）
-            if data_entries and len(data_entries) > 0 and 'monthly_data' in data_entries[0]:
-                simplified_data[city][district] = [{"monthly_data": data_entries[0]['monthly_data']}]
-            else:
-                simplified_data[city][district] = [{}]
-    
-    default_city = "北京"
-    default_district = CITIES[default_city][0]
-    
-    # 使用简化后的数据生成默认图表
-    default_chart_data = generate_plotly_chart_html(simplified_data, default_city, default_district)
-    # 修改默认图表的背景色为透明
-    if 'layout' in default_chart_data and 'template' in default_chart_data['layout']:
-        if 'layout' in default_chart_data['layout']['template']:
-            default_chart_data['layout']['template']['layout']['paper_bgcolor'] = 'rgba(0,0,0,0)'
-            default_chart_data['layout']['template']['layout']['plot_bgcolor'] = 'rgba(0,0,0,0)'
-    default_chart_json = json.dumps(default_chart_data, separators=(',', ':'))  # 紧凑JSON
-    
-    city_options = []
-    for city in CITIES.keys():
-        selected = ' selected' if city == default_city else ''
-        city_options.append(f'<option value="{city}"{selected}>{city}</option>')
-    
-    district_options = []
-    for district in CITIES[default_city]:
-        selected = ' selected' if district == default_district else ''
-        district_options.append(f'<option value="{district}"{selected}>{district}</option>')
-    
-    # 使用紧凑的JSON序列化，移除空白字符
-    data_json = json.dumps(simplified_data, separators=(',', ':'))
-    cities_json = json.dumps(CITIES, separators=(',', ':'))
-    
-    # 使用字符串替换而非f-string来避免JavaScript语法冲突
-    html_template = '''
+# HTML报告模板，使用占位符而非f-string来避免JavaScript语法冲突
+HTML_TEMPLATE = '''
     <!DOCTYPE html>
     <html lang="zh-CN">
     <head>
@@ -952,8 +2438,22 @@ def generate_simplified_house_price_html():
                     min-height: 300px;
                 }
             }
+            
+            /* 多区域对比 */
+            .compare-group { flex: 1; }
+            #compare-select { min-height: 160px; }
+            #compare-chart { width: 100%; height: 600px; background-color: transparent; }
+            .chart-placeholder { display: block; width: 100%; height: 100%; object-fit: contain; }
+            .city-overviews { display: flex; flex-wrap: wrap; gap: 16px; margin-bottom: 20px; }
+            .city-overviews figure { flex: 1 1 300px; text-align: center; }
+            .city-overviews img { width: 100%; height: auto; }
+            .city-overviews figcaption { color: #666; font-size: 14px; }
+            @media (max-width: 768px) {
+                #compare-select { min-height: 120px; }
+                #compare-chart { height: 400px; }
+            }
         </style>
-        <script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+        [OG_IMAGE_META]
     </head>
     <body>
         <div class="container">
@@ -980,10 +2480,33 @@ def generate_simplified_house_price_html():
             </div>
             
             <div class="chart-container">
-                <div id="house-price-chart"></div>
+                <div id="house-price-chart">[CHART_PLACEHOLDER]</div>
+            </div>
+            [CITY_OVERVIEWS]
+            
+            <div class="selector-container">
+                <div class="selector-group compare-group">
+                    <label for="compare-select">多区域对比（按住Ctrl/⌘多选）:</label>
+                    <select id="compare-select" multiple>
+                        [COMPARE_OPTIONS]
+                    </select>
+                </div>
+                <div class="selector-group">
+                    <label for="compare-field">对比指标:</label>
+                    <select id="compare-field">
+                        <option value="second_hand" selected>二手房价格</option>
+                        <option value="new_house">新房价格</option>
+                    </select>
+                </div>
+            </div>
+            
+            <div class="chart-container">
+                <div id="compare-chart"></div>
             </div>
         </div>
         
+        <!-- Plotly放在页面末尾加载：下载期间页面已显示静态占位图 -->
+        <script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
         <script>
             const citiesData = CITIES_JSON;
             const housePriceData = DATA_JSON;
@@ -1089,6 +2612,11 @@ def generate_simplified_house_price_html():
             }
             
             function updateChart(selectedCity, selectedDistrict) {
+                // 首次绘制时移除静态占位图
+                const placeholder = document.getElementById('chart-placeholder');
+                if (placeholder) {
+                    placeholder.remove();
+                }
                 const districtData = housePriceData[selectedCity][selectedDistrict];
                 
                 // 获取月度数据
@@ -1098,9 +2626,7 @@ def generate_simplified_house_price_html():
                     return;
                 }
                 
-                // 按时间排序
-                monthlyData.sort((a, b) => a.month.localeCompare(b.month));
-                
+                // 概览数据已按时间正序生成，无需排序
                 // 提取月度日期和价格数据
                 const monthlyDates = [];
                 const monthlySecondHandPrices = [];
@@ -1150,6 +2676,11 @@ def generate_simplified_house_price_html():
                     data.push(trace2);
                 }
                 
+                const forecast = forecastTrace(selectedCity, selectedDistrict, monthlyData);
+                if (forecast) {
+                    data.push(forecast);
+                }
+                
                 const chartHeight = getChartHeight();
                 
                 // 根据屏幕宽度调整边距
@@ -1221,6 +2752,102 @@ def generate_simplified_house_price_html():
                 }
                 
                 Plotly.newPlot(chartContainer, data, layout);
+                attachDetailLoader(selectedCity, selectedDistrict, monthlyData, districtData[0].points || monthlyData.length);
+            }
+            
+            // 趋势预测：从最后一个实际数据点起以虚线外推
+            const forecastData = FORECAST_JSON;
+            
+            function forecastTrace(city, district, monthlyData) {
+                const values = forecastData.values[city] && forecastData.values[city][district];
+                if (!values) {
+                    return null;
+                }
+                const last = monthlyData[monthlyData.length - 1];
+                const anchored = last && last.second_hand_price;
+                return {
+                    type: 'scatter',
+                    x: (anchored ? [last.month + '-01'] : []).concat(forecastData.months.map(month => month + '-01')),
+                    y: (anchored ? [last.second_hand_price] : []).concat(values),
+                    name: '二手房价格预测',
+                    line: {color: '#FF6384', width: 2, dash: 'dash'},
+                    mode: 'lines',
+                    meta: 'forecast',
+                    yaxis: 'y'
+                };
+            }
+            
+            // 长历史：页面只内嵌降采样概览，放大到不超过detailIndex.threshold个月时按需加载该城市的完整数据
+            const detailIndex = DETAIL_JSON;
+            const detailCache = {};  // 城市 → 完整数据的Promise，同一城市只请求一次
+            
+            function loadCityDetail(city) {
+                if (!detailCache[city]) {
+                    detailCache[city] = fetch(detailIndex.files[city])
+                        .then(response => {
+                            if (!response.ok) {
+                                throw new Error('HTTP ' + response.status);
+                            }
+                            return response.json();
+                        })
+                        .catch(error => {
+                            delete detailCache[city];  // 失败后允许下次缩放时重试
+                            throw error;
+                        });
+                }
+                return detailCache[city];
+            }
+            
+            function priceArrays(rows) {
+                // 概览和完整数据文件均已按时间正序生成
+                return {
+                    x: rows.map(item => item.month + '-01'),
+                    secondHand: rows.map(item => item.second_hand_price || 0),
+                    newHouse: rows.map(item => item.new_house_price !== undefined ? item.new_house_price : null)
+                };
+            }
+            
+            function visibleMonths(range) {
+                const start = Date.parse(String(range[0]).replace(' ', 'T'));
+                const end = Date.parse(String(range[1]).replace(' ', 'T'));
+                return (end - start) / (30.44 * 24 * 3600 * 1000);
+            }
+            
+            function attachDetailLoader(city, district, overviewRows, totalPoints) {
+                chartContainer.removeAllListeners('plotly_relayout');
+                if (totalPoints <= overviewRows.length || !detailIndex.files[city]) {
+                    return;  // 概览已是完整数据
+                }
+                let showingDetail = false;
+                chartContainer.on('plotly_relayout', function() {
+                    const range = chartContainer.layout.xaxis && chartContainer.layout.xaxis.range;
+                    if (!range) {
+                        return;
+                    }
+                    const wantDetail = visibleMonths(range) <= detailIndex.threshold;
+                    if (wantDetail === showingDetail) {
+                        return;
+                    }
+                    showingDetail = wantDetail;
+                    const rowsReady = wantDetail
+                        ? loadCityDetail(city).then(detail => detail[district] || overviewRows)
+                        : Promise.resolve(overviewRows);
+                    rowsReady.then(rows => {
+                        if (citySelect.value !== city || districtSelect.value !== district) {
+                            return;  // 加载期间已切换区域
+                        }
+                        const arrays = priceArrays(rows);
+                        // 只替换实际价格曲线，预测曲线保持不变
+                        const traceCount = Math.min(chartContainer.data.filter(trace => trace.meta !== 'forecast').length, 2);
+                        Plotly.restyle(chartContainer, {
+                            x: [arrays.x, arrays.x].slice(0, traceCount),
+                            y: [arrays.secondHand, arrays.newHouse].slice(0, traceCount)
+                        }, [0, 1].slice(0, traceCount));
+                    }).catch(error => {
+                        showingDetail = false;
+                        console.warn('完整数据加载失败，继续显示概览', error);
+                    });
+                });
             }
             
             // 添加窗口大小变化监听器，确保图表响应式调整
@@ -1262,24 +2889,1000 @@ def generate_simplified_house_price_html():
                 const selectedDistrict = this.value;
                 updateChart(selectedCity, selectedDistrict);
             });
+            
+            // 多区域对比：直接使用生成器预先对齐的 区域×月份 价格矩阵，不再逐区域重建数组
+            const compareData = COMPARE_JSON;
+            const compareDates = compareData.months.map(month => month + '-01');  // 月份轴只转换一次
+            const compareSelect = document.getElementById('compare-select');
+            const compareField = document.getElementById('compare-field');
+            const compareContainer = document.getElementById('compare-chart');
+            
+            function buildCompareTraces(data, dates, indices, field) {
+                const matrix = data[field];
+                return indices.map(index => ({
+                    type: 'scatter',
+                    mode: 'lines',
+                    x: dates,
+                    y: matrix[index],
+                    name: data.series[index][0] + '-' + data.series[index][1],
+                    connectgaps: false  // 缺失月份保持断开
+                }));
+            }
+            
+            function updateCompareChart() {
+                const indices = Array.from(compareSelect.selectedOptions, option => Number(option.value));
+                const traces = buildCompareTraces(compareData, compareDates, indices, compareField.value);
+                const layout = {
+                    title: {text: '多区域' + compareField.options[compareField.selectedIndex].text + '对比'},
+                    xaxis: {type: 'date', tickformat: '%Y年%m月', tickangle: -45, automargin: true},
+                    yaxis: {title: '房价（元/㎡）', tickformat: '.0f', automargin: true},
+                    legend: {orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1},
+                    paper_bgcolor: 'transparent',
+                    plot_bgcolor: 'transparent'
+                };
+                Plotly.react(compareContainer, traces, layout);
+            }
+            
+            compareSelect.addEventListener('change', updateCompareChart);
+            compareField.addEventListener('change', updateCompareChart);
+            updateCompareChart();
         </script>
     </body>
     </html>
     '''
+
+HTML_TEMPLATE_PLACEHOLDERS = ('[CURRENT_TIME]', '[CITY_OPTIONS]', '[DISTRICT_OPTIONS]', '[COMPARE_OPTIONS]',
+                              '[OG_IMAGE_META]', '[CHART_PLACEHOLDER]', '[CITY_OVERVIEWS]',
+                              'CITIES_JSON', 'DATA_JSON', 'DEFAULT_CHART_JSON', 'COMPARE_JSON', 'DETAIL_JSON',
+                              'FORECAST_JSON')
+
+def compile_template(template, placeholders):
+    """
+    把模板一次性切分为[(片段文本, 占位符或None), ...]
+    渲染时不再对整份文档做多次replace，也不会在已替换的内容中误匹配占位符
+    """
+    pattern = re.compile('|'.join(re.escape(p) for p in placeholders))
+    parts = []
+    position = 0
+    for match in pattern.finditer(template):
+        parts.append((template[position:match.start()], match.group(0)))
+        position = match.end()
+    parts.append((template[position:], None))
+    return parts
+
+HTML_TEMPLATE_PARTS = compile_template(HTML_TEMPLATE, HTML_TEMPLATE_PLACEHOLDERS)
+
+def render_template_to_file(parts, values, filename):
+    """
+    流式渲染模板到文件：值为字符串时直接写入，为可调用对象时以文件对象调用（如json.dump）
+    先写临时文件再替换，避免中途失败留下残缺的报告
+    """
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        for text, placeholder in parts:
+            f.write(text)
+            if placeholder is None:
+                continue
+            value = values[placeholder]
+            if callable(value):
+                value(f)
+            else:
+                f.write(value)
+    os.replace(tmp_filename, filename)
+    return filename
+
+def dump_json_chunked(obj, f, depth=2, separators=(',', ':')):
+    """
+    分块写出JSON：前depth层字典逐个键写出，更深层用json.dumps整体序列化
+    输出与json.dumps(obj, separators=separators)逐字节一致，峰值内存约为最大的单个子对象；
+    json.dump的流式编码是纯Python实现，整体比按块调用C加速的json.dumps慢得多
+    """
+    if depth <= 0 or not isinstance(obj, dict) or not all(isinstance(k, str) for k in obj):
+        f.write(json.dumps(obj, separators=separators, default=json_record))
+        return
+    item_separator, key_separator = separators
+    f.write('{')
+    for index, (key, value) in enumerate(obj.items()):
+        if index:
+            f.write(item_separator)
+        f.write(json.dumps(key))
+        f.write(key_separator)
+        dump_json_chunked(value, f, depth - 1, separators)
+    f.write('}')
+
+# 多区域对比：预先把所有区域的月度数据对齐到统一月份轴
+def build_aligned_price_matrix(simplified_data, max_months=None, recent_months=None):
+    """
+    生成 区域×月份 的价格矩阵，缺失月份为NaN
+    max_months限制月份轴长度：超出时从最新月份起等间隔抽取，使长历史下的页面负载保持不变；
+    recent_months只保留截至最新月份的若干个日历月（用于趋势预测的拟合窗口），各区域按二分查找切片，不遍历更早的历史
+    返回 {'months': [...], 'series': [(city, district), ...], 'second_hand': ndarray, 'new_house': ndarray}
+    """
+    series = []
+    monthly_lists = []
+    for city, districts in simplified_data.items():
+        for district, entries in districts.items():
+            series.append((city, district))
+            monthly_lists.append(entries[0].get('monthly_data', []) if entries else [])
+    if recent_months:
+        latest = max((monthly[0]['month'] for monthly in monthly_lists if monthly), default=None)
+        if latest:
+            start = shift_month(latest, 1 - recent_months)
+            monthly_lists = [month_range(monthly, start) for monthly in monthly_lists]
+    months = sorted({row['month'] for monthly in monthly_lists for row in monthly})
+    if max_months and len(months) > max_months:
+        step = -(-len(months) // max_months)
+        months = months[::-1][::step][::-1]
+    month_index = {month: i for i, month in enumerate(months)}
+
+    second_hand = np.full((len(series), len(months)), np.nan)
+    new_house = np.full((len(series), len(months)), np.nan)
+    for row_index, monthly in enumerate(monthly_lists):
+        for row in monthly:
+            column = month_index.get(row['month'])
+            if column is None:
+                continue
+            if row.get('second_hand_price') is not None:
+                second_hand[row_index, column] = row['second_hand_price']
+            if row.get('new_house_price') is not None:
+                new_house[row_index, column] = row['new_house_price']
+    return {'months': months, 'series': series, 'second_hand': second_hand, 'new_house': new_house}
+
+def _matrix_to_rows(matrix):
+    """把NaN转换为null（JSON不支持NaN，Plotly把null视为断点）"""
+    return np.where(np.isnan(matrix), None, matrix).tolist()
+
+def compare_payload(matrix):
+    """页面使用的紧凑对比数据"""
+    return {
+        'months': matrix['months'],
+        'series': [list(pair) for pair in matrix['series']],
+        'second_hand': _matrix_to_rows(matrix['second_hand']),
+        'new_house': _matrix_to_rows(matrix['new_house']),
+    }
+
+def compare_options_html(series, preselected=3):
+    """按城市分组的多选框选项，默认选中前几个城市各自的第一个区域"""
+    groups = {}
+    for index, (city, district) in enumerate(series):
+        groups.setdefault(city, []).append((index, district))
+    options = []
+    for group_index, (city, districts) in enumerate(groups.items()):
+        options.append(f'<optgroup label="{city}">')
+        for position, (index, district) in enumerate(districts):
+            selected = ' selected' if position == 0 and group_index < preselected else ''
+            options.append(f'<option value="{index}"{selected}>{city}-{district}</option>')
+        options.append('</optgroup>')
+    return ''.join(options)
+
+# 趋势预测：所有区域对齐到同一月份轴后一次性批量拟合，在图表中以虚线外推
+FORECAST_MONTHS = int(os.environ.get("FORECAST_MONTHS", "12"))  # 外推月数，0表示不预测
+FORECAST_FIT_MONTHS = 36  # 拟合窗口：最近若干个月，更早的历史不影响当前趋势
+FORECAST_MIN_POINTS = 12  # 窗口内有效月份少于该值的区域不预测
+FORECAST_CACHE = {}  # 数据哈希 -> 预测结果
+
+def shift_month(month, offset):
+    """YYYY-MM加减若干个月"""
+    total = int(month[:4]) * 12 + int(month[5:7]) - 1 + offset
+    return f"{total // 12}-{total % 12 + 1:02d}"
+
+def _forecast_design(ordinals, origin):
+    """设计矩阵：截距、以年为单位的线性趋势、年周期与半年周期的正弦/余弦项"""
+    angle = 2 * np.pi * ordinals / 12
+    return np.column_stack([np.ones_like(ordinals), (ordinals - origin) / 12,
+                            np.sin(angle), np.cos(angle), np.sin(2 * angle), np.cos(2 * angle)])
+
+def forecast_price_matrix(matrix, horizon=None, min_points=FORECAST_MIN_POINTS):
+    """
+    对矩阵中全部区域的二手房价格一次性拟合 log(价格) = 截距 + 趋势 + 季节项，并外推horizon个月
+    各区域的缺失月份不同：缺失项权重为0，用einsum批量构造每个区域的正规方程后一次求解，没有逐区域的Python循环。
+    结果按数据哈希缓存；返回 {'months': [未来月份], 'values': {(city, district): [预测价格]}}
+    """
+    horizon = FORECAST_MONTHS if horizon is None else horizon
+    months = matrix['months']
+    if not horizon or not months:
+        return {'months': [], 'values': {}}
+    prices = matrix['second_hand']
+    digest = hashlib.sha256(json.dumps([months, matrix['series'], horizon, min_points],
+                                       ensure_ascii=False).encode('utf-8'))
+    digest.update(np.ascontiguousarray(prices).tobytes())
+    key = digest.hexdigest()
+    if key in FORECAST_CACHE:
+        RUN_STATS["forecast_cache_hits"] += 1
+        return FORECAST_CACHE[key]
+
+    # 以月序号为时间轴，季节项的相位由日历月份决定，与月份轴上是否有空缺无关
+    ordinals = np.array([int(month[:4]) * 12 + int(month[5:7]) - 1 for month in months], dtype=float)
+    origin = ordinals[-1]
+    design = _forecast_design(ordinals, origin)
+    future_design = _forecast_design(origin + np.arange(1, horizon + 1, dtype=float), origin)
+
+    valid = np.isfinite(prices) & (prices > 0)
+    weights = valid.astype(float)
+    logs = np.log(np.where(valid, prices, 1.0))
+    normal = np.einsum('sm,mi,mj->sij', weights, design, design)
+    rhs = np.einsum('sm,mi,sm->si', weights, design, logs)
+    # 季节项加很小的岭惩罚，窗口内数据集中在少数月份时方程仍可解
+    normal += np.diag([0.0, 0.0, 1e-3, 1e-3, 1e-3, 1e-3])
+    fitted = valid.sum(axis=1) >= min_points
+    coefficients = np.linalg.solve(normal[fitted], rhs[fitted][..., None])[..., 0]
+    predicted = np.round(np.exp(coefficients @ future_design.T), 2)
+
+    series = [pair for pair, ok in zip(matrix['series'], fitted) if ok]
+    result = {
+        'months': [shift_month(months[-1], step) for step in range(1, horizon + 1)],
+        'values': dict(zip(series, predicted.tolist())),
+    }
+    FORECAST_CACHE[key] = result
+    return result
+
+def forecast_payload(forecast):
+    """页面使用的预测数据：{'months': [...], 'values': {city: {district: [...]}}}"""
+    values = {}
+    for (city, district), predicted in forecast['values'].items():
+        values.setdefault(city, {})[district] = predicted
+    return {'months': forecast['months'], 'values': values}
+
+def district_forecast(forecast, city, district):
+    """单个区域的预测 {'months': [...], 'values': [...]}，未预测时返回None"""
+    if not forecast or (city, district) not in forecast['values']:
+        return None
+    return {'months': forecast['months'], 'values': forecast['values'][(city, district)]}
+
+# 长历史：页面内嵌降采样概览，完整数据按城市拆分为独立文件按需加载
+def district_overview(monthly, threshold=OVERVIEW_POINTS):
+    """单个区域的概览：按月份正序降采样后的月度数据，points记录完整数据点数"""
+    if not monthly:
+        return [{}]
+    monthly = monthly[::-1]
+    return [{'monthly_data': downsample_monthly_data(monthly, threshold), 'points': len(monthly)}]
+
+def build_overview_data(simplified_data, threshold=OVERVIEW_POINTS, prepared=None):
+    """
+    把每个区域的月度数据替换为排序后的降采样概览
+    prepared为{(city, district): (月度数据, 概览)}，月度数据与当前数据相同的区域直接沿用已计算的概览
+    """
+    overview = {}
+    prepared = prepared or {}
+    for city, districts in simplified_data.items():
+        overview[city] = {}
+        for district, entries in districts.items():
+            monthly = entries[0].get('monthly_data') if entries else None
+            known = prepared.get((city, district))
+            if known is not None and monthly and known[0] == monthly:
+                overview[city][district] = known[1]
+            else:
+                overview[city][district] = district_overview(monthly, threshold)
+    return overview
+
+def detail_dir_path(html_filename):
+    return os.path.splitext(html_filename)[0] + '.detail'
+
+def write_detail_files(simplified_data, html_filename):
+    """
+    每个城市的完整月度数据写成一个以内容哈希命名的JSON文件，数据未变的城市沿用已有文件
+    返回 {city: 相对于HTML的路径}；目录中不再被引用的旧文件会被删除
+    """
+    detail_dir = detail_dir_path(html_filename)
+    os.makedirs(detail_dir, exist_ok=True)
+    files = {}
+    for city, districts in simplified_data.items():
+        # 页面放大时只需要月份和两类价格
+        payload = {
+            district: [
+                {'month': row['month'], 'second_hand_price': row.get('second_hand_price'),
+                 'new_house_price': row.get('new_house_price')}
+                for row in reversed(entries[0]['monthly_data'])
+            ]
+            for district, entries in districts.items()
+            if entries and entries[0].get('monthly_data')
+        }
+        if not payload:
+            continue
+        text = json.dumps(payload, separators=(',', ':'))
+        name = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16] + '.json'
+        path = os.path.join(detail_dir, name)
+        if not os.path.exists(path):
+            with open(path + '.tmp', 'w', encoding='ascii') as f:
+                f.write(text)
+            os.replace(path + '.tmp', path)
+        files[city] = f"{os.path.basename(detail_dir)}/{name}"
+    referenced = {os.path.basename(path) for path in files.values()}
+    for name in os.listdir(detail_dir):
+        if name not in referenced:
+            os.remove(os.path.join(detail_dir, name))
+    return files
+
+# 内容寻址构建：数据与模板的哈希未变化时跳过图表和HTML生成
+# 修改生成逻辑（不只是模板文本）时需要递增BUILD_VERSION，使旧清单失效
+BUILD_VERSION = 1
+TEMPLATE_VERSION = f"{BUILD_VERSION}-{hashlib.sha256(HTML_TEMPLATE.encode('utf-8')).hexdigest()[:12]}"
+
+# 最近一次构建的结果，供推送阶段判断是否为空构建
+LAST_BUILD = {"noop": False, "content_hash": None}
+
+class _HashWriter:
+    """把写入的文本直接送入哈希，避免为计算哈希而拼出整段JSON"""
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+
+    def write(self, text):
+        self.hasher.update(text.encode('utf-8'))
+
+def compute_build_hash(simplified_data, city_districts):
+    """对规范化后的报告数据、模板版本、静态图表图片配置和趋势预测配置计算内容哈希"""
+    hasher = hashlib.sha256(f"{TEMPLATE_VERSION}:{CHART_IMAGE_VERSION}:{CHART_IMAGE_FORMAT}:"
+                            f"{FORECAST_MONTHS}:{FORECAST_FIT_MONTHS}:{FORECAST_MIN_POINTS}".encode('utf-8'))
+    writer = _HashWriter(hasher)
+    dump_json_chunked(city_districts, writer, depth=1)
+    normalized = {
+        city: {district: entries[0].get('monthly_data', []) for district, entries in districts.items()}
+        for city, districts in simplified_data.items()
+    }
+    dump_json_chunked(normalized, writer)
+    return hasher.hexdigest()
+
+def build_manifest_path(html_filename):
+    return os.path.splitext(html_filename)[0] + '.manifest.json'
+
+def read_build_manifest(html_filename):
+    try:
+        with open(build_manifest_path(html_filename), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_build_manifest(html_filename, content_hash):
+    manifest = {
+        'content_hash': content_hash,
+        'template_version': TEMPLATE_VERSION,
+        'output': html_filename,
+        'built_at': datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(build_manifest_path(html_filename), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def report_build_status(noop):
+    """在GitHub Actions中把是否为空构建写入步骤输出，供提交、部署步骤判断"""
+    output_file = os.environ.get('GITHUB_OUTPUT')
+    if output_file:
+        with open(output_file, 'a', encoding='utf-8') as f:
+            f.write(f"noop={'true' if noop else 'false'}\n")
+
+# 生成简化版的HTML报告，主要展示图表和选择器
+def simplify_report_data(all_data):
+    """报告数据的简化结构：每个区域只保留月度数据{城市: {区域: [{"monthly_data": [...]}]}}，没有月度数据的区域为[{}]"""
+    simplified_data = {}
+    for city, districts in all_data.items():
+        simplified_data[city] = {}
+        for district, data_entries in districts.items():
+            # 只保留最新的月度数据（假设是列表中的第一个元素）
+            if data_entries and len(data_entries) > 0 and 'monthly_data' in data_entries[0]:
+                simplified_data[city][district] = [{"monthly_data": data_entries[0]['monthly_data']}]
+            else:
+                simplified_data[city][district] = [{}]
+    return simplified_data
+
+def generate_simplified_house_price_html(all_data=None, force=False, workers=None, prepared=None):
+    """
+    生成单页报告；prepared为异步编排中各区域爬取完成时已计算的{(city, district): (月度数据, 概览)}，
+    数据与最终数据相同的区域不再重复计算概览
+    """
+    html_filename = 'house_price_report.html'
+    current_time = datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y年%m月%d日 %H:%M:%S")
+    
+    default_weeks = 260  # 保持5年数据（260周）
+    if all_data is None:
+        with profile_stage("crawl"):
+            all_data = get_all_house_price_data(default_weeks)
+    
+    # 简化数据结构，只保留必要的月度数据
+    simplified_data = simplify_report_data(all_data)
+    
+    # 数据和模板均未变化时跳过图表和HTML生成
+    content_hash = compute_build_hash(simplified_data, REGISTRY.city_districts())
+    manifest = read_build_manifest(html_filename)
+    LAST_BUILD.update(noop=False, content_hash=content_hash)
+    if not force and manifest.get('content_hash') == content_hash and os.path.exists(html_filename):
+        logger.info("no-op build: 数据未变化(%s)，沿用%s于%s生成的报告", content_hash[:12], html_filename, manifest.get('built_at'))
+        LAST_BUILD["noop"] = True
+        return html_filename
+    
+    default_city = REGISTRY.default_city()
+    if default_city is None:
+        raise ValueError(f"城市登记表中没有任何区域: {CITY_REGISTRY_FILE}")
+    default_district = REGISTRY.districts(default_city)[0]
+    
+    # 使用简化后的数据生成默认图表；全部区域的趋势预测一次性批量计算
+    with profile_stage("chart"):
+        forecast = forecast_price_matrix(build_aligned_price_matrix(simplified_data, recent_months=FORECAST_FIT_MONTHS))
+        default_chart_data = generate_plotly_chart_html(simplified_data, default_city, default_district,
+                                                        district_forecast(forecast, default_city, default_district))
+        # 各区域缩略图和城市概览图：Plotly加载前的占位图，也用作链接预览图
+        chart_images = render_chart_images(simplified_data, CHART_DIR, workers)
+    # 修改默认图表的背景色为透明
+    if 'layout' in default_chart_data and 'template' in default_chart_data['layout']:
+        if 'layout' in default_chart_data['layout']['template']:
+            default_chart_data['layout']['template']['layout']['paper_bgcolor'] = 'rgba(0,0,0,0)'
+            default_chart_data['layout']['template']['layout']['plot_bgcolor'] = 'rgba(0,0,0,0)'
+    default_chart_json = json.dumps(default_chart_data, separators=(',', ':'))  # 紧凑JSON
+    
+    city_options = []
+    for city in REGISTRY.cities():
+        selected = ' selected' if city == default_city else ''
+        city_options.append(f'<option value="{city}"{selected}>{city}</option>')
+    
+    district_options = []
+    for district in REGISTRY.districts(default_city):
+        selected = ' selected' if district == default_district else ''
+        district_options.append(f'<option value="{district}"{selected}>{district}</option>')
+    
     
-    # 替换模板中的占位符
-    html_content = html_template.replace('[CURRENT_TIME]', current_time)
-    html_content = html_content.replace('[CITY_OPTIONS]', ''.join(city_options))
-    html_content = html_content.replace('[DISTRICT_OPTIONS]', ''.join(district_options))
-    html_content = html_content.replace('CITIES_JSON', cities_json)
-    html_content = html_content.replace('DATA_JSON', data_json)
-    html_content = html_content.replace('DEFAULT_CHART_JSON', default_chart_json)
+    compare_matrix = build_aligned_price_matrix(simplified_data, max_months=OVERVIEW_POINTS)
     
-    with open(html_filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    with profile_stage("html"):
+        detail_files = write_detail_files(simplified_data, html_filename)
+        detail_json = json.dumps({'files': detail_files, 'threshold': OVERVIEW_POINTS},
+                                 ensure_ascii=False, separators=(',', ':'))
+        # 按顺序流式写出模板片段，数据JSON按城市/区域分块直接写入文件（紧凑格式）
+        render_template_to_file(HTML_TEMPLATE_PARTS, {
+            '[CURRENT_TIME]': current_time,
+            '[CITY_OPTIONS]': ''.join(city_options),
+            '[DISTRICT_OPTIONS]': ''.join(district_options),
+            '[COMPARE_OPTIONS]': compare_options_html(compare_matrix['series']),
+            '[OG_IMAGE_META]': og_image_meta(chart_images['cities'].get(default_city)),
+            '[CHART_PLACEHOLDER]': chart_placeholder_html(
+                chart_images['districts'].get(default_city, {}).get(default_district), '.',
+                f"{default_city}-{default_district}房价走势"),
+            '[CITY_OVERVIEWS]': city_overviews_html(chart_images['cities'], '.'),
+            'CITIES_JSON': lambda f: dump_json_chunked(REGISTRY.city_districts(), f, depth=1),
+            'DATA_JSON': lambda f: dump_json_chunked(build_overview_data(simplified_data, prepared=prepared), f),
+            'DEFAULT_CHART_JSON': default_chart_json,
+            'COMPARE_JSON': lambda f: dump_json_chunked(compare_payload(compare_matrix), f, depth=1),
+            'DETAIL_JSON': detail_json,
+            'FORECAST_JSON': lambda f: dump_json_chunked(forecast_payload(forecast), f, depth=2),
+        }, html_filename)
+        write_build_manifest(html_filename, content_hash)
     
     return html_filename
 
+def _run_in_process_pool(func, tasks, workers=None):
+    """
+    把任务按进程数切块后在进程池中执行func(块)，每块包含多个任务以摊薄进程间传输开销
+    只有一个进程或一块时直接在当前进程执行；返回(合并后的结果列表, 实际进程数)
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, -(-len(tasks) // (workers * 4)))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [item for chunk in executor.map(func, chunks) for item in chunk], workers
+    return func(tasks), 1
+
+# 静态图表图片：用matplotlib无界面渲染每个区域的趋势缩略图和每个城市的概览图，
+# 用作Plotly加载前的占位图、离线查看和链接预览图；文件名带数据的内容哈希，数据未变化的图片不会重新渲染
+CHART_DIR = 'charts'
+CHART_IMAGE_FORMAT = os.environ.get("CHART_IMAGE_FORMAT", "png")  # png或svg（链接预览图只支持png），设为空字符串可关闭
+CHART_IMAGE_VERSION = 1  # 修改绘图逻辑时递增，使已有图片全部重新渲染
+CHART_MANIFEST = 'manifest.json'
+CHART_THUMBNAIL_SIZE = (6.4, 3.2)  # 英寸，dpi=100时为640×320像素
+CHART_OVERVIEW_SIZE = (9.6, 4.8)
+CHART_OVERVIEW_LEGEND_MAX = 12  # 区域数不超过该值时概览图显示图例
+CHART_CJK_FONTS = ('Noto Sans CJK SC', 'Source Han Sans SC', 'WenQuanYi Micro Hei', 'WenQuanYi Zen Hei',
+                   'SimHei', 'PingFang SC', 'Microsoft YaHei')
+
+def _chart_image_path(stem, payload, fmt):
+    """图片相对CHART_DIR的路径：stem.内容哈希.fmt"""
+    digest = hashlib.sha256(f"{CHART_IMAGE_VERSION}:{fmt}:".encode('utf-8'))
+    digest.update(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return f"{stem}.{digest.hexdigest()[:12]}.{fmt}"
+
+def _month_positions(months):
+    """YYYY-MM月份转换为以年为单位的横坐标"""
+    return [int(month[:4]) + (int(month[5:7]) - 1) / 12 for month in months]
+
+def _chart_font():
+    """已安装的中文字体名；没有时返回None，概览图不显示图例"""
+    from matplotlib import font_manager
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    return next((name for name in CHART_CJK_FONTS if name in installed), None)
+
+def _draw_district_thumbnail(figure, payload):
+    """区域缩略图：二手房（及新房）价格曲线和最新价格，不含中文文字"""
+    axes = figure.add_axes([0.02, 0.06, 0.96, 0.88])
+    x = _month_positions(payload['months'])
+    second_hand = np.array([np.nan if price is None else price for price in payload['second_hand']], dtype=float)
+    axes.plot(x, second_hand, color='#FF6384', linewidth=2.5)
+    axes.fill_between(x, second_hand, np.nanmin(second_hand) if np.isfinite(second_hand).any() else 0,
+                      color='#FF6384', alpha=0.12)
+    if any(price is not None for price in payload['new_house']):
+        new_house = np.array([np.nan if price is None else price for price in payload['new_house']], dtype=float)
+        axes.plot(x, new_house, color='#36A2EB', linewidth=2)
+    valid = second_hand[np.isfinite(second_hand)]
+    if valid.size:
+        axes.text(0.99, 0.97, f"¥{valid[-1]:,.0f}", transform=axes.transAxes, ha='right', va='top',
+                  fontsize=16, color='#2c3e50')
+    axes.axis('off')
+
+def _draw_city_overview(figure, payload, font):
+    """城市概览图：各区域二手房价格曲线"""
+    from matplotlib.ticker import StrMethodFormatter
+
+    axes = figure.add_axes([0.09, 0.1, 0.88, 0.86])
+    for district, months, prices in payload['districts']:
+        axes.plot(_month_positions(months), [np.nan if price is None else price for price in prices],
+                  linewidth=1.5, label=district)
+    axes.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
+    axes.xaxis.set_major_formatter(StrMethodFormatter('{x:.0f}'))
+    axes.grid(alpha=0.3)
+    for side in ('top', 'right'):
+        axes.spines[side].set_visible(False)
+    if font and len(payload['districts']) <= CHART_OVERVIEW_LEGEND_MAX:
+        axes.legend(prop={'family': font, 'size': 9}, ncol=min(4, len(payload['districts'])), frameon=False,
+                    loc='upper left')
+
+def _render_chart_images(tasks):
+    """渲染一批图表图片（在进程池中执行），返回[(相对路径, 字节数, 耗时), ...]"""
+    # 直接使用Figure而不经过pyplot：不依赖图形界面，也没有全局图形状态
+    from matplotlib.figure import Figure
+
+    font = None
+    results = []
+    for output_dir, relative, kind, payload in tasks:
+        started = time.perf_counter()
+        path = os.path.join(output_dir, relative)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if kind == 'city':
+            font = font or _chart_font()
+            figure = Figure(figsize=CHART_OVERVIEW_SIZE, dpi=100)
+            _draw_city_overview(figure, payload, font)
+        else:
+            figure = Figure(figsize=CHART_THUMBNAIL_SIZE, dpi=100)
+            _draw_district_thumbnail(figure, payload)
+        fmt = relative.rsplit('.', 1)[1]
+        figure.savefig(path + '.tmp', format=fmt, transparent=True,
+                       metadata={'Date': None} if fmt == 'svg' else None)
+        os.replace(path + '.tmp', path)
+        results.append((relative, os.path.getsize(path), time.perf_counter() - started))
+    return results
+
+def district_chart_task(output_dir, city, district, monthly_data, fmt):
+    """区域缩略图的渲染任务(output_dir, 相对路径, 'district', 数据)"""
+    payload = district_page_payload(monthly_data)
+    return output_dir, _chart_image_path(f"{city}/{district}", payload, fmt), 'district', payload
+
+def city_chart_task(output_dir, city, overview, fmt):
+    """城市概览图的渲染任务；overview为按登记顺序排列的[(区域, 月份, 二手房价格), ...]"""
+    payload = {'districts': overview}
+    return output_dir, _chart_image_path(city, payload, fmt), 'city', payload
+
+def read_chart_manifest(output_dir=CHART_DIR):
+    """读取静态图表图片清单；不存在时返回空清单"""
+    try:
+        with open(os.path.join(output_dir, CHART_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('districts', {})
+    manifest.setdefault('cities', {})
+    return manifest
+
+def chart_image_tasks(simplified_data, output_dir, fmt):
+    """
+    simplified_data对应的图片清单和其中尚未渲染的任务：返回(清单, [渲染任务, ...])
+    城市概览图包含该城市全部有月度数据的区域，按simplified_data中的顺序排列
+    """
+    manifest = {'format': fmt, 'districts': {}, 'cities': {}}
+    tasks = []
+    for city, districts in simplified_data.items():
+        overview = []
+        for district, entries in districts.items():
+            monthly = entries[0].get('monthly_data') if entries else None
+            if not monthly:
+                continue
+            task = district_chart_task(output_dir, city, district, monthly, fmt)
+            manifest['districts'].setdefault(city, {})[district] = task[1]
+            if not os.path.exists(os.path.join(output_dir, task[1])):
+                tasks.append(task)
+            overview.append((district, task[3]['months'], task[3]['second_hand']))
+        if overview:
+            task = city_chart_task(output_dir, city, overview, fmt)
+            manifest['cities'][city] = task[1]
+            if not os.path.exists(os.path.join(output_dir, task[1])):
+                tasks.append(task)
+    return manifest, tasks
+
+def render_chart_images(simplified_data, output_dir=CHART_DIR, workers=None, fmt=None):
+    """
+    渲染各区域趋势缩略图和各城市概览图，在进程池中并行渲染
+    图片文件名包含数据的内容哈希，已存在的图片直接沿用；不再引用的旧图片被删除
+    返回图片清单{'districts': {城市: {区域: 路径}}, 'cities': {城市: 路径}, ...}（路径相对output_dir），
+    同时写入output_dir/manifest.json；已关闭或未安装matplotlib时返回空清单，页面不显示占位图
+    """
+    fmt = CHART_IMAGE_FORMAT if fmt is None else fmt
+    if not fmt:
+        return {'districts': {}, 'cities': {}}
+    try:
+        import matplotlib  # noqa: F401
+    except ImportError:
+        logger.warning("未安装matplotlib，跳过静态图表图片")
+        return {'districts': {}, 'cities': {}}
+
+    started = time.perf_counter()
+    manifest, tasks = chart_image_tasks(simplified_data, output_dir, fmt)
+    results, workers = _run_in_process_pool(_render_chart_images, tasks, workers) if tasks else ([], 1)
+    keep = {path for districts in manifest['districts'].values() for path in districts.values()}
+    keep |= set(manifest['cities'].values())
+    manifest['rendered'] = len(results)
+    manifest['reused'] = len(keep) - len(results)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, CHART_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    _prune_site(output_dir, keep | {CHART_MANIFEST})
+    logger.info("静态图表图片: 渲染%d张, 沿用%d张, 共%.1fKB新图片, 用时%.2fs（%d个进程）",
+                manifest['rendered'], manifest['reused'], sum(size for _, size, _ in results) / 1024,
+                time.perf_counter() - started, workers)
+    return manifest
+
+def chart_image_href(relative, from_dir):
+    """从from_dir目录中的页面引用图片的相对URL；没有图片时返回None"""
+    from urllib.parse import quote
+    if not relative:
+        return None
+    path = os.path.relpath(os.path.join(CHART_DIR, relative), from_dir)
+    return quote(path.replace(os.sep, '/'))
+
+def chart_placeholder_html(relative, from_dir, alt):
+    """Plotly加载前显示的静态占位图，由页面脚本在绘制交互图表时移除"""
+    import html as html_lib
+    href = chart_image_href(relative, from_dir)
+    if not href:
+        return ''
+    return f'<img id="chart-placeholder" class="chart-placeholder" src="{href}" alt="{html_lib.escape(alt)}">'
+
+def city_overviews_html(city_images, from_dir):
+    """报告页中各城市的概览图"""
+    import html as html_lib
+    figures = []
+    for city, relative in city_images.items():
+        href = chart_image_href(relative, from_dir)
+        figures.append(f'<figure><img src="{href}" alt="{html_lib.escape(city)}各区域二手房价格走势" loading="lazy">'
+                       f'<figcaption>{html_lib.escape(city)}</figcaption></figure>')
+    return f'<div class="city-overviews">{"".join(figures)}</div>' if figures else ''
+
+def og_image_meta(relative):
+    """链接预览图（微信等在分享链接时读取og:image），使用GitHub Pages上的绝对地址"""
+    from urllib.parse import quote
+    if not relative:
+        return ''
+    return f'<meta property="og:image" content="{pages_base_url()}/{quote(CHART_DIR + "/" + relative)}">'
+
+# 静态站点：一个轻量索引页 + 每个区域一个独立页面，可直接分享某个区域的链接
+SITE_DIR = 'site'
+
+SITE_CSS = '''* { margin: 0; padding: 0; box-sizing: border-box; }
+body { font-family: -apple-system, BlinkMacSystemFont, 'PingFang SC', 'Microsoft YaHei', Arial, sans-serif;
+    line-height: 1.7; color: #333; background-color: #f8f9fa; }
+.container { max-width: 1200px; margin: 0 auto; padding: 20px; }
+h1 { font-size: 28px; color: #2c3e50; margin-bottom: 12px; text-align: center; }
+h2 { font-size: 20px; color: #34495e; margin-bottom: 10px; }
+.meta-info { color: #666; font-size: 14px; margin-bottom: 20px; text-align: center; }
+.nav { margin-bottom: 16px; font-size: 14px; }
+.nav a, .city a { color: #0056b3; text-decoration: none; }
+.city { background-color: #fff; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    padding: 16px 20px; margin-bottom: 16px; }
+.city ul { list-style: none; display: flex; flex-wrap: wrap; gap: 8px 20px; }
+.city li span { color: #888; font-size: 13px; margin-left: 4px; }
+.summary { background-color: #e8f4fd; border: 1px solid #b8daff; border-radius: 8px;
+    padding: 12px 16px; margin-bottom: 20px; text-align: center; }
+.chart-container { background-color: #fff; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); padding: 16px; }
+#house-price-chart { width: 100%; height: 600px; }
+.chart-placeholder { display: block; width: 100%; height: 100%; object-fit: contain; }
+.city img { display: block; width: 100%; max-width: 960px; height: auto; margin: 0 auto 12px; }
+.footer { color: #999; font-size: 12px; text-align: center; margin-top: 20px; }
+@media (max-width: 768px) {
+    .container { padding: 10px; }
+    h1 { font-size: 22px; }
+    #house-price-chart { height: 420px; }
+}
+'''
+
+SITE_JS = '''(function () {
+    // 区域页面的数据以列格式内嵌在页面中：{months, second_hand, new_house}
+    const holder = document.getElementById('district-data');
+    if (!holder || typeof Plotly === 'undefined') {
+        return;
+    }
+    const page = JSON.parse(holder.textContent);
+    // Plotly加载完成后用交互图表替换静态占位图
+    const placeholder = document.getElementById('chart-placeholder');
+    if (placeholder) {
+        placeholder.remove();
+    }
+    const dates = page.months.map(month => month + '-01');
+    const mode = dates.length > page.marker_limit ? 'lines' : 'lines+markers';
+    const traces = [{
+        type: 'scatter', x: dates, y: page.second_hand, name: '二手房价格', mode: mode,
+        line: {color: '#FF6384', width: 3}, marker: {size: 7}, connectgaps: false
+    }];
+    if (page.new_house.some(price => price !== null)) {
+        traces.push({
+            type: 'scatter', x: dates, y: page.new_house, name: '新房价格', mode: mode,
+            line: {color: '#36A2EB', width: 3}, marker: {size: 6, symbol: 'diamond'}, connectgaps: false
+        });
+    }
+    const small = window.innerWidth <= 768;
+    Plotly.newPlot('house-price-chart', traces, {
+        xaxis: {type: 'date', tickformat: small ? '%Y%m' : '%Y年%m月', tickangle: -45, nticks: small ? 6 : 12, automargin: true},
+        yaxis: {title: '房价（元/㎡）', tickformat: '.0f', automargin: true},
+        legend: {orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1},
+        margin: small ? {l: 50, r: 20, t: 40, b: 80} : {l: 80, r: 80, t: 40, b: 100},
+        paper_bgcolor: 'rgba(0,0,0,0)',
+        plot_bgcolor: 'rgba(0,0,0,0)'
+    }, {responsive: true});
+})();
+'''
+
+SITE_INDEX_TEMPLATE = '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>中国主要城市房价趋势</title>
+    <link rel="stylesheet" href="[CSS_HREF]">
+</head>
+<body>
+    <div class="container">
+        <h1>中国主要城市房价数据可视化</h1>
+        <div class="meta-info">生成时间: [CURRENT_TIME] | 共[DISTRICT_COUNT]个区域 | <a href="[FULL_REPORT_HREF]">完整交互报告</a></div>
+        [CITY_SECTIONS]
+        <div class="footer">本报告数据基于聚汇数据平台公开信息。</div>
+    </div>
+</body>
+</html>
+'''
+
+SITE_DISTRICT_TEMPLATE = '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>[CITY]-[DISTRICT]房价走势</title>
+    <link rel="stylesheet" href="[CSS_HREF]">
+    [OG_IMAGE_META]
+    <script src="https://cdn.plot.ly/plotly-2.27.0.min.js" defer></script>
+    <script src="[JS_HREF]" defer></script>
+</head>
+<body>
+    <div class="container">
+        <div class="nav"><a href="[INDEX_HREF]">← 全部城市</a></div>
+        <h1>[CITY]-[DISTRICT]房价走势</h1>
+        <div class="meta-info">生成时间: [CURRENT_TIME]</div>
+        <div class="summary">[LATEST_SUMMARY]</div>
+        <div class="chart-container"><div id="house-price-chart">[CHART_PLACEHOLDER]</div></div>
+        <div class="footer">本报告数据基于聚汇数据平台公开信息。</div>
+    </div>
+    <script type="application/json" id="district-data">PAGE_DATA_JSON</script>
+</body>
+</html>
+'''
+
+SITE_DISTRICT_PARTS = compile_template(SITE_DISTRICT_TEMPLATE, (
+    '[CITY]', '[DISTRICT]', '[CSS_HREF]', '[OG_IMAGE_META]', '[JS_HREF]', '[INDEX_HREF]', '[CURRENT_TIME]',
+    '[LATEST_SUMMARY]', '[CHART_PLACEHOLDER]', 'PAGE_DATA_JSON'))
+SITE_INDEX_PARTS = compile_template(SITE_INDEX_TEMPLATE, (
+    '[CSS_HREF]', '[CURRENT_TIME]', '[DISTRICT_COUNT]', '[FULL_REPORT_HREF]', '[CITY_SECTIONS]'))
+
+def district_page_path(city, district):
+    """区域页面相对站点根目录的路径"""
+    return f"{city}/{district}.html"
+
+def pages_base_url():
+    """GitHub Pages根地址：Actions中按GITHUB_REPOSITORY推断，否则使用默认仓库"""
+    github_repo = os.environ.get('GITHUB_REPOSITORY', '')
+    parts = github_repo.split('/')
+    if len(parts) == 2:
+        return f"https://{parts[0]}.github.io/{parts[1]}"
+    return "https://jasonaw90411.github.io/InformationNews"
+
+def write_site_asset(output_dir, stem, suffix, content):
+    """把共享资源写为带内容哈希的文件，返回相对站点根目录的路径"""
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]
+    relative = f"assets/{stem}.{digest}.{suffix}"
+    path = os.path.join(output_dir, relative)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+    return relative
+
+def district_page_payload(monthly_data):
+    """单个区域页面内嵌的列格式数据（按月份正序）"""
+    rows = (monthly_data or [])[::-1]
+    return {
+        'months': [row['month'] for row in rows],
+        'second_hand': [row.get('second_hand_price') for row in rows],
+        'new_house': [row.get('new_house_price') for row in rows],
+        'marker_limit': OVERVIEW_POINTS,
+    }
+
+def _latest_price_label(payload):
+    """索引页中区域链接旁的最新价格"""
+    prices = payload['second_hand']
+    return f"¥{prices[-1]:,.0f}" if prices and prices[-1] else '暂无数据'
+
+def latest_price_summary(payload):
+    """页面顶部的最新价格摘要"""
+    prices = [(month, price) for month, price in zip(payload['months'], payload['second_hand']) if price]
+    if not prices:
+        return '暂无数据'
+    month, price = prices[-1]
+    text = f"{month} 二手房均价 ¥{price:,.0f} 元/㎡"
+    if len(prices) > 1 and prices[-2][1]:
+        change = (price - prices[-2][1]) / prices[-2][1] * 100
+        text += f"（环比 {change:+.2f}%）"
+    return text
+
+def district_page_task(output_dir, city, district, payload, css_path, js_path, current_time, chart_image=None):
+    """单个区域页面的渲染任务(output_dir, 相对路径, 渲染值)；chart_image为该区域缩略图相对CHART_DIR的路径"""
+    import html as html_lib
+    return output_dir, district_page_path(city, district), {
+        '[CITY]': html_lib.escape(city),
+        '[DISTRICT]': html_lib.escape(district),
+        '[CSS_HREF]': '../' + css_path,
+        '[OG_IMAGE_META]': og_image_meta(chart_image),
+        '[JS_HREF]': '../' + js_path,
+        '[INDEX_HREF]': '../index.html',
+        '[CURRENT_TIME]': current_time,
+        '[LATEST_SUMMARY]': html_lib.escape(latest_price_summary(payload)),
+        '[CHART_PLACEHOLDER]': chart_placeholder_html(chart_image, os.path.join(output_dir, city),
+                                                      f"{city}-{district}房价走势"),
+        'PAGE_DATA_JSON': json.dumps(payload, separators=(',', ':')),
+    }
+
+def _render_site_pages(tasks):
+    """渲染一批区域页面（在进程池中执行），返回[(相对路径, 字节数, 耗时), ...]"""
+    results = []
+    for output_dir, relative, values in tasks:
+        started = time.perf_counter()
+        path = os.path.join(output_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        render_template_to_file(SITE_DISTRICT_PARTS, values, path)
+        results.append((relative, os.path.getsize(path), time.perf_counter() - started))
+    return results
+
+def _prune_site(output_dir, keep):
+    """删除不再生成的页面和资源（例如已下线的区域、旧版本哈希资源）"""
+    for root, dirs, files in os.walk(output_dir, topdown=False):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, '/')
+            if relative not in keep:
+                os.remove(os.path.join(root, name))
+        if root != output_dir and not os.listdir(root):
+            os.rmdir(root)
+
+def generate_static_site(all_data, output_dir=SITE_DIR, workers=None, only=None, chart_images=None,
+                         current_time=None, prerendered=None):
+    """
+    生成静态站点：索引页、每个区域一个页面、共享的哈希CSS/JS、sitemap.xml和构建报告
+    区域页面在进程池中并行渲染；返回构建报告（同时写入build_report.json）
+    only为(city, district)集合时只重新渲染其中的区域页面（及尚不存在的页面），索引页和sitemap照常重建
+    chart_images为静态图表图片清单，默认读取报告生成时写出的CHART_DIR清单
+    prerendered为{(city, district): 渲染值}，渲染值与本次相同且页面已存在的区域不再渲染（异步编排中已提前渲染）
+    """
+    import html as html_lib
+    from urllib.parse import quote
+
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    current_time = current_time or datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y年%m月%d日 %H:%M:%S")
+    prerendered = prerendered or {}
+    css_path = write_site_asset(output_dir, 'site', 'css', SITE_CSS)
+    js_path = write_site_asset(output_dir, 'site', 'js', SITE_JS)
+
+    chart_images = chart_images if chart_images is not None else read_chart_manifest()
+    tasks = []
+    urls = ['index.html']
+    sections = []
+    reused = 0
+    for city, districts in all_data.items():
+        links = []
+        for district, entries in districts.items():
+            monthly = entries[0].get('monthly_data') if entries else None
+            payload = district_page_payload(monthly)
+            relative = district_page_path(city, district)
+            urls.append(relative)
+            links.append(f'<li><a href="{quote(relative)}">{html_lib.escape(district)}</a>'
+                         f'<span>{_latest_price_label(payload)}</span></li>')
+            exists = os.path.exists(os.path.join(output_dir, relative))
+            if only is not None and (city, district) not in only and exists:
+                continue
+            task = district_page_task(output_dir, city, district, payload, css_path, js_path, current_time,
+                                      chart_images['districts'].get(city, {}).get(district))
+            if exists and prerendered.get((city, district)) == task[2]:
+                reused += 1
+                continue
+            tasks.append(task)
+        overview = chart_image_href(chart_images['cities'].get(city), output_dir)
+        overview = (f'<img src="{overview}" alt="{html_lib.escape(city)}各区域二手房价格走势" loading="lazy">'
+                    if overview else '')
+        sections.append(f'<section class="city"><h2>{html_lib.escape(city)}</h2>{overview}'
+                        f'<ul>{"".join(links)}</ul></section>')
+
+    page_results, workers = _run_in_process_pool(_render_site_pages, tasks, workers)
+
+    render_template_to_file(SITE_INDEX_PARTS, {
+        '[CSS_HREF]': css_path,
+        '[CURRENT_TIME]': current_time,
+        '[DISTRICT_COUNT]': str(len(urls) - 1),
+        '[FULL_REPORT_HREF]': '../house_price_report.html',
+        '[CITY_SECTIONS]': ''.join(sections),
+    }, os.path.join(output_dir, 'index.html'))
+
+    base_url = f"{pages_base_url()}/{output_dir.strip('/')}"
+    lastmod = datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y-%m-%d")
+    sitemap = ['<?xml version="1.0" encoding="UTF-8"?>',
+               '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    sitemap += [f'<url><loc>{html_lib.escape(base_url + "/" + quote(url))}</loc><lastmod>{lastmod}</lastmod></url>'
+                for url in urls]
+    sitemap.append('</urlset>')
+    with open(os.path.join(output_dir, 'sitemap.xml'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sitemap) + '\n')
+
+    report_name = 'build_report.json'
+    _prune_site(output_dir, set(urls) | {css_path, js_path, 'sitemap.xml', report_name})
+
+    page_sizes = [size for _, size, _ in page_results]
+    report = {
+        'generated_at': datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y-%m-%d %H:%M:%S"),
+        'workers': workers,
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'pages': len(page_results),
+        'prerendered_pages': reused,
+        'unchanged_pages': len(urls) - 1 - len(page_results) - reused,
+        'total_bytes': sum(page_sizes) + os.path.getsize(os.path.join(output_dir, 'index.html')),
+        'index_bytes': os.path.getsize(os.path.join(output_dir, 'index.html')),
+        'page_bytes': {'max': max(page_sizes, default=0),
+                       'mean': round(sum(page_sizes) / len(page_sizes)) if page_sizes else 0},
+        'render_seconds': round(sum(seconds for _, _, seconds in page_results), 3),
+        'assets': {path: os.path.getsize(os.path.join(output_dir, path)) for path in (css_path, js_path)},
+        'largest_pages': [{'path': path, 'bytes': size}
+                          for path, size, _ in sorted(page_results, key=lambda item: -item[1])[:5]],
+        'slowest_pages': [{'path': path, 'seconds': round(seconds, 4)}
+                          for path, _, seconds in sorted(page_results, key=lambda item: -item[2])[:5]],
+    }
+    with open(os.path.join(output_dir, report_name), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info("静态站点已生成: %s, %d个区域页面, 共%.1fKB, 用时%.2fs（%d个进程）",
+                output_dir, report['pages'], report['total_bytes'] / 1024, report['wall_seconds'], workers)
+    return report
+
+def pick_headline_district(crawl_data):
+    """选出最新月份二手房价格环比变化最大的区域，作为推送消息的跳转页面；无数据时返回None"""
+    best = None
+    for city, districts in crawl_data.items():
+        for district, entry in districts.items():
+            if not isinstance(entry, dict):
+                continue
+            # 月度数据为倒序，从头取最新的两个有价格的月份
+            rows = []
+            for row in entry.get('monthly_data', []):
+                if row.get('second_hand_price'):
+                    rows.append(row)
+                    if len(rows) == 2:
+                        break
+            if len(rows) < 2:
+                continue
+            change = (rows[0]['second_hand_price'] - rows[1]['second_hand_price']) / rows[1]['second_hand_price']
+            if best is None or abs(change) > abs(best[2]):
+                best = (city, district, change)
+    return best
+
 # 获取微信公众号access_token
 def get_access_token():
     url = 'https://api.weixin.qq.com/cgi-bin/token?grant_type=client_credential&appid={}&secret={}' \
@@ -1289,8 +3892,8 @@ def get_access_token():
     return access_token
 
 # 生成报告摘要
-def generate_report_summary(city_averages):
-    summary = "📊 **北上广深房价月报摘要**\n\n"
+def generate_report_summary(city_averages, headline=None):
+    summary = f"📊 **{'、'.join(city_averages)}房价月报摘要**\n\n"
     
     # 按房价从高到低排序
     sorted_cities = sorted(city_averages.items(), key=lambda x: x[1], reverse=True)
@@ -1298,11 +3901,15 @@ def generate_report_summary(city_averages):
     for i, (city, price) in enumerate(sorted_cities, 1):
         summary += f"🏙️ {city}: ¥{price:,.0f} 元/平方米\n"
     
+    if headline:
+        city, district, change = headline
+        summary += f"\n📍 本期环比变化最大: {city}-{district} ({change * 100:+.2f}%)，点击查看该区域走势\n"
+    
     summary += "\n📈 完整报告包含各区域详细数据和走势图表，请点击查看。"
     return summary
 
 # 发送房价报告到微信
-def send_house_price_to_wechat(access_token, report_summary, html_path, target_openId):
+def send_house_price_to_wechat(access_token, report_summary, html_path, target_openId, page_path='house_price_report.html'):
     today = datetime.now(pytz.timezone("Asia/Shanghai"))
     today_str = today.strftime("%Y年%m月%d日")
     time_period = get_time_period()
@@ -1310,18 +3917,9 @@ def send_house_price_to_wechat(access_token, report_summary, html_path, target_o
     # 使用GitHub Pages URL作为跳转链接，添加时间戳参数防止缓存
     timestamp = int(time.time())
     
-    # 基础URL
-    base_url = "https://jasonaw90411.github.io/InformationNews/house_price_report.html"
-    github_pages_url = f"{base_url}?t={timestamp}"
-    
-    # 在GitHub Actions环境中，可以使用GITHUB_REPOSITORY环境变量来构建URL
-    github_repo = os.environ.get('GITHUB_REPOSITORY', '')
-    if github_repo:
-        # github_repo 格式通常为 "username/repository"
-        parts = github_repo.split('/')
-        if len(parts) == 2:
-            base_url = f"https://{parts[0]}.github.io/{parts[1]}/house_price_report.html"
-            github_pages_url = f"{base_url}?t={timestamp}"
+    # page_path为相对Pages根目录的页面路径，静态站点模式下指向具体区域页面
+    from urllib.parse import quote
+    github_pages_url = f"{pages_base_url()}/{quote(page_path)}?t={timestamp}"
     
     body = {
         "touser": target_openId.strip(),
@@ -1345,80 +3943,123 @@ def send_house_price_to_wechat(access_token, report_summary, html_path, target_o
     return response.json()
 
 # 主函数 - 生成房价报告
-def generate_house_price_report():
-    print("🔄 开始生成基于聚汇数据的房价数据可视化报告...")
+def generate_house_price_report(crawl=True, force=False, site=False, workers=None):
+    logger.info("🔄 开始生成基于聚汇数据的房价数据可视化报告...")
     
-    html_file = generate_simplified_house_price_html()
+    all_data = _load_report_data(crawl, site)
+    html_file = generate_simplified_house_price_html(all_data, force, workers)
+    report_build_status(LAST_BUILD["noop"])
+    _build_site_if_needed(all_data, site, workers)
+    if LAST_BUILD["noop"]:
+        return html_file
     
-    print(f"✅ 房价报告生成完成: {html_file}")
-    print(f"📌 请在浏览器中打开 {html_file} 查看效果")
-    print(f"💡 报告功能：")
-    print(f"   - 数据源：聚汇数据平台")
-    print(f"   - 城市选择下拉列表：北京、上海、广州、深圳")
-    print(f"   - 区域选择下拉列表：对应城市的各个区域")
-    print(f"   - 交互式图表：选择不同城市和区域时自动更新房价走势图")
-    print(f"   - 图表类型：月度数据折线图展示")
-    print(f"   - 数据说明：包含数据来源标识和免责声明")
+    logger.info("✅ 房价报告生成完成: %s", html_file)
+    logger.info("📌 请在浏览器中打开 %s 查看效果", html_file)
+    logger.info("💡 报告功能：")
+    logger.info("   - 数据源：聚汇数据平台")
+    logger.info("   - 城市选择下拉列表：%s", "、".join(REGISTRY.cities()))
+    logger.info("   - 区域选择下拉列表：对应城市的各个区域")
+    logger.info("   - 交互式图表：选择不同城市和区域时自动更新房价走势图")
+    logger.info("   - 图表类型：月度数据折线图展示")
+    logger.info("   - 数据说明：包含数据来源标识和免责声明")
+
+def _load_report_data(crawl, site):
+    """
+    报告数据来源：不爬取时读取已合并的crawl_data.json；
+    需要同时生成静态站点时提前爬取，使单页报告和站点使用同一份数据
+    """
+    if not crawl:
+        return load_all_data_from_store()
+    if site:
+        with profile_stage("crawl"):
+            return get_all_house_price_data(260)
+    return None
+
+def _build_site_if_needed(all_data, site, workers, current_time=None, prerendered=None):
+    """空构建时沿用已有站点，除非站点尚未生成过"""
+    if not site:
+        return
+    if LAST_BUILD["noop"] and os.path.exists(os.path.join(SITE_DIR, 'index.html')):
+        return
+    generate_static_site(all_data, SITE_DIR, workers, current_time=current_time, prerendered=prerendered)
 
     # 新增：完整的房价报告推送功能
-def house_price_report_with_push():
-    """生成房价报告并推送到微信公众号"""
-    print("🔄 开始生成房价数据推送报告...")
+def house_price_report_with_push(crawl=True, force=False, site=False, workers=None):
+    """
+    生成房价报告并推送到微信公众号；crawl=False时直接使用已合并的crawl_data.json
+    site=True时同时生成静态站点，推送消息跳转到环比变化最大的区域页面
+    """
+    logger.info("🔄 开始生成房价数据推送报告...")
     
     # 1. 生成HTML报告
-    html_file = generate_simplified_house_price_html()
-    print(f"✅ HTML报告生成完成: {html_file}")
+    all_data = _load_report_data(crawl, site)
+    html_file = generate_simplified_house_price_html(all_data, force, workers)
+    report_build_status(LAST_BUILD["noop"])
+    _build_site_if_needed(all_data, site, workers)
+    if LAST_BUILD["noop"]:
+        logger.info("数据未变化，跳过推送（使用--force强制推送）")
+        return html_file
+    logger.info("✅ HTML报告生成完成: %s", html_file)
     
     # 2. 检查微信配置是否完整
     if not all([appID, appSecret, openId, template_id]):
-        print("⚠️  微信推送配置不完整，跳过推送功能")
-        print("需要配置的环境变量: APP_ID, APP_SECRET, OPEN_ID, TEMPLATE_ID")
+        logger.warning("⚠️  微信推送配置不完整，跳过推送功能")
+        logger.warning("需要配置的环境变量: APP_ID, APP_SECRET, OPEN_ID, TEMPLATE_ID")
         return html_file
     
+    with profile_stage("push"):
+        return _push_report(html_file, site)
+
+def compute_city_averages():
+    """登记表中各城市的区域最新二手房价格均价；SQLite后端直接查询每个区域的最新一行"""
+    if STORE_BACKEND == "sqlite":
+        with open_history_store() as store:
+            latest = store.latest_prices()
+    else:
+        latest = {}
+        for city, districts in load_existing_crawl_data().items():
+            for district, entry in districts.items():
+                row = latest_month_row(entry.get('monthly_data')) if isinstance(entry, dict) else None
+                if row:
+                    latest[(city, district)] = row
+    city_averages = {}
+    for city in REGISTRY.cities():
+        prices = [latest[(city, district)]['second_hand_price'] for district in REGISTRY.districts(city)
+                  if latest.get((city, district), {}).get('second_hand_price')]
+        if prices:
+            city_averages[city] = round(sum(prices) / len(prices), 2)
+    return city_averages
+
+def _push_report(html_file, site=False, access_token=None):
+    """汇总城市均价并推送到所有配置的微信用户；access_token为预取的令牌，未提供时在此获取"""
     # 3. 获取房价数据用于生成摘要
-    print("🔄 正在获取房价数据...")
+    logger.info("🔄 正在获取房价数据...")
     
-    # 从现有数据中获取城市平均房价
-    city_averages = {}
+    # 从现有数据中获取城市平均房价（各区域最新月份二手房价格的平均值）
     try:
-        with open('crawl_data.json', 'r', encoding='utf-8') as f:
-            crawl_data = json.load(f)
-        
-        for city, districts in CITIES.items():
-            total_price = 0
-            count = 0
-            for district in districts:
-                if district in crawl_data.get(city, {}):
-                    district_data = crawl_data[city][district]
-                    if district_data and len(district_data) > 0:
-                        # 获取最新的月度数据
-                        monthly_data = district_data[0].get('monthly_data', [])
-                        if monthly_data and len(monthly_data) > 0:
-                            latest_data = monthly_data[-1]
-                            if 'second_hand_price' in latest_data:
-                                total_price += latest_data['second_hand_price']
-                                count += 1
-            
-            if count > 0:
-                city_averages[city] = round(total_price / count, 2)
-    
+        city_averages = compute_city_averages()
     except Exception as e:
-        print(f"⚠️  获取房价数据失败: {e}")
-        # 使用模拟数据
-        city_averages = {
-            "北京": 65000,
-            "上海": 58000,
-            "广州": 32000,
-            "深圳": 55000
-        }
+        logger.warning("⚠️  获取房价数据失败: %s", e)
+        city_averages = {}
+    if not city_averages:
+        # 使用登记表中各城市的基准价
+        city_averages = {city: REGISTRY.base_price(city) for city in REGISTRY.cities()}
     
-    # 4. 生成报告摘要
-    report_summary = generate_report_summary(city_averages)
+    # 4. 生成报告摘要；静态站点模式下链接到环比变化最大的区域页面
+    headline = None
+    page_path = html_file
+    if site:
+        headline = pick_headline_district(load_crawl_data())
+        if headline:
+            page_path = f"{SITE_DIR}/{district_page_path(headline[0], headline[1])}"
+        else:
+            page_path = f"{SITE_DIR}/index.html"
+    report_summary = generate_report_summary(city_averages, headline)
     
     # 5. 获取access_token
-    access_token = get_access_token()
+    access_token = access_token or get_access_token()
     if not access_token:
-        print("❌ 获取access_token失败")
+        logger.error("❌ 获取access_token失败")
         return html_file
     
     # 6. 发送消息到微信 - 支持多个openID
@@ -1427,23 +4068,983 @@ def house_price_report_with_push():
     success_count = 0
     
     for idx, target_open_id in enumerate(open_ids):
-        print(f"🔄 正在向第{idx+1}个用户推送消息...")
-        response = send_house_price_to_wechat(access_token, report_summary, html_file, target_open_id)
+        logger.info("🔄 正在向第%s个用户推送消息...", idx+1)
+        response = send_house_price_to_wechat(access_token, report_summary, html_file, target_open_id, page_path)
         
         if response.get("errcode") == 0:
-            print(f"✅ 向用户{target_open_id}推送成功")
+            logger.info("✅ 向用户%s推送成功", target_open_id)
             success_count += 1
         else:
-            print(f"❌ 向用户{target_open_id}推送失败: {response}")
+            logger.error("❌ 向用户%s推送失败: %s", target_open_id, response)
     
-    print(f"📊 推送完成: 成功 {success_count}/{len(open_ids)}")
+    logger.info("📊 推送完成: 成功 %s/%s", success_count, len(open_ids))
     
     return html_file
 
-if __name__ == '__main__':
-    # 根据命令行参数决定运行模式
-    import sys
-    if len(sys.argv) > 1 and sys.argv[1] == 'push':
-        house_price_report_with_push()
+# 异步编排：爬取在单独线程中按调度顺序进行，每个区域爬取完成后立即在进程池中处理该区域：
+# 校验并与已存储的历史合并（即最后写入存储的数据）、计算概览、渲染缩略图和静态站点页面；access_token与爬取并行预取。
+# 城市概览图要等模拟数据回退确定后才能确定，在爬取结束后渲染；趋势预测是全部区域的批量拟合，与详情数据文件、
+# 索引页和单页报告一起在爬取结束后组装，已提前完成的区域（数据与最终数据一致时）直接沿用
+ORCHESTRATOR_TRACE_FILE = os.environ.get("ORCHESTRATOR_TRACE_FILE", "orchestrator_trace.json")  # 设为空字符串可关闭
+ACCESS_TOKEN_MAX_AGE = 6600  # access_token有效期为7200秒，预取的令牌超过该时间后重新获取
+
+def _traced_call(func, args):
+    """在执行器中调用func(*args)，返回(开始时间, 结束时间, 进程号, 结果)；时间为time.time()，跨进程可比"""
+    started = time.time()
+    result = func(*args)
+    return started, time.time(), os.getpid(), result
+
+class TimelineTrace:
+    """
+    编排时间线：按泳道（load/crawl/district/build/token/assemble/site/push）记录各段的起止时间，
+    导出为Chrome Trace Event格式（可在chrome://tracing或Perfetto中查看），并汇总爬取与构建的重叠情况
+    """
+
+    def __init__(self):
+        self.origin = time.time()
+        self.spans = []  # [(泳道, 名称, 开始, 结束, 进程号), ...]
+
+    def add(self, lane, name, start, end, pid=None):
+        # list.append是原子操作，爬取线程中也可以直接调用
+        self.spans.append((lane, name, start, end, pid or os.getpid()))
+
+    async def run(self, loop, executor, lane, name, func, *args):
+        """在executor中执行func(*args)并记录一段时间线；进程池中的起止时间在子进程中测量"""
+        started, finished, pid, result = await loop.run_in_executor(executor, _traced_call, func, args)
+        self.add(lane, name, started, finished, pid)
+        return result
+
+    def summary(self):
+        if not self.spans:
+            return {}
+        start = min(span[2] for span in self.spans)
+        end = max(span[3] for span in self.spans)
+        crawl = [span for span in self.spans if span[0] == 'crawl']
+        crawl_end = max((span[3] for span in crawl), default=start)
+        builds = [span for span in self.spans if span[0] == 'build']
+        return {
+            'total_seconds': round(end - start, 3),
+            'crawl_seconds': round(sum(span[3] - span[2] for span in crawl), 3),
+            'after_crawl_seconds': round(end - crawl_end, 3),
+            'builds': len(builds),
+            'build_seconds': round(sum(span[3] - span[2] for span in builds), 3),
+            'builds_during_crawl': sum(1 for span in builds if span[3] <= crawl_end),
+        }
+
+    def write(self, path):
+        """写出Chrome Trace Event格式的时间线；构建泳道按工作进程分行"""
+        threads = {}
+        events = []
+        for lane, name, start, end, pid in sorted(self.spans, key=lambda span: span[2]):
+            thread = f"{lane}-{pid}" if lane == 'build' else lane
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append({'name': name, 'cat': lane, 'ph': 'X', 'pid': 1, 'tid': tid,
+                           'ts': round((start - self.origin) * 1e6), 'dur': round((end - start) * 1e6)})
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': thread}}
+                   for thread, tid in threads.items()]
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}, f,
+                      ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+def _warm_up_worker(seconds):
+    """进程池预热任务：停留片刻，使同时提交的预热任务各占一个工作进程，全部工作进程在爬取开始前创建"""
+    time.sleep(seconds)
+    return os.getpid()
+
+def _prepare_district(city, district, result, previous, fmt, site_assets):
+    """
+    编排中单个区域爬取完成后的工作（在进程池中执行）：由爬取结果得到将写入存储的月度数据，
+    计算概览，fmt不为空时渲染缩略图，site_assets为(CSS路径, JS路径, 生成时间)时渲染该区域的站点页面
+    返回(月度数据, 概览, 缩略图路径, 站点页面渲染值)
+    """
+    monthly = stored_monthly_data(result, previous)
+    image = None
+    if fmt and monthly:
+        task = district_chart_task(CHART_DIR, city, district, monthly, fmt)
+        image = task[1]
+        if not os.path.exists(os.path.join(CHART_DIR, image)):
+            _render_chart_images([task])
+    page = None
+    if site_assets:
+        page = district_page_task(SITE_DIR, city, district, district_page_payload(monthly), *site_assets, image)
+        _render_site_pages([page])
+        page = page[2]
+    return monthly, district_overview(monthly), image, page
+
+def _prefetch_access_token():
+    """预取access_token，返回(令牌, 获取时间)；失败时返回(None, 获取时间)，推送时重新获取"""
+    try:
+        return get_access_token(), time.monotonic()
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("预取access_token失败，推送时重新获取: %s", e)
+        return None, time.monotonic()
+
+async def orchestrate_report(crawl=True, force=False, site=False, workers=None, push=False, trace_path=None):
+    """
+    异步编排的报告生成（push=True时同时推送），结果与generate_house_price_report/house_price_report_with_push一致
+    进程池在启动爬取线程之前用fork一次性创建全部工作进程：爬取线程运行期间fork的子进程可能继承被占用的锁（如日志锁），
+    而spawn方式的子进程需要重新导入本模块，爬取较快时启动开销抵消重叠的收益
+    单个区域校验的结果与整批校验不同时（见stored_monthly_data），组装时按最终数据重新计算该区域
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    import multiprocessing
+
+    loop = asyncio.get_running_loop()
+    trace = TimelineTrace()
+    trace_path = ORCHESTRATOR_TRACE_FILE if trace_path is None else trace_path
+    workers = workers or os.cpu_count() or 1
+    push = push and all([appID, appSecret, openId, template_id])
+    fmt = CHART_IMAGE_FORMAT
+    if fmt:
+        try:
+            import matplotlib  # noqa: F401
+        except ImportError:
+            fmt = ''
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    # 站点页面在爬取期间渲染时使用与组装时相同的资源路径和生成时间
+    site_assets = None
+    current_time = datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y年%m月%d日 %H:%M:%S")
+    if site:
+        os.makedirs(SITE_DIR, exist_ok=True)
+        site_assets = (write_site_asset(SITE_DIR, 'site', 'css', SITE_CSS),
+                       write_site_asset(SITE_DIR, 'site', 'js', SITE_JS), current_time)
+
+    builds = []
+    prepared = {}  # (city, district) -> (月度数据, 概览, 缩略图路径, 站点页面渲染值)
+    submitted = set()
+    stored = {}
+    last_crawled = [time.time()]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method)) as pool, \
+            ThreadPoolExecutor(max_workers=2, thread_name_prefix='orchestrator') as threads:
+        await asyncio.gather(*[loop.run_in_executor(pool, _warm_up_worker, 0.05) for _ in range(workers)])
+
+        def submit(task, name):
+            # 同一图片只渲染一次：已提交的图片在渲染完成前文件尚不存在
+            if task[1] not in submitted and not os.path.exists(os.path.join(task[0], task[1])):
+                submitted.add(task[1])
+                builds.append(asyncio.ensure_future(trace.run(loop, pool, 'build', name, _render_chart_images, [task])))
+
+        async def prepare(city, district, result):
+            prepared[(city, district)] = await trace.run(loop, pool, 'build', f"{city}-{district}", _prepare_district,
+                                                         city, district, result, stored.get((city, district)),
+                                                         fmt, site_assets)
+            if prepared[(city, district)][2]:
+                submitted.add(prepared[(city, district)][2])
+
+        def district_done(city, district, result):
+            """在事件循环中处理爬取完成的区域：校验、概览、缩略图和站点页面全部提交到进程池"""
+            if result:
+                builds.append(asyncio.ensure_future(prepare(city, district, result)))
+
+        def on_district(city, district, result):
+            now = time.time()
+            trace.add('district', f"{city}-{district}", last_crawled[0], now)
+            last_crawled[0] = now
+            loop.call_soon_threadsafe(district_done, city, district, result)
+
+        token_future = (asyncio.ensure_future(trace.run(loop, threads, 'token', 'access_token', _prefetch_access_token))
+                        if push else None)
+        if crawl:
+            # 已存储的数据在爬取前读取一次，各区域的新数据与之合并
+            stored = await trace.run(loop, threads, 'load', 'stored', load_district_entries, REGISTRY.units())
+            last_crawled[0] = time.time()
+            all_data = await trace.run(loop, threads, 'crawl', 'crawl', get_all_house_price_data, 260, on_district)
+        else:
+            all_data = await trace.run(loop, threads, 'crawl', 'load', load_all_data_from_store)
+        # 爬取线程中的回调先于爬取结果送达事件循环，此时全部区域任务均已提交
+        for result in await asyncio.gather(*builds, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning("区域预处理失败，组装报告时重试: %s", result)
+        # 模拟数据回退已确定，按最终数据补齐城市概览图和与预先渲染不一致的图片
+        builds = []
+        if fmt:
+            for task in chart_image_tasks(simplify_report_data(all_data), CHART_DIR, fmt)[1]:
+                submit(task, task[1].split('.', 1)[0].replace('/', '-'))
+        for result in await asyncio.gather(*builds, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning("预先渲染图表失败，组装报告时重试: %s", result)
+
+        overviews = {unit: (monthly, overview) for unit, (monthly, overview, _, _) in prepared.items()}
+        html_file = await trace.run(loop, threads, 'assemble', 'report', generate_simplified_house_price_html,
+                                    all_data, force, workers, overviews)
+        report_build_status(LAST_BUILD["noop"])
+        if site:
+            pages = {unit: page for unit, (_, _, _, page) in prepared.items()}
+            await trace.run(loop, threads, 'site', 'site', _build_site_if_needed, all_data, site, workers,
+                            current_time, pages)
+
+        if token_future is not None:
+            access_token, fetched_at = await token_future
+            if LAST_BUILD["noop"]:
+                logger.info("数据未变化，跳过推送（使用--force强制推送）")
+            else:
+                if time.monotonic() - fetched_at > ACCESS_TOKEN_MAX_AGE:
+                    access_token = None
+                await trace.run(loop, threads, 'push', 'push', _push_report, html_file, site, access_token)
+
+    summary = trace.summary()
+    logger.info("编排时间线: 总耗时%.2fs, 爬取%.2fs, 爬取结束后%.2fs; 区域预处理与图表%d项(累计%.2fs), 其中%d项在爬取期间完成",
+                summary['total_seconds'], summary['crawl_seconds'], summary['after_crawl_seconds'],
+                summary['builds'], summary['build_seconds'], summary['builds_during_crawl'])
+    if trace_path:
+        trace.write(trace_path)
+        logger.info("时间线已写入%s（可在chrome://tracing或Perfetto中打开）", trace_path)
+    if not LAST_BUILD["noop"]:
+        logger.info("✅ 房价报告生成完成: %s", html_file)
+    return html_file
+
+def run_orchestrated_report(crawl=True, force=False, site=False, workers=None, push=False):
+    """orchestrate_report的同步入口"""
+    return asyncio.run(orchestrate_report(crawl, force, site, workers, push))
+
+# 列式导出：export模式把完整历史写为按城市分区的列式文件，分析时不必再展开嵌套的JSON
+EXPORT_DIR = "exports"
+EXPORT_FORMATS = ("arrow", "parquet", "npz")
+EXPORT_DICTIONARY_COLUMNS = ('city', 'district', 'source')
+
+def history_columns(crawl_data):
+    """
+    把crawl_data展开为列，行按(城市, 区域, 月份正序)排列：
+    city/district/source为字典编码（{name}_codes为int32编码，-1表示缺失；{name}_dictionary为取值表），
+    month为datetime64[M]，两类价格为float64（缺失为NaN）；city_offsets[i]到city_offsets[i+1]为第i个城市的行
+    """
+    dictionaries = {name: {} for name in EXPORT_DICTIONARY_COLUMNS}
+    codes = {name: [] for name in EXPORT_DICTIONARY_COLUMNS}
+    months, second_hand, new_house = [], [], []
+    offsets = [0]
+    sources = dictionaries['source']
+    for city, districts in crawl_data.items():
+        city_code = dictionaries['city'].setdefault(city, len(dictionaries['city']))
+        for district, entry in districts.items():
+            rows = (entry.get('monthly_data') or []) if isinstance(entry, dict) else []
+            rows = rows[::-1]
+            district_code = dictionaries['district'].setdefault(district, len(dictionaries['district']))
+            codes['city'].extend([city_code] * len(rows))
+            codes['district'].extend([district_code] * len(rows))
+            codes['source'].extend([sources.setdefault(row['source'], len(sources)) if row.get('source') else -1
+                                    for row in rows])
+            months.extend([row['month'] for row in rows])
+            second_hand.extend([row.get('second_hand_price') for row in rows])
+            new_house.extend([row.get('new_house_price') for row in rows])
+        offsets.append(len(months))
+    columns = {
+        'month': np.array(months, dtype='datetime64[M]'),
+        'second_hand_price': np.array(second_hand, dtype=np.float64),
+        'new_house_price': np.array(new_house, dtype=np.float64),
+        'city_offsets': np.array(offsets, dtype=np.int64),
+    }
+    for name in EXPORT_DICTIONARY_COLUMNS:
+        columns[f'{name}_codes'] = np.array(codes[name], dtype=np.int32)
+        columns[f'{name}_dictionary'] = np.array(list(dictionaries[name]), dtype=str)
+    return columns
+
+def _arrow_table(columns, start, stop):
+    """把[start, stop)行构造为Arrow表：字符串列为字典类型，价格缺失为null，月份为date32（每月1日）"""
+    import pyarrow as pa
+    arrays = {}
+    for name in EXPORT_DICTIONARY_COLUMNS:
+        indices = columns[f'{name}_codes'][start:stop]
+        arrays[name] = pa.DictionaryArray.from_arrays(
+            pa.array(indices, mask=indices < 0, type=pa.int32()), pa.array(columns[f'{name}_dictionary'].tolist()))
+    arrays['month'] = pa.array(columns['month'][start:stop].astype('datetime64[D]'), type=pa.date32())
+    for name in ('second_hand_price', 'new_house_price'):
+        values = columns[name][start:stop]
+        arrays[name] = pa.array(values, mask=np.isnan(values), type=pa.float64())
+    order = ('city', 'district', 'month', 'second_hand_price', 'new_house_price', 'source')
+    return pa.table({name: arrays[name] for name in order})
+
+def _write_export_partition(table, path, fmt):
+    import pyarrow as pa
+    tmp_path = path + '.tmp'
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_path)
+    else:
+        # 不压缩的Arrow IPC文件可以内存映射后零拷贝读取
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def export_history(output_dir=EXPORT_DIR, fmt=None):
+    """
+    把数据存储中的完整历史导出为列式文件，返回清单（同时写入manifest.json）
+    有pyarrow时每个城市一个分区目录（city=城市/part-0.arrow或.parquet），否则写出单个NumPy .npz文件，
+    行按城市连续存放，city_offsets记录各城市的行范围
+    """
+    if fmt in (None, "arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+            fmt = fmt or "arrow"
+        except ImportError:
+            if fmt:
+                logger.warning("未安装pyarrow，改为导出NumPy .npz文件")
+            fmt = "npz"
+    started = time.perf_counter()
+    columns = history_columns(load_crawl_data())
+    os.makedirs(output_dir, exist_ok=True)
+    offsets = columns['city_offsets']
+    manifest = {
+        'format': fmt,
+        'generated_at': datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y-%m-%d %H:%M:%S"),
+        'rows': int(offsets[-1]),
+        'columns': ['city', 'district', 'month', 'second_hand_price', 'new_house_price', 'source'],
+        'partitions': {},
+    }
+    if fmt == "npz":
+        manifest['bundle'] = 'house_prices.npz'
+        path = os.path.join(output_dir, manifest['bundle'])
+        # 不压缩：读取时各列直接按原始字节载入
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **columns)
+        os.replace(path + '.tmp', path)
+        manifest['partitions'] = {city: [int(offsets[i]), int(offsets[i + 1])]
+                                  for i, city in enumerate(columns['city_dictionary'].tolist())}
     else:
-        generate_house_price_report()
\ No newline at end of file
+        suffix = 'arrow' if fmt == "arrow" else 'parquet'
+        for i, city in enumerate(columns['city_dictionary'].tolist()):
+            relative = f"city={city}/part-0.{suffix}"
+            os.makedirs(os.path.join(output_dir, f"city={city}"), exist_ok=True)
+            _write_export_partition(_arrow_table(columns, offsets[i], offsets[i + 1]),
+                                    os.path.join(output_dir, relative), fmt)
+            manifest['partitions'][city] = relative
+    keep = {'manifest.json', manifest.get('bundle')} | {path for path in manifest['partitions'].values()
+                                                         if isinstance(path, str)}
+    _prune_site(output_dir, keep)
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    logger.info("已导出%d行（%d个城市）到%s，格式%s，用时%.2fs", manifest['rows'], len(manifest['partitions']),
+                output_dir, fmt, time.perf_counter() - started)
+    return manifest
+
+def read_history_export(path=EXPORT_DIR):
+    """
+    读取export模式的输出为pandas DataFrame，city/district/source为Categorical
+    Arrow文件通过内存映射读取（read_all本身不复制数据）；需要零拷贝的分析可直接使用
+    pyarrow.ipc.open_file(pyarrow.memory_map(分区文件)).read_all()得到Arrow表
+    """
+    import pandas as pd
+    with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest['format'] == "npz":
+        with np.load(os.path.join(path, manifest['bundle'])) as bundle:
+            frame = {name: pd.Categorical.from_codes(bundle[f'{name}_codes'], bundle[f'{name}_dictionary'])
+                     for name in EXPORT_DICTIONARY_COLUMNS}
+            for name in ('month', 'second_hand_price', 'new_house_price'):
+                frame[name] = bundle[name]
+        return pd.DataFrame(frame, columns=manifest['columns'])
+    import pyarrow as pa
+    tables = []
+    for relative in manifest['partitions'].values():
+        full_path = os.path.join(path, relative)
+        if manifest['format'] == "parquet":
+            import pyarrow.parquet as pq
+            tables.append(pq.read_table(full_path, memory_map=True))
+        else:
+            tables.append(pa.ipc.open_file(pa.memory_map(full_path)).read_all())
+    return pa.concat_tables(tables).to_pandas(date_as_object=False)
+
+# 本地数据API：serve模式把存储加载为内存索引，内部看板直接按区域取数，不必解析报告页面或重读crawl_data.json
+API_RELOAD_INTERVAL = 5.0  # 检查存储文件是否变化的间隔（秒）
+
+ApiResponse = namedtuple('ApiResponse', ['body', 'gzipped', 'etag'])
+
+def api_response(obj):
+    """把接口数据预先序列化为紧凑JSON，并计算gzip压缩体和强ETag"""
+    body = json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return ApiResponse(body, gzip.compress(body, compresslevel=6, mtime=0), hashlib.sha256(body).hexdigest()[:32])
+
+def store_signature(json_filename='crawl_data.json'):
+    """存储文件的(修改时间, 大小)，用于判断是否需要重新加载；SQLite后端同时检查WAL文件"""
+    if STORE_BACKEND == "sqlite":
+        paths = (SQLITE_STORE_FILE, SQLITE_STORE_FILE + '-wal')
+    else:
+        paths = (json_filename,)
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+class PriceDataIndex:
+    """
+    数据API的内存索引：存储只加载一次，每个接口的响应体（含gzip版本和ETag）在加载时生成，
+    请求处理只是一次字典查找；重新加载时整体替换索引对象，正在处理的请求仍使用旧索引
+    """
+
+    def __init__(self, crawl_data, signature=None, previous=None, changed=None):
+        """previous为旧索引时只重新生成changed（(city, district)集合）中区域的响应，其余区域沿用旧索引"""
+        self.signature = signature
+        self.responses = {}
+        self.latest = {}
+        cities = {}
+        summary = {}
+        updated = None
+        for city, districts in crawl_data.items():
+            city_rows = {}
+            for district, entry in districts.items():
+                if not isinstance(entry, dict):
+                    continue
+                key = (city, district)
+                path = f"/series/{city}/{district}"
+                if previous is not None and key not in changed and path in previous.responses:
+                    self.responses[path] = previous.responses[path]
+                    self.latest[key] = previous.latest[key]
+                else:
+                    payload = district_page_payload(entry.get('monthly_data'))
+                    self.responses[path] = api_response({
+                        'city': city, 'district': district, 'crawl_time': entry.get('crawl_time'),
+                        'months': payload['months'], 'second_hand': payload['second_hand'],
+                        'new_house': payload['new_house'],
+                    })
+                    self.latest[key] = self._latest(payload)
+                cities.setdefault(city, []).append(district)
+                city_rows[district] = self.latest[key]
+                if entry.get('crawl_time') and (updated is None or entry['crawl_time'] > updated):
+                    updated = entry['crawl_time']
+            prices = [row['second_hand_price'] for row in city_rows.values() if row]
+            summary[city] = {
+                'average_price': round(sum(prices) / len(prices), 2) if prices else None,
+                'districts': city_rows,
+            }
+        self.district_count = sum(len(districts) for districts in cities.values())
+        self.responses['/cities'] = api_response(cities)
+        self.responses['/summary'] = api_response({'updated': updated, 'district_count': self.district_count,
+                                                   'cities': summary})
+
+    @staticmethod
+    def _latest(payload):
+        """区域最新有价格的月份及环比变化，无数据时为None"""
+        prices = [(month, price) for month, price in zip(payload['months'], payload['second_hand']) if price]
+        if not prices:
+            return None
+        month, price = prices[-1]
+        change = None
+        if len(prices) > 1:
+            change = round((price - prices[-2][1]) / prices[-2][1] * 100, 2)
+        return {'month': month, 'second_hand_price': price, 'change_pct': change}
+
+def _accepts_gzip(header):
+    """按Accept-Encoding判断客户端是否接受gzip（忽略q=0的项）"""
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+def _etag_matches(header, etag):
+    """If-None-Match是否命中（按弱比较，忽略W/前缀）"""
+    if not header:
+        return False
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag:
+            return True
+    return False
+
+class DataApiHandler(BaseHTTPRequestHandler):
+    """GET/HEAD /cities、/series/{city}/{district}、/summary；支持gzip和If-None-Match条件请求"""
+    protocol_version = "HTTP/1.1"
+    server_version = "HousePriceAPI/1.0"
+    # 响应头和响应体分两次写出，保持连接时Nagle算法与延迟ACK叠加会让每个请求多等约40ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("API %s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _send_json(self, status, obj, send_body):
+        """即时生成的JSON响应（404、健康检查和运行指标），不缓存"""
+        body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _respond(self, send_body):
+        path = unquote(urlsplit(self.path).path).rstrip('/')
+        route = self.server.status_routes.get(path)
+        if route is not None:
+            self._send_json(*route(), send_body)
+            return
+        response = self.server.index.responses.get(path)
+        if response is None:
+            self._send_json(404, {'error': 'not found', 'path': path}, send_body)
+            return
+        # 压缩与未压缩是不同的表示，强ETag需要区分
+        if _accepts_gzip(self.headers.get('Accept-Encoding')):
+            body, etag, encoding = response.gzipped, f'"{response.etag}-gz"', 'gzip'
+        else:
+            body, etag, encoding = response.body, f'"{response.etag}"', None
+        not_modified = _etag_matches(self.headers.get('If-None-Match'), etag)
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+class DataApiServer(ThreadingHTTPServer):
+    """
+    数据API服务：启动时加载索引，后台线程定期检查存储文件，变化时重新加载并原子替换索引
+    传入index时直接使用（daemon模式由调度器维护索引）；status_routes为路径 -> 返回(状态码, 对象)的函数
+    """
+    daemon_threads = True
+
+    def __init__(self, address, json_filename='crawl_data.json', reload_interval=API_RELOAD_INTERVAL, index=None):
+        super().__init__(address, DataApiHandler)
+        self.json_filename = json_filename
+        self.status_routes = {}
+        self.index = index or self.load_index()
+        self._stopped = threading.Event()
+        self._watcher = None
+        if reload_interval and reload_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, args=(reload_interval,),
+                                             name="api-reload", daemon=True)
+            self._watcher.start()
+
+    def load_index(self):
+        # 先取签名再读取：读取期间文件被替换时，下一次检查会发现签名不一致并再次加载
+        signature = store_signature(self.json_filename)
+        started = time.perf_counter()
+        index = PriceDataIndex(load_crawl_data(self.json_filename), signature)
+        logger.info("数据API索引已加载: %d个区域, 用时%.2fs", index.district_count, time.perf_counter() - started)
+        return index
+
+    def _watch(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                if store_signature(self.json_filename) != self.index.signature:
+                    index = self.load_index()
+                    # 读取失败（如文件被非原子地改写到一半）时load_crawl_data返回空数据，保留旧索引等待下一次检查
+                    if index.district_count == 0 and self.index.district_count:
+                        logger.warning("存储读取结果为空，继续使用旧数据")
+                        continue
+                    self.index = index
+            except Exception as e:
+                logger.warning("重新加载数据API索引失败，继续使用旧数据: %s", e)
+
+    def server_close(self):
+        self._stopped.set()
+        super().server_close()
+
+def serve_data_api(host='127.0.0.1', port=8000, reload_interval=API_RELOAD_INTERVAL):
+    """运行数据API服务直到被中断"""
+    server = DataApiServer((host, port), reload_interval=reload_interval)
+    logger.info("数据API已启动: http://%s:%d （/cities, /series/{city}/{district}, /summary），存储: %s",
+                host, server.server_address[1], store_location())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("数据API已停止")
+    finally:
+        server.server_close()
+
+# 常驻模式：进程、HTTP连接池和内存中的数据常驻，各区域按带抖动的间隔错开做增量爬取，
+# 爬取结果批量写入存储，只重建数据发生变化的区域对应的产物；数据API附带/health和/metrics
+DAEMON_CRAWL_INTERVAL = float(os.environ.get("DAEMON_CRAWL_INTERVAL", str(24 * 3600)))  # 每个区域的爬取间隔（秒）
+DAEMON_JITTER = 0.1  # 间隔的随机抖动比例，避免区域集中在同一时刻到期
+DAEMON_RETRY_INTERVAL = 900.0  # 爬取失败后的首次重试间隔（秒），连续失败时加倍，最长为爬取间隔
+DAEMON_FLUSH_INTERVAL = float(os.environ.get("DAEMON_FLUSH_INTERVAL", "60"))  # 爬取结果写入存储并重建产物的间隔（秒）
+DAEMON_LOOKBACK_MONTHS = 3  # 增量爬取只获取最近几个月所在的年度页面（数据源可能修订最近几个月）
+DAEMON_STALL_SECONDS = 600.0  # 调度循环超过该时间没有推进时健康检查返回503
+
+class _CrawlCollector:
+    """
+    以检查点接口收集爬取结果：crawl_juhui_house_price_data把结果交给它而不是立即写入存储，
+    由daemon批量写入；不记录年度页面，也不恢复任何已完成的单元
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    def get_district(self, city, district):
+        return None
+
+    def get_year(self, city, district, year):
+        return None
+
+    def record_year(self, city, district, year, rows):
+        pass
+
+    def record_district(self, city, district, result):
+        self.results[(city, district)] = result
+
+def incremental_years(today=None, lookback_months=DAEMON_LOOKBACK_MONTHS):
+    """最近lookback_months个月所在的年份（新到旧），如1月时同时包含上一年"""
+    today = today or datetime.now()
+    ordinal = today.year * 12 + today.month - 1
+    return sorted({(ordinal - offset) // 12 for offset in range(max(1, lookback_months))}, reverse=True)
+
+def _entry_data_changed(old_entry, new_entry):
+    """除爬取时间外是否有变化（月度价格、来源或当前价格）"""
+    return any(field != 'crawl_time' for _, _, _, field, _ in crawl_entry_deltas(old_entry, new_entry, replace=False))
+
+class HousePriceDaemon:
+    """
+    常驻调度器：调度循环在调用run()的线程中运行，stop()可从信号处理函数或其他线程调用
+    - 每个区域一个到期时间（小根堆）；有历史数据的区域只爬取最近的年度页面，新区域爬取完整历史
+    - 成功后按爬取间隔±抖动重新排期，失败时按指数退避重试
+    - 每隔flush_interval把结果整批写入存储（JSON后端直接合并到内存中的数据，不再读取文件，
+      但每次写入仍需重写整个文件，区域较多时宜使用SQLite后端），
+      数据有变化的区域才重建报告、静态站点页面和数据API中对应的响应
+    """
+
+    def __init__(self, crawl_interval=None, flush_interval=DAEMON_FLUSH_INTERVAL, site=False, workers=None,
+                 rng=None):
+        self.crawl_interval = crawl_interval or DAEMON_CRAWL_INTERVAL
+        self.flush_interval = flush_interval
+        self.site = site
+        self.workers = workers
+        self.rng = rng or random.Random()
+        self.stop_event = threading.Event()
+        self.server = None
+        self.crawl_data = load_crawl_data()
+        self.index = PriceDataIndex(self.crawl_data)
+        self.pending = []  # 待写入存储的爬取结果
+        self.touched = set()  # 已写入、等待更新数据API响应的(city, district)
+        self.dirty = set()  # 数据变化、等待重建报告和站点页面的(city, district)
+        self.failures = Counter()
+        self.counters = Counter()
+        self.schedule = []  # 小根堆：(到期的monotonic时间, city, district)
+        self.started_at = time.monotonic()
+        self.heartbeat = self.started_at
+        self.stop_reason = None
+        self.last_crawl = None
+        self.last_flush = None
+        self.last_rebuild = None
+        self._schedule_all()
+
+    def _jittered(self, seconds):
+        return seconds * self.rng.uniform(1 - DAEMON_JITTER, 1 + DAEMON_JITTER)
+
+    def _schedule_all(self):
+        """首次排期：按上次爬取时间推算到期时间；从未爬取过的区域在第一个写入间隔内错开开始"""
+        now = time.monotonic()
+        wall_now = datetime.now()
+        for city, district in REGISTRY.units():
+            entry = self.crawl_data.get(city, {}).get(district)
+            delay = self.rng.uniform(0, self.flush_interval)
+            if isinstance(entry, dict) and entry.get('monthly_data') and entry.get('crawl_time'):
+                try:
+                    age = (wall_now - datetime.strptime(entry['crawl_time'], '%Y-%m-%d %H:%M:%S')).total_seconds()
+                    delay = max(delay, self._jittered(self.crawl_interval) - age)
+                except ValueError:
+                    pass
+            heapq.heappush(self.schedule, (now + delay, city, district))
+
+    def stop(self, reason="stop"):
+        if not self.stop_event.is_set():
+            logger.info("daemon收到%s，完成当前区域并写入数据后退出", reason)
+            self.stop_reason = reason
+            self.stop_event.set()
+
+    def run(self):
+        """运行调度循环直到stop()；退出前写入尚未落盘的结果并重建产物"""
+        logger.info("daemon已启动: %d个区域, 爬取间隔%.0fs, 写入间隔%.0fs, 存储: %s",
+                    len(self.schedule), self.crawl_interval, self.flush_interval, store_location())
+        # 报告或站点尚未生成过时先以已存储的数据完整构建一次
+        if not os.path.exists('house_price_report.html') or (
+                self.site and not os.path.exists(os.path.join(SITE_DIR, 'index.html'))):
+            self.dirty.update(REGISTRY.units())
+            self.rebuild()
+        next_flush = time.monotonic() + self.flush_interval
+        while not self.stop_event.is_set():
+            now = self.heartbeat = time.monotonic()
+            if now >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+                continue
+            if not self.schedule or self.schedule[0][0] > now:
+                due = self.schedule[0][0] if self.schedule else next_flush
+                self.stop_event.wait(min(due, next_flush) - now)
+                continue
+            _, city, district = heapq.heappop(self.schedule)
+            self.crawl_district(city, district)
+        self.flush()
+        logger.info("daemon已停止: 爬取%d次（失败%d次）, 写入%d次, 重建%d次",
+                    self.counters["crawls"], self.counters["crawl_failures"], self.counters["flushes"],
+                    self.counters["rebuilds"])
+
+    def crawl_district(self, city, district):
+        """爬取一个区域并重新排期；结果暂存到pending"""
+        entry = self.crawl_data.get(city, {}).get(district)
+        incremental = isinstance(entry, dict) and bool(entry.get('monthly_data'))
+        collector = _CrawlCollector()
+        started = time.perf_counter()
+        try:
+            crawl_juhui_house_price_data(city, district, checkpoint=collector,
+                                         years=incremental_years() if incremental else None)
+        except Exception as e:
+            logger.warning("daemon爬取%s-%s失败: %s", city, district, e)
+        result = collector.results.get((city, district))
+        self.counters["crawls"] += 1
+        self.counters["incremental_crawls" if incremental else "full_crawls"] += 1
+        if result and result.get('monthly_data'):
+            self.pending.append(result)
+            self.failures.pop((city, district), None)
+            delay = self._jittered(self.crawl_interval)
+        else:
+            self.counters["crawl_failures"] += 1
+            self.failures[(city, district)] += 1
+            delay = self._jittered(min(self.crawl_interval,
+                                       DAEMON_RETRY_INTERVAL * 2 ** (self.failures[(city, district)] - 1)))
+        self.last_crawl = {'city': city, 'district': district, 'ok': bool(result and result.get('monthly_data')),
+                           'seconds': round(time.perf_counter() - started, 3), 'incremental': incremental}
+        heapq.heappush(self.schedule, (time.monotonic() + delay, city, district))
+
+    def flush(self):
+        """把暂存的结果整批写入存储，记录有变化的区域并重建对应产物"""
+        written = []
+        if self.pending:
+            results, self.pending = self.pending, []
+            previous = {(r['city'], r['district']): self.crawl_data.get(r['city'], {}).get(r['district'])
+                        for r in results}
+            try:
+                written = persist_crawl_results(results, crawl_data=self.crawl_data)
+            except Exception as e:
+                logger.error("daemon写入存储失败，下次重试: %s", e)
+                self.pending = results + self.pending
+                return
+            changed = 0
+            for entry in written:
+                key = (entry['city'], entry['district'])
+                self.crawl_data.setdefault(entry['city'], {})[entry['district']] = entry
+                self.touched.add(key)
+                if _entry_data_changed(previous.get(key), entry):
+                    self.dirty.add(key)
+                    changed += 1
+            self.counters["flushes"] += 1
+            self.counters["districts_changed"] += changed
+            self.last_flush = {'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'districts': len(written),
+                               'changed': changed}
+            logger.info("daemon已写入%d个区域（%d个有变化）", len(written), changed)
+        if self.touched or self.dirty:
+            self.rebuild()
+        # 在产物重建之后计数，/metrics中的该值表示已写入且已反映到数据API和报告的区域数
+        self.counters["districts_written"] += len(written)
+
+    def rebuild(self):
+        """更新数据API中已写入区域的响应；有数据变化时重建报告（内容哈希不变则跳过）和变化区域的站点页面"""
+        touched, dirty = self.touched, self.dirty
+        self.touched, self.dirty = set(), set()
+        started = time.perf_counter()
+        self.index = PriceDataIndex(self.crawl_data, previous=self.index, changed=touched | dirty)
+        if self.server is not None:
+            self.server.index = self.index
+        if dirty:
+            try:
+                all_data = report_data_from_crawl_data(self.crawl_data)
+                generate_simplified_house_price_html(all_data, workers=self.workers)
+                if self.site:
+                    generate_static_site(all_data, SITE_DIR, self.workers, only=dirty)
+            except Exception as e:
+                logger.error("daemon重建报告失败: %s", e)
+                self.dirty |= dirty
+                return
+            self.counters["rebuilds"] += 1
+        self.last_rebuild = {'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                             'districts': len(dirty), 'api_districts': len(touched | dirty),
+                             'seconds': round(time.perf_counter() - started, 3)}
+
+    def health(self):
+        """/health：调度循环在推进时为200，停止中或卡住时为503"""
+        stalled = time.monotonic() - self.heartbeat > max(DAEMON_STALL_SECONDS, 3 * self.flush_interval)
+        status = "stopping" if self.stop_event.is_set() else "stalled" if stalled else "ok"
+        return (200 if status == "ok" else 503), {'status': status, 'districts': self.index.district_count}
+
+    def metrics(self):
+        """/metrics：调度、爬取、写入和重建的计数与最近一次结果"""
+        now = time.monotonic()
+        return 200, {
+            'uptime_seconds': round(now - self.started_at, 1),
+            'districts': len(self.schedule),
+            'next_due_seconds': round(max(0.0, self.schedule[0][0] - now), 1) if self.schedule else None,
+            'pending_results': len(self.pending),
+            'failing_districts': len(self.failures),
+            'counters': dict(self.counters),
+            'run_stats': dict(RUN_STATS),
+            'limiter_rate': round(GOTOHUI_LIMITER.rate, 3),
+            'breaker_state': GOTOHUI_BREAKER.state,
+            'last_crawl': self.last_crawl,
+            'last_flush': self.last_flush,
+            'last_rebuild': self.last_rebuild,
+        }
+
+def run_daemon(host='127.0.0.1', port=8000, site=False, workers=None, crawl_interval=None,
+               flush_interval=DAEMON_FLUSH_INTERVAL):
+    """运行daemon直到收到SIGTERM/SIGINT：调度循环在当前线程，数据API在后台线程"""
+    daemon = HousePriceDaemon(crawl_interval, flush_interval, site, workers)
+    server = DataApiServer((host, port), reload_interval=0, index=daemon.index)
+    server.status_routes.update({'/health': daemon.health, '/metrics': daemon.metrics})
+    daemon.server = server
+    threading.Thread(target=server.serve_forever, name="daemon-api", daemon=True).start()
+    logger.info("daemon数据API: http://%s:%d （另有/health, /metrics）", host, server.server_address[1])
+    handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            handlers[signum] = signal.signal(signum, lambda number, frame: daemon.stop(signal.Signals(number).name))
+    try:
+        daemon.run()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        server.shutdown()
+        server.server_close()
+    return daemon
+
+def main(argv=None):
+    """命令行入口：根据参数决定运行模式，并可选开启性能分析"""
+    import argparse
+    parser = argparse.ArgumentParser(description="房价数据可视化报告生成与推送")
+    parser.add_argument("mode", nargs="?", default="report",
+                        choices=["report", "push", "crawl", "merge", "store-import", "store-export", "history", "serve",
+                                 "validate", "export", "daemon"],
+                        help="report: 仅生成报告（默认）; push: 生成报告并推送微信; "
+                             "crawl: 只爬取数据（可配合--shard分片）; merge: 合并分片数据文件; "
+                             "store-import: 把crawl_data.json导入SQLite存储; store-export: 由SQLite存储导出crawl_data.json; "
+                             "history: 列出修订日志中的运行，或配合--as-of重建当时的数据; "
+                             "serve: 启动本地数据API（/cities, /series/{city}/{district}, /summary）; "
+                             "validate: 校验已存储的数据并输出报告，配合--output写出清洗后的数据; "
+                             "export: 把完整历史导出为按城市分区的列式文件（Arrow/Parquet，无pyarrow时为.npz），输出到--output目录; "
+                             "daemon: 常驻运行，按区域错开增量爬取并只重建变化的产物，数据API附带/health和/metrics")
+    parser.add_argument("paths", nargs="*", help="merge模式下要合并的部分数据文件")
+    parser.add_argument("--shard", default="0/1", help="crawl模式的分片，格式i/N，如0/4")
+    parser.add_argument("--output", default=None,
+                        help="crawl模式的部分数据文件（默认crawl_data.shard-i-of-N.json）或merge模式的目标文件")
+    parser.add_argument("--no-crawl", action="store_true",
+                        help="report/push模式不爬取，直接使用已有的crawl_data.json")
+    parser.add_argument("--force", action="store_true",
+                        help="即使数据未变化也重新生成报告并推送")
+    parser.add_argument("--site", action="store_true",
+                        help="report/push/daemon模式同时生成静态站点（索引页+每区域页面，输出到site/）")
+    parser.add_argument("--orchestrate", action="store_true",
+                        help="report/push模式使用异步编排：每个区域爬取完成后立即在进程池中校验、计算概览并渲染其缩略图"
+                             "（--site时还有站点页面），与爬取重叠执行；推送所需的access_token并行预取，"
+                             "趋势预测和页面组装在爬取结束后进行；写出时间线orchestrator_trace.json")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="静态站点并行渲染的进程数，默认为CPU核数")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help="开启性能分析：cprofile输出.prof文件，pyinstrument输出HTML火焰图")
+    parser.add_argument("--profile-stage", default="all", choices=PROFILE_STAGES,
+                        help="只分析指定阶段（crawl/chart/html/push），默认分析整个运行")
+    parser.add_argument("--log-level", default=None, help="日志级别，如DEBUG/INFO/WARNING")
+    parser.add_argument("--as-of", default=None,
+                        help="history模式：重建截至该运行（YYYY-MM-DD或YYYY-MM-DDTHH:MM:SS）的数据，写入--output")
+    parser.add_argument("--compact", action="store_true", help="history模式：立即封存修订日志的活动段")
+    parser.add_argument("--store", choices=["json", "sqlite"], default=None,
+                        help="数据存储后端，默认取环境变量HOUSE_PRICE_STORE，未设置时为json")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="export模式的文件格式，默认有pyarrow时为arrow，否则为npz")
+    parser.add_argument("--host", default="127.0.0.1", help="serve/daemon模式监听地址")
+    parser.add_argument("--port", type=int, default=8000, help="serve/daemon模式监听端口")
+    parser.add_argument("--crawl-interval", type=float, default=None,
+                        help="daemon模式每个区域的爬取间隔（秒），默认取环境变量DAEMON_CRAWL_INTERVAL或一天")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="report/push/crawl模式爬取阶段的时间预算（秒），按数据陈旧程度优先爬取，"
+                             "未轮到的区域沿用已存储数据；默认取环境变量CRAWL_TIME_BUDGET，0表示不限制")
+    parser.add_argument("--reload-interval", type=float, default=API_RELOAD_INTERVAL,
+                        help="serve模式检查存储文件变化的间隔（秒），0表示不自动重新加载")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    if args.profile == "pyinstrument":
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            logger.warning("未安装pyinstrument，改用cProfile进行分析")
+            args.profile = "cprofile"
+    PROFILE_CONFIG["backend"] = args.profile
+    PROFILE_CONFIG["stage"] = args.profile_stage
+    global STORE_BACKEND, CRAWL_TIME_BUDGET
+    if args.store:
+        STORE_BACKEND = args.store
+    if args.time_budget is not None:
+        CRAWL_TIME_BUDGET = args.time_budget
+
+    try:
+        with profile_stage("all"):
+            if args.orchestrate and args.mode in ("report", "push"):
+                run_orchestrated_report(crawl=not args.no_crawl, force=args.force, site=args.site,
+                                        workers=args.workers, push=args.mode == "push")
+            elif args.mode == "push":
+                house_price_report_with_push(crawl=not args.no_crawl, force=args.force,
+                                             site=args.site, workers=args.workers)
+            elif args.mode == "crawl":
+                shard_index, shard_count = parse_shard_spec(args.shard)
+                crawl_shard(shard_index, shard_count, args.output)
+            elif args.mode == "store-import":
+                source = args.paths[0] if args.paths else 'crawl_data.json'
+                with open_history_store(args.output) as store:
+                    crawl_data = load_existing_crawl_data(source)
+                    changed = store.upsert_districts(
+                        entry for districts in crawl_data.values() for entry in districts.values())
+                logger.info("已把%s导入%s: %d行新增或变化", source, args.output or SQLITE_STORE_FILE, changed)
+            elif args.mode == "store-export":
+                source = args.paths[0] if args.paths else None
+                with open_history_store(source) as store:
+                    save_crawl_data(store.export_crawl_data(), args.output or 'crawl_data.json')
+                logger.info("已由%s导出%s", source or SQLITE_STORE_FILE, args.output or 'crawl_data.json')
+            elif args.mode == "history":
+                log = RevisionLog()
+                if args.compact:
+                    log.compact()
+                if args.as_of:
+                    output = args.output or f"crawl_data.as-of-{args.as_of.replace(':', '')}.json"
+                    save_crawl_data(log.rebuild_crawl_data(args.as_of), output)
+                    logger.info("已重建截至%s的数据: %s", normalize_run_id(args.as_of), output)
+                else:
+                    for run in log.runs():
+                        print(run)
+            elif args.mode == "validate":
+                results = [entry for districts in load_crawl_data().values() for entry in districts.values()]
+                cleaned, report, _ = validate_crawl_results(results)
+                print(json.dumps(report, ensure_ascii=False, indent=2))
+                if args.output:
+                    crawl_data = {}
+                    for result in cleaned:
+                        crawl_data.setdefault(result['city'], {})[result['district']] = result
+                    save_crawl_data(crawl_data, args.output)
+                    logger.info("清洗后的数据已写入%s", args.output)
+            elif args.mode == "export":
+                export_history(args.output or EXPORT_DIR, args.format)
+            elif args.mode == "serve":
+                serve_data_api(args.host, args.port, args.reload_interval)
+            elif args.mode == "daemon":
+                run_daemon(args.host, args.port, site=args.site, workers=args.workers,
+                           crawl_interval=args.crawl_interval)
+            elif args.mode == "merge":
+                try:
+                    merge_partial_stores(args.paths, args.output or 'crawl_data.json')
+                except MergeConflictError as e:
+                    logger.error("%s", e)
+                    return 1
+            else:
+                generate_house_price_report(crawl=not args.no_crawl, force=args.force,
+                                            site=args.site, workers=args.workers)
+    finally:
+        write_profile()
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file